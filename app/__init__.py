@@ -17,11 +17,17 @@ def create_app():
     for p in [app.config["STORAGE_DIR"], app.config["UPLOADS_DIR"], app.config["MEDIA_DIR"], app.config["REPORTS_DIR"]]:
         os.makedirs(p, exist_ok=True)
 
+    from app import dbprofile
+    dbprofile.configure(app)
     db.init_app(app)
+    dbprofile.install(app, db)
+    from app import sqltrace
+    sqltrace.init_app(app, db)
     migrate.init_app(app, db)
     login_manager.init_app(app)
 
-    from app.models import User
+    from app import identity
+    identity.init_app(app)
 
     @login_manager.user_loader
     def load_user(user_id: str):
@@ -32,7 +38,7 @@ def create_app():
             uid = int(user_id)
         except (TypeError, ValueError):
             return None
-        return User.query.get(uid)
+        return identity.load(uid)
 
     from app.i18n import t, get_lang, set_lang
 
@@ -60,6 +66,9 @@ def create_app():
     app.register_blueprint(media_bp, url_prefix="/media")
     app.register_blueprint(imports_bp, url_prefix="/import")
 
+    from app.commands import register_commands
+    register_commands(app)
+
     @app.get("/lang/<code>")
     def lang_switch(code):
         set_lang(code)
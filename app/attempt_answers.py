@@ -0,0 +1,81 @@
+"""Per-question answers in ``attempt_answer``.
+
+Submitted attempts keep their ``answers_json`` blob. Alongside it, every
+question of the answer key gets a row (response, is_correct), written with
+one executemany by the submit route, the deadline sweeper and ``regrade``.
+Item-level questions ("who missed Q17?") are then indexed SQL aggregates
+(``item_stats``, ``missed_by``) instead of JSON parsing in Python.
+``backfill`` fills the table for attempts submitted before it existed.
+"""
+from __future__ import annotations
+import json
+from sqlalchemy import case, delete, exists, func
+from app import db
+from app.grading import AnswerKey, GradeResult, compile_answer_key
+from app.models import Attempt, AttemptAnswer, Question
+
+def rows_for(attempt_id: int, key: AnswerKey, answers, result: GradeResult) -> list[dict]:
+    answers = answers or {}
+    return [{"attempt_id": attempt_id, "question_id": int(e.qid),
+             "response": json.dumps([str(v) for v in answers.get(e.qid) or []], ensure_ascii=False),
+             "is_correct": bool(result.per_question.get(e.qid))}
+            for e in key.entries]
+
+def record(rows: list[dict]):
+    """Insert rows built by ``rows_for``. One executemany; does not commit."""
+    if rows:
+        db.session.execute(AttemptAnswer.__table__.insert(), rows)
+
+def replace(attempt_ids: list[int], rows: list[dict]):
+    """Swap in freshly graded rows for these attempts (``regrade``). Does not commit."""
+    if attempt_ids:
+        db.session.execute(delete(AttemptAnswer).where(AttemptAnswer.attempt_id.in_(attempt_ids))
+                           .execution_options(synchronize_session=False))
+    record(rows)
+
+def drop_question(question_id: int):
+    """Remove a deleted question's rows. Does not commit."""
+    db.session.execute(delete(AttemptAnswer).where(AttemptAnswer.question_id == question_id)
+                       .execution_options(synchronize_session=False))
+
+def backfill(batch_size: int = 500, skill_id: int | None = None) -> int:
+    """Write rows for submitted attempts that have none, ``batch_size`` attempts per commit.
+    Returns how many attempts were filled."""
+    keys: dict[int, AnswerKey] = {}
+    last_id, total = 0, 0
+    while True:
+        q = (db.session.query(Attempt.id, Attempt.skill_id, Attempt.answers_json)
+             .filter(Attempt.status == "submitted", Attempt.id > last_id,
+                     ~exists().where(AttemptAnswer.attempt_id == Attempt.id)))
+        if skill_id is not None:
+            q = q.filter(Attempt.skill_id == skill_id)
+        batch = q.order_by(Attempt.id.asc()).limit(batch_size).all()
+        if not batch:
+            return total
+        rows = []
+        for a in batch:
+            key = keys.get(a.skill_id)
+            if key is None:
+                key = keys[a.skill_id] = compile_answer_key(
+                    Question.query.filter_by(skill_id=a.skill_id).order_by(Question.id.asc()))
+            rows += rows_for(a.id, key, a.answers_json, key.grade(a.answers_json))
+        record(rows)
+        db.session.commit()
+        total += len(batch)
+        last_id = batch[-1].id
+
+def item_stats(skill_id: int) -> list[tuple[int, int, int]]:
+    """(question_id, answered, correct) for every answered question of a skill."""
+    return (db.session.query(AttemptAnswer.question_id, func.count(AttemptAnswer.id),
+                             func.sum(case((AttemptAnswer.is_correct, 1), else_=0)))
+            .join(Question, Question.id == AttemptAnswer.question_id)
+            .filter(Question.skill_id == skill_id)
+            .group_by(AttemptAnswer.question_id)
+            .order_by(AttemptAnswer.question_id.asc()).all())
+
+def missed_by(question_id: int) -> list[int]:
+    """Ids of the students who got ``question_id`` wrong in at least one attempt."""
+    return [sid for (sid,) in (db.session.query(Attempt.student_id)
+                               .join(AttemptAnswer, AttemptAnswer.attempt_id == Attempt.id)
+                               .filter(AttemptAnswer.question_id == question_id, AttemptAnswer.is_correct.is_(False))
+                               .distinct().order_by(Attempt.student_id.asc()))]
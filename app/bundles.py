@@ -0,0 +1,92 @@
+"""Per-process cache of compiled, immutable "skill bundles".
+
+A bundle holds everything a test page or a grader needs for one skill: the
+question snapshots, the compiled answer key and the pre-rendered test body.
+Bundles are keyed by ``(skill_id, Skill.content_version)``; every route that
+edits a skill or its questions calls ``bump_version`` in the same transaction,
+so each gunicorn worker notices the new version on its next lookup and the
+stale entry simply ages out of the LRU.
+"""
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from flask import current_app
+from markupsafe import Markup
+from sqlalchemy import func, update
+from app import db
+from app.grading import AnswerKey, compile_answer_key
+from app.models import Question, Skill
+
+@dataclass(frozen=True)
+class QuestionView:
+    id: int
+    qtype: str
+    prompt_ar: str
+    choices: tuple[tuple[str, str], ...]  # (choice id, text_ar)
+    correct: tuple[str, ...]
+    video_url: str = ""
+    image_url: str = ""
+    checkpoint_seconds: int = 0
+
+@dataclass(frozen=True)
+class SkillBundle:
+    skill_id: int
+    version: int
+    questions: tuple[QuestionView, ...]
+    answer_key: AnswerKey
+    body_html: Markup
+
+_cache: OrderedDict[tuple[int, int], SkillBundle] = OrderedDict()
+_lock = threading.Lock()
+
+def _view(q: Question) -> QuestionView:
+    media = q.media_json or {}
+    meta = q.meta_json or {}
+    return QuestionView(
+        id=q.id,
+        qtype=q.qtype,
+        prompt_ar=q.prompt_ar or "",
+        choices=tuple((str(ch.get("id", "")), ch.get("text_ar", "")) for ch in (q.options_json or {}).get("choices", [])),
+        correct=tuple(str(a) for a in (q.correct_json or {}).get("answers") or []),
+        video_url=media.get("video_url", "") or "",
+        image_url=media.get("image_url", "") or "",
+        checkpoint_seconds=int(meta.get("checkpoint_seconds", 0) or 0),
+    )
+
+def build_bundle(skill_id: int, version: int) -> SkillBundle:
+    rows = Question.query.filter_by(skill_id=skill_id).order_by(Question.id.asc()).all()
+    views = tuple(_view(q) for q in rows)
+    # rendered without context processors, so the fragment must not depend on the request
+    body = current_app.jinja_env.get_template("_test_body.html").render(questions=views)
+    return SkillBundle(skill_id, version, views, compile_answer_key(rows), Markup(body))
+
+def get_bundle(skill: Skill) -> SkillBundle:
+    key = (skill.id, int(skill.content_version or 1))
+    with _lock:
+        bundle = _cache.get(key)
+        if bundle is not None:
+            _cache.move_to_end(key)
+            return bundle
+    bundle = build_bundle(*key)
+    size = int(current_app.config.get("SKILL_BUNDLE_CACHE_SIZE", 64))
+    with _lock:
+        _cache[key] = bundle
+        _cache.move_to_end(key)
+        while len(_cache) > size:
+            _cache.popitem(last=False)
+    return bundle
+
+def bump_version(*skill_ids: int):
+    """Invalidate cached bundles of these skills. Runs in the caller's transaction."""
+    ids = {int(s) for s in skill_ids if s}
+    if ids:
+        db.session.execute(
+            update(Skill).where(Skill.id.in_(ids))
+            .values(content_version=func.coalesce(Skill.content_version, 1) + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+def clear():
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,125 @@
+import click
+from app import jobs
+
+def register_commands(app):
+    @app.cli.command("worker")
+    @click.option("--once", is_flag=True, help="Run the due jobs and exit.")
+    @click.option("--interval", type=float, default=None, help="Seconds to sleep when the queue is empty.")
+    @click.option("--standalone", is_flag=True,
+                  help="Running as its own service (no shared disk with the web app): require S3 and a server DB.")
+    def worker(once, interval, standalone):
+        """Run the background job worker."""
+        if standalone:
+            problems = []
+            if (app.config.get("STORAGE_BACKEND") or "local").lower() != "s3":
+                problems.append("STORAGE_BACKEND must be s3: uploaded import and roster files are not on this disk")
+            if app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+                problems.append("DATABASE_URL must point at the web service's database, not a local SQLite file")
+            if problems:
+                for p in problems:
+                    click.echo(p, err=True)
+                raise SystemExit(1)
+        ran = jobs.work(poll_interval=interval, once=once)
+        if once:
+            click.echo(f"Ran {ran} job(s).")
+
+    @app.cli.command("regrade")
+    @click.option("--skill-id", type=int, required=True)
+    def regrade(skill_id):
+        """Re-score every submitted attempt of a skill against its current answer key."""
+        from sqlalchemy import exists, update
+        from app import attempt_answers, db, rollups, stats
+        from app.bundles import bump_version
+        from app.grading import compile_answer_key, grade_attempts
+        from app.models import Attempt, Question, Skill, StudentSkillStatus
+        skill = db.session.get(Skill, skill_id)
+        threshold = int(skill.pass_threshold or 60) if skill else 60
+        questions = Question.query.filter_by(skill_id=skill_id).order_by(Question.id.asc()).all()
+        key = compile_answer_key(questions)
+        attempts = Attempt.query.filter_by(skill_id=skill_id, status="submitted").order_by(Attempt.id.asc()).all()
+        rows, old, new = [], [], []
+        for a, res in zip(attempts, grade_attempts(key, attempts)):
+            rows += attempt_answers.rows_for(a.id, key, a.answers_json, res)
+            if a.score != res.score:
+                old.append((a.student_id, skill_id, a.score, (a.score or 0) >= threshold))
+                new.append((a.student_id, skill_id, res.score, res.score >= threshold))
+                a.score = res.score
+        attempt_answers.replace([a.id for a in attempts], rows)
+        if new:
+            db.session.flush()
+            rollups.forget_attempts(old)
+            rollups.record_attempts(new)
+            students = sorted({r[0] for r in new})
+            stats.recompute(students)
+            passed = exists().where(Attempt.student_id == StudentSkillStatus.student_id,
+                                    Attempt.skill_id == skill_id, Attempt.status == "submitted",
+                                    Attempt.score >= threshold)
+            db.session.execute(update(StudentSkillStatus)
+                               .where(StudentSkillStatus.skill_id == skill_id,
+                                      StudentSkillStatus.student_id.in_(students))
+                               .values(completed=passed).execution_options(synchronize_session=False))
+        bump_version(skill_id)  # cached item analysis is keyed by the skill's version
+        db.session.commit()
+        click.echo(f"Regraded {len(attempts)} attempt(s), {len(new)} score(s) changed.")
+
+    @app.cli.command("rebuild-skill-stats")
+    @click.option("--student-id", type=int, default=None, help="Only rebuild this student's rows.")
+    def rebuild_skill_stats(student_id):
+        """Recompute student_skill_stats from the attempt table."""
+        from app import stats
+        n = stats.rebuild(student_id)
+        click.echo(f"Rebuilt {n} stats row(s).")
+
+    @app.cli.command("backfill-attempt-answers")
+    @click.option("--batch-size", type=int, default=500)
+    @click.option("--skill-id", type=int, default=None)
+    def backfill_attempt_answers(batch_size, skill_id):
+        """Fill attempt_answer for submitted attempts that predate it."""
+        from app import attempt_answers
+        click.echo(f"Backfilled {attempt_answers.backfill(batch_size, skill_id)} attempt(s).")
+
+    @app.cli.command("rebuild-rollups")
+    def rebuild_rollups():
+        """Recompute the student, teacher and skill rollups from the attempt table."""
+        from app import rollups
+        click.echo(f"Rebuilt {rollups.rebuild()} rollup row(s).")
+
+    @app.cli.command("import-roster")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    def import_roster(path):
+        """Create students from a CSV/XLSX roster (student_id, name, teacher, password)."""
+        from app import roster
+        with open(path, "rb") as f:
+            res = roster.import_roster(path, f.read())
+        for line, message in res.errors:
+            click.echo(f"line {line}: {message}", err=True)
+        if res.errors:
+            raise SystemExit(1)
+        click.echo(f"Imported {res.created} student(s).")
+
+    @app.cli.command("sweep-attempts")
+    @click.option("--batch-size", type=int, default=None)
+    def sweep_attempts(batch_size):
+        """Auto-submit in-progress attempts whose deadline has passed."""
+        from app.deadlines import sweep_expired
+        click.echo(f"Submitted {sweep_expired(batch_size=batch_size)} expired attempt(s).")
+
+    @app.cli.command("render-reports")
+    @click.option("--week", required=True, help="ISO week key, e.g. 2026-W06.")
+    @click.option("--workers", type=int, default=None)
+    def render_reports(week, workers):
+        """Re-render the PDF reports of every submitted attempt in a week."""
+        from app.models import Attempt
+        from app.report_cache import prerender
+        ids = [a.id for a in Attempt.query.with_entities(Attempt.id).filter_by(week_key=week, status="submitted")]
+        paths = prerender(ids, workers=workers)
+        click.echo(f"Rendered {len(paths)} report(s).")
+
+    @app.cli.command("flush-outbox")
+    @click.option("--digests", is_flag=True, help="Also bundle due digest items first.")
+    def flush_outbox_cmd(digests):
+        """Send due e-mails from the outbox."""
+        from app.mailer import build_digests, flush_outbox
+        if digests:
+            build_digests()
+        click.echo(f"Sent {flush_outbox()} e-mail(s).")
@@ -10,19 +10,78 @@ class Config:
     SQLALCHEMY_DATABASE_URI = DATABASE_URL
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # engine profile (app.dbprofile): "tuned" or "stock"
+    DB_PROFILE = os.getenv("DB_PROFILE", "tuned")
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "15000"))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "20000"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+    # logged-in user snapshots cached per process (app.identity); TTL 0 disables
+    IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "1024"))
+    IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "30"))
+
+    # per-request SQL counts, timings and N+1 warnings (app.sqltrace); off by default
+    SQL_INSTRUMENT = os.getenv("SQL_INSTRUMENT", "0") not in ("0", "false", "False", "")
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+    SQL_STATS_KEEP = int(os.getenv("SQL_STATS_KEEP", "200"))
+
     STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
     STORAGE_DIR = os.getenv("STORAGE_DIR", "instance/storage")
     UPLOADS_DIR = os.getenv("UPLOADS_DIR", "instance/storage/uploads")
     MEDIA_DIR = os.getenv("MEDIA_DIR", "instance/storage/media")
     REPORTS_DIR = os.getenv("REPORTS_DIR", "instance/storage/reports")
 
+    PAGE_SIZE = int(os.getenv("PAGE_SIZE", "50"))
+    PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "200"))
+    EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "1000"))  # rows fetched / Parquet record batch size
+
     MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", str(50 * 1024 * 1024)))
+    IMPORT_MAX_ITEMS = int(os.getenv("IMPORT_MAX_ITEMS", "1000"))  # review form posts 4 fields per item
+    IMPORT_CHUNK_ITEMS = int(os.getenv("IMPORT_CHUNK_ITEMS", "100"))  # items inserted (and progress saved) per commit
+    IMPORT_PDF_WORKERS = int(os.getenv("IMPORT_PDF_WORKERS", "0"))  # 0 = one per CPU; 1 = extract inline
+    IMPORT_PDF_PAGES_PER_TASK = int(os.getenv("IMPORT_PDF_PAGES_PER_TASK", "16"))
+
+    REPORT_FONT_PATH = os.getenv("REPORT_FONT_PATH", "")  # Arabic-capable TTF (e.g. Noto Naskh Arabic, Amiri)
+    REPORTS_DIR_MAX_BYTES = int(os.getenv("REPORTS_DIR_MAX_BYTES", str(512 * 1024 * 1024)))
+    REPORT_EVICT_MIN_AGE = int(os.getenv("REPORT_EVICT_MIN_AGE", "300"))  # seconds a used PDF is safe from eviction
+    REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "0")) or None
+
+    SKILL_BUNDLE_CACHE_SIZE = int(os.getenv("SKILL_BUNDLE_CACHE_SIZE", "64"))
+    ITEM_ANALYSIS_CACHE_SIZE = int(os.getenv("ITEM_ANALYSIS_CACHE_SIZE", "64"))
+    PROGRESS_CACHE_SIZE = int(os.getenv("PROGRESS_CACHE_SIZE", "64"))
+
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+    JOB_RETRY_BASE_SECONDS = int(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+    JOB_LOCK_TIMEOUT = int(os.getenv("JOB_LOCK_TIMEOUT", "600"))
+
+    ATTEMPT_DEADLINE_GRACE_SECONDS = int(os.getenv("ATTEMPT_DEADLINE_GRACE_SECONDS", "60"))
+    ATTEMPT_SWEEP_BATCH = int(os.getenv("ATTEMPT_SWEEP_BATCH", "500"))
+
+    PURGE_CHUNK_SIZE = int(os.getenv("PURGE_CHUNK_SIZE", "500"))
+
+    ROSTER_MAX_ROWS = int(os.getenv("ROSTER_MAX_ROWS", "20000"))
+    ROSTER_CHUNK_SIZE = int(os.getenv("ROSTER_CHUNK_SIZE", "1000"))  # users per multi-row INSERT
+    ROSTER_HASH_WORKERS = int(os.getenv("ROSTER_HASH_WORKERS", "0"))  # 0 = one per CPU
+    PURGE_MAX_CHUNKS = int(os.getenv("PURGE_MAX_CHUNKS", "50"))  # per job run; the job re-enqueues itself
 
     SMTP_HOST = os.getenv("SMTP_HOST", "")
     SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
     SMTP_USER = os.getenv("SMTP_USER", "")
     SMTP_PASS = os.getenv("SMTP_PASS", "")
     SMTP_FROM = os.getenv("SMTP_FROM", "")
+    SMTP_TLS = os.getenv("SMTP_TLS", "1") not in ("0", "false", "False", "")
+    SMTP_TIMEOUT = int(os.getenv("SMTP_TIMEOUT", "30"))
+    SMTP_MAX_PER_SECOND = float(os.getenv("SMTP_MAX_PER_SECOND", "5"))
+    SMTP_MAX_PER_CONNECTION = int(os.getenv("SMTP_MAX_PER_CONNECTION", "100"))
+    SMTP_MAX_ATTEMPTS = int(os.getenv("SMTP_MAX_ATTEMPTS", "5"))
+    SMTP_RETRY_BASE_SECONDS = int(os.getenv("SMTP_RETRY_BASE_SECONDS", "60"))
+    DIGEST_DAILY_HOUR = int(os.getenv("DIGEST_DAILY_HOUR", "14"))  # UTC
 
     S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")
     S3_BUCKET = os.getenv("S3_BUCKET", "")
@@ -0,0 +1,58 @@
+"""Engine profile applied by ``create_app``.
+
+SQLite (the default deployment) gets WAL journaling, synchronous=NORMAL, a
+busy timeout and larger page cache / mmap on every new connection, so several
+gunicorn workers can submit at once without "database is locked". Postgres
+gets pool sizing and pre-ping instead. ``DB_PROFILE=stock`` turns it all off.
+"""
+from __future__ import annotations
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def sqlite_pragmas(cfg) -> list[str]:
+    return [
+        f"PRAGMA journal_mode={cfg.get('SQLITE_JOURNAL_MODE', 'WAL')}",
+        f"PRAGMA synchronous={cfg.get('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        f"PRAGMA busy_timeout={int(cfg.get('SQLITE_BUSY_TIMEOUT_MS', 15000))}",
+        f"PRAGMA cache_size=-{int(cfg.get('SQLITE_CACHE_SIZE_KB', 20000))}",
+        f"PRAGMA mmap_size={int(cfg.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+    ]
+
+def install_sqlite_pragmas(engine, pragmas: list[str]):
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            for p in pragmas:
+                cur.execute(p)
+        finally:
+            cur.close()
+
+def engine_options(cfg, url: str) -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS for the profile (explicit settings in the config win)."""
+    if cfg.get("DB_PROFILE", "tuned") == "stock":
+        return {}
+    if is_sqlite(url):
+        # Python's sqlite3 waits up to `timeout` seconds for a lock before raising
+        return {"connect_args": {"timeout": int(cfg.get("SQLITE_BUSY_TIMEOUT_MS", 15000)) / 1000}}
+    return {
+        "pool_size": int(cfg.get("DB_POOL_SIZE", 5)),
+        "max_overflow": int(cfg.get("DB_MAX_OVERFLOW", 10)),
+        "pool_recycle": int(cfg.get("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": True,
+    }
+
+def configure(app):
+    """Call before ``db.init_app``."""
+    opts = engine_options(app.config, app.config["SQLALCHEMY_DATABASE_URI"])
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {**opts, **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})}
+
+def install(app, db):
+    """Call after ``db.init_app``: hook the SQLite pragmas onto the app's engine."""
+    if app.config.get("DB_PROFILE", "tuned") == "stock" or not is_sqlite(app.config["SQLALCHEMY_DATABASE_URI"]):
+        return
+    with app.app_context():
+        install_sqlite_pragmas(db.engine, sqlite_pragmas(app.config))
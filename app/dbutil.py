@@ -0,0 +1,31 @@
+"""Dialect-aware SQL helpers (SQLite in development, Postgres in production)."""
+from sqlalchemy import func, cast, Text
+from sqlalchemy.dialects.postgresql import JSONB
+from app import db
+
+def dialect_name() -> str:
+    return db.session.get_bind().dialect.name
+
+def upsert(model):
+    """An ``insert()`` for the current dialect, supporting ``on_conflict_do_update``."""
+    if dialect_name() == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
+def greatest(a, b):
+    # SQLite's multi-argument max() is the scalar GREATEST
+    return func.greatest(a, b) if dialect_name() == "postgresql" else func.max(a, b)
+
+def json_merge(column, patch_json: str):
+    """``column`` (JSON text) with the top-level keys of ``patch_json`` merged in, computed by the database."""
+    if dialect_name() == "postgresql":
+        return cast(cast(func.coalesce(column, "{}"), JSONB).op("||")(cast(patch_json, JSONB)), Text)
+    return func.json_patch(func.coalesce(column, "{}"), patch_json)
+
+def add_minutes(ts, minutes):
+    """``ts + minutes`` evaluated by the database (``minutes`` may be a column expression)."""
+    if dialect_name() == "postgresql":
+        return ts + func.make_interval(0, 0, 0, 0, 0, minutes)
+    return func.datetime(ts, "+" + cast(minutes, Text) + " minutes")
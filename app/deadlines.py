@@ -0,0 +1,101 @@
+"""Server-side attempt deadlines.
+
+Every attempt gets ``deadline_at`` (start + the skill's time limit) when it
+starts. ``sweep_expired`` auto-submits in-progress attempts whose deadline has
+passed (the student closed the tab before the browser timer fired), grading
+their autosaved drafts. Work is done a batch at a time with set-based
+statements: one UPDATE … RETURNING claims the batch, one executemany stores
+the scores, and the stats/status/job writes are batched the same way.
+"""
+from __future__ import annotations
+import datetime as dt
+from flask import current_app
+from sqlalchemy import bindparam, select, update
+from app import attempt_answers, db, rollups, stats
+from app.bundles import get_bundle
+from app.jobs import enqueue
+from app.models import Attempt, Skill, StudentSkillStatus
+from app.utils import load_draft, now_utc
+
+def deadline_for(skill: Skill, started_at: dt.datetime) -> dt.datetime:
+    return started_at + dt.timedelta(minutes=int(skill.time_limit_min or 10))
+
+def _sweep_batch(cutoff: dt.datetime, batch_size: int) -> int:
+    a = Attempt.__table__
+    now = now_utc()
+    due = (select(a.c.id)
+           .where(a.c.status == "in_progress", a.c.deadline_at < cutoff)
+           .order_by(a.c.deadline_at.asc())
+           .limit(batch_size))
+    # submit claims with the same status re-check, so only one of them records the attempt
+    claimed = db.session.execute(
+        update(a)
+        .where(a.c.id.in_(due.scalar_subquery()), a.c.status == "in_progress")
+        .values(status="submitted", ended_at=now)
+        .returning(a.c.id, a.c.student_id, a.c.skill_id, a.c.week_key,
+                   a.c.started_at, a.c.deadline_at, a.c.draft_answers_json)
+    ).all()
+    if not claimed:
+        db.session.commit()
+        return 0
+
+    skills = {s.id: s for s in Skill.query.filter(Skill.id.in_({r.skill_id for r in claimed}))}
+    by_skill: dict[int, list] = {}
+    for r in claimed:
+        by_skill.setdefault(r.skill_id, []).append(r)
+
+    updates, stat_rows, rollup_rows, answer_rows = [], [], [], []
+    passed: dict[int, set[int]] = {}
+    for skill_id, rows in by_skill.items():
+        skill = skills[skill_id]
+        key = get_bundle(skill).answer_key
+        drafts = [load_draft(r.draft_answers_json) for r in rows]
+        threshold = int(skill.pass_threshold or 60)
+        for r, draft, res in zip(rows, drafts, key.grade_many(drafts)):
+            answers = {e.qid: [str(v) for v in draft.get(e.qid) or []] for e in key.entries}
+            elapsed = int(((r.deadline_at or now) - (r.started_at or now)).total_seconds())
+            answer_rows += attempt_answers.rows_for(r.id, key, answers, res)
+            updates.append({"b_id": r.id, "b_answers": answers, "b_score": res.score, "b_time": max(elapsed, 0)})
+            stat_rows.append((r.student_id, skill_id, res.score, r.week_key, r.id))
+            rollup_rows.append((r.student_id, skill_id, res.score, res.score >= threshold))
+            if res.score >= threshold:
+                passed.setdefault(skill_id, set()).add(r.student_id)
+
+    db.session.execute(
+        update(a).where(a.c.id == bindparam("b_id"))
+        .values(answers_json=bindparam("b_answers"), score=bindparam("b_score"),
+                time_seconds=bindparam("b_time"), draft_answers_json=None),
+        updates,
+    )
+    stats.record_attempts(stat_rows)
+    rollups.record_attempts(rollup_rows)
+    attempt_answers.record(answer_rows)
+
+    for skill_id, student_ids in passed.items():
+        db.session.execute(
+            update(StudentSkillStatus)
+            .where(StudentSkillStatus.skill_id == skill_id, StudentSkillStatus.student_id.in_(student_ids))
+            .values(completed=True)
+            .execution_options(synchronize_session=False)
+        )
+
+    for r in claimed:
+        enqueue("publish_report", {"attempt_id": r.id}, ref=f"attempt:{r.id}")
+    db.session.commit()
+    return len(claimed)
+
+def sweep_expired(batch_size: int | None = None, grace_seconds: int | None = None,
+                  now: dt.datetime | None = None) -> int:
+    """Auto-submit every in-progress attempt past its deadline. Commits per batch; returns the count."""
+    cfg = current_app.config
+    batch_size = batch_size or int(cfg.get("ATTEMPT_SWEEP_BATCH", 500))
+    if grace_seconds is None:
+        grace_seconds = int(cfg.get("ATTEMPT_DEADLINE_GRACE_SECONDS", 60))
+    # the grace period leaves room for a submit that is already on its way
+    cutoff = (now or now_utc()) - dt.timedelta(seconds=grace_seconds)
+    total = 0
+    while True:
+        n = _sweep_batch(cutoff, batch_size)
+        total += n
+        if n < batch_size:
+            return total
@@ -1,7 +1,24 @@
+"""Question extraction from uploaded PDF/DOCX files.
+
+``imports.upload`` only stores the file and creates the ``ImportBatch`` with
+status "processing"; the ``extract_import`` job then runs ``extract_batch``,
+which walks the document page by page (PDF, with page ranges extracted across
+a process pool by ``pdf_page_blocks``) or paragraph by paragraph (DOCX),
+inserts ``ImportItem`` rows ``IMPORT_CHUNK_ITEMS`` at a time and saves
+``progress_done`` with each chunk for the review page to poll. Extraction
+stops at ``IMPORT_MAX_ITEMS`` and flags the batch as truncated.
+"""
 from __future__ import annotations
 import os, re, json
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import List, Tuple, Optional
+from typing import Iterator, List, Tuple, Optional
+from flask import current_app
+from sqlalchemy import delete
+from app import db
+from app.jobs import heartbeat
+from app.models import ImportBatch, ImportItem
+from app.storage import local_copy
 
 @dataclass
 class ImportedQuestion:
@@ -49,3 +66,118 @@ def render_pdf_pages_to_images(pdf_path: str, out_dir: str, prefix: str) -> List
         out_files.append(fname)
     doc.close()
     return out_files
+
+_pdf = None  # the document each pool worker opened in _pool_init
+
+def _split_page(text: str) -> list[str]:
+    text = (text or "").strip()
+    return [x.strip() for x in text.split("\n\n") if x.strip()]
+
+def _pool_init(path: str):
+    global _pdf
+    import fitz  # PyMuPDF
+    _pdf = fitz.open(path)
+
+def _pool_extract(pages: tuple[int, int]) -> list[list[str]]:
+    return [_split_page(_pdf[i].get_text()) for i in range(*pages)]
+
+def pdf_page_blocks(path: str, workers: int | None = None, pages_per_task: int = 16) -> tuple[int, Iterator[list[str]]]:
+    """(page count, iterator of each page's text blocks in page order).
+
+    Page ranges of ``pages_per_task`` are extracted across a process pool (every
+    worker opens the file itself), and pages are yielded as soon as their range
+    and all earlier ones are done, so callers can store them while later pages
+    are still being read. Runs inline for ``workers == 1`` or short documents."""
+    import fitz  # PyMuPDF
+    with fitz.open(path) as doc:
+        total = len(doc)
+    pages_per_task = max(1, pages_per_task)
+    if workers == 1 or total <= pages_per_task:
+        def serial():
+            with fitz.open(path) as doc:
+                for page in doc:
+                    yield _split_page(page.get_text())
+        return total, serial()
+
+    def parallel():
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_pool_init, initargs=(path,))
+        try:
+            ranges = [(i, min(i + pages_per_task, total)) for i in range(0, total, pages_per_task)]
+            # map() submits every range up front and hands results back in order
+            for pages in pool.map(_pool_extract, ranges):
+                yield from pages
+        finally:
+            # a caller that stops early (IMPORT_MAX_ITEMS) should not wait for the remaining pages
+            pool.shutdown(wait=True, cancel_futures=True)
+    return total, parallel()
+
+def document_blocks(path: str, source_type: str, workers: int | None = None,
+                    pages_per_task: int = 16) -> tuple[int, Iterator[list[str]]]:
+    """(number of units, iterator of the text blocks in each unit) — a unit is a PDF page or a DOCX paragraph."""
+    if source_type == "docx":
+        from docx import Document
+        paragraphs = Document(path).paragraphs
+
+        def docx_units():
+            for p in paragraphs:
+                txt = (p.text or "").strip()
+                yield [txt] if txt else []
+        return len(paragraphs), docx_units()
+    return pdf_page_blocks(path, workers, pages_per_task)
+
+def _save_chunk(batch_id: int, texts: list[str], done: int):
+    if texts:
+        db.session.execute(ImportItem.__table__.insert(), [{"batch_id": batch_id, "raw_text": t} for t in texts])
+    db.session.query(ImportBatch).filter_by(id=batch_id).update({"progress_done": done}, synchronize_session=False)
+    heartbeat()  # a large document can outlast JOB_LOCK_TIMEOUT
+    db.session.commit()
+
+def extract_batch(batch_id: int) -> int:
+    """Fill a "processing" batch with its ``ImportItem`` rows and mark it "draft" (or "failed"). Returns the item count."""
+    batch = db.session.get(ImportBatch, batch_id)
+    if batch is None or batch.status != "processing":
+        return 0
+    cap = int(current_app.config.get("IMPORT_MAX_ITEMS", 1000))
+    chunk = int(current_app.config.get("IMPORT_CHUNK_ITEMS", 100))
+    # a retried job starts over
+    db.session.execute(delete(ImportItem).where(ImportItem.batch_id == batch_id))
+    count, truncated = 0, False
+    try:
+        with local_copy(batch.storage_key) as path:
+            total, units = document_blocks(path, batch.source_type,
+                                           workers=int(current_app.config.get("IMPORT_PDF_WORKERS", 0)) or None,
+                                           pages_per_task=int(current_app.config.get("IMPORT_PDF_PAGES_PER_TASK", 16)))
+            batch.progress_total, batch.progress_done = total, 0
+            db.session.commit()
+            pending, done = [], 0
+            try:
+                for done, blocks in enumerate(units, 1):
+                    if count + len(blocks) > cap:
+                        blocks, truncated = blocks[:cap - count], True
+                    pending += blocks
+                    count += len(blocks)
+                    if truncated:
+                        break
+                    # also save progress every few units of a sparse document
+                    if len(pending) >= chunk or done % 10 == 0:
+                        _save_chunk(batch_id, pending, done)
+                        pending = []
+            finally:
+                # shut down the page pool and close the document before the temp copy goes away
+                units.close()
+            if not count:
+                pending, count = ["(لم يتم استخراج نص. الرجاء إدخال الأسئلة يدوياً)"], 1
+            _save_chunk(batch_id, pending, total if not truncated else done)
+    except Exception as e:
+        # a file that cannot be parsed will not parse on a retry either
+        db.session.rollback()
+        current_app.logger.exception("Import batch %s failed", batch_id)
+        db.session.execute(delete(ImportItem).where(ImportItem.batch_id == batch_id))
+        batch = db.session.get(ImportBatch, batch_id)
+        batch.status, batch.error = "failed", f"{type(e).__name__}: {e}"[:500]
+        db.session.commit()
+        return 0
+    batch = db.session.get(ImportBatch, batch_id)
+    batch.status, batch.truncated = "draft", truncated
+    db.session.commit()
+    return count
@@ -0,0 +1,163 @@
+"""Streaming exports of attempts, students and questions.
+
+Rows come from one ``SELECT`` executed with ``yield_per`` and
+``stream_results`` (a server-side cursor on Postgres), and each row is written
+out as soon as it arrives, so memory stays flat however large the table is.
+CSV goes straight into the response body. Parquet (needs the optional
+``pyarrow`` package) is written in record batches of ``EXPORT_BATCH_ROWS`` to
+a temporary file that is then streamed back, since a Parquet footer can only
+be written at the end. Attempt answers are flattened: one ``q_<id>`` column
+per question when the export is limited to a skill, otherwise a single
+``answers`` column.
+"""
+from __future__ import annotations
+import csv
+import io
+import re
+import tempfile
+from flask import Response, current_app, stream_with_context
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+from app import db
+from app.models import Attempt, Question, Skill, StudentRollup, User
+from app.utils import now_utc
+
+DATASETS = ("attempts", "students", "questions")
+FORMATS = ("csv", "parquet")
+
+class ExportUnavailable(Exception):
+    pass
+
+def _rows(stmt, batch: int):
+    yield from db.session.execute(stmt.execution_options(yield_per=batch, stream_results=True))
+
+def _join(values) -> str:
+    return "|".join(str(v) for v in values or [])
+
+def _attempts(teacher_id: int | None, skill_id: int | None, batch: int):
+    qids = [q for (q,) in db.session.query(Question.id).filter_by(skill_id=skill_id).order_by(Question.id.asc())] \
+        if skill_id else []
+    columns = [("attempt_id", "int"), ("student_id", "str"), ("student_name", "str"), ("skill_id", "int"),
+               ("skill_name", "str"), ("week_key", "str"), ("attempt_no", "int"), ("status", "str"),
+               ("score", "int"), ("started_at", "datetime"), ("ended_at", "datetime"), ("time_seconds", "int")]
+    columns += [(f"q_{q}", "str") for q in qids] if skill_id else [("answers", "str")]
+    stmt = (select(Attempt.id, User.student_id, User.name_ar, Attempt.skill_id, Skill.name_ar, Attempt.week_key,
+                   Attempt.attempt_no, Attempt.status, Attempt.score, Attempt.started_at, Attempt.ended_at,
+                   Attempt.time_seconds, Attempt.answers_json)
+            .join(User, User.id == Attempt.student_id).join(Skill, Skill.id == Attempt.skill_id)
+            .where(Skill.deleted_at.is_(None)).order_by(Attempt.id.asc()))
+    if teacher_id is not None:
+        stmt = stmt.where(User.teacher_id == teacher_id)
+    if skill_id:
+        stmt = stmt.where(Attempt.skill_id == skill_id)
+
+    def rows():
+        for *base, answers in _rows(stmt, batch):
+            answers = answers or {}
+            if skill_id:
+                yield (*base, *(_join(answers.get(str(q))) for q in qids))
+            else:
+                yield (*base, "; ".join(f"{k}={_join(v)}" for k, v in sorted(answers.items(), key=lambda kv: (len(kv[0]), kv[0]))))
+    return columns, rows()
+
+def _students(teacher_id: int | None, skill_id: int | None, batch: int):
+    teacher = aliased(User)
+    columns = [("id", "int"), ("student_id", "str"), ("name_ar", "str"), ("teacher", "str"), ("email", "str"),
+               ("created_at", "datetime"), ("attempts", "int"), ("avg_score", "float")]
+    stmt = (select(User.id, User.student_id, User.name_ar, teacher.name_ar, User.email, User.created_at,
+                   func.coalesce(StudentRollup.attempts_count, 0),
+                   StudentRollup.score_sum * 1.0 / func.nullif(StudentRollup.attempts_count, 0))
+            .outerjoin(teacher, teacher.id == User.teacher_id)
+            .outerjoin(StudentRollup, StudentRollup.student_id == User.id)
+            .where(User.role == "student").order_by(User.id.asc()))
+    if teacher_id is not None:
+        stmt = stmt.where(User.teacher_id == teacher_id)
+    return columns, (tuple(r) for r in _rows(stmt, batch))
+
+def _questions(teacher_id: int | None, skill_id: int | None, batch: int):
+    columns = [("id", "int"), ("skill_id", "int"), ("skill_name", "str"), ("qtype", "str"), ("prompt_ar", "str"),
+               ("choices", "str"), ("correct", "str")]
+    stmt = (select(Question.id, Question.skill_id, Skill.name_ar, Question.qtype, Question.prompt_ar,
+                   Question.options_json, Question.correct_json)
+            .join(Skill, Skill.id == Question.skill_id).where(Skill.deleted_at.is_(None))
+            .order_by(Question.skill_id.asc(), Question.id.asc()))
+    if skill_id:
+        stmt = stmt.where(Question.skill_id == skill_id)
+
+    def rows():
+        for *base, options, correct in _rows(stmt, batch):
+            choices = "|".join(f"{c.get('id', '')}={c.get('text_ar', '')}" for c in (options or {}).get("choices", []))
+            yield (*base, choices, _join((correct or {}).get("answers")))
+    return columns, rows()
+
+BUILDERS = {"attempts": _attempts, "students": _students, "questions": _questions}
+
+_NUMBER = re.compile(r"[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?")
+
+def _cell(v):
+    # keep spreadsheet apps from evaluating teacher-entered text as formulas; a plain number such as
+    # a negative numeric answer stays a number
+    if isinstance(v, str) and v[:1] in ("=", "+", "-", "@", "\t", "\r") and not _NUMBER.fullmatch(v):
+        return "'" + v
+    return v
+
+def _csv(columns, rows):
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow([name for name, _ in columns])
+    yield "\ufeff" + buf.getvalue()  # the BOM makes Excel read the Arabic text as UTF-8
+    buf.seek(0)
+    buf.truncate()
+    for i, row in enumerate(rows, 1):
+        w.writerow([_cell(v) for v in row])
+        if i % 500 == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ExportUnavailable("Parquet export needs the pyarrow package") from e
+    return pyarrow
+
+def _parquet(columns, rows, batch: int):
+    pa = _pyarrow()
+    types = {"int": pa.int64(), "float": pa.float64(), "str": pa.string(), "datetime": pa.timestamp("us")}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    out = tempfile.TemporaryFile()
+
+    def batch_of(chunk):
+        return pa.RecordBatch.from_arrays([pa.array(col, type=t) for col, t in zip(zip(*chunk), schema.types)],
+                                          schema=schema)
+
+    with pa.parquet.ParquetWriter(out, schema) as writer:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= batch:
+                writer.write_batch(batch_of(chunk))
+                chunk = []
+        if chunk:
+            writer.write_batch(batch_of(chunk))
+    out.seek(0)
+
+    def read():
+        with out:
+            while block := out.read(64 * 1024):
+                yield block
+    return read()
+
+def export_response(dataset: str, fmt: str, teacher_id: int | None = None, skill_id: int | None = None) -> Response:
+    """Stream ``dataset`` (scoped to a teacher's students when ``teacher_id`` is given). Raises ExportUnavailable."""
+    batch = int(current_app.config.get("EXPORT_BATCH_ROWS", 1000))
+    columns, rows = BUILDERS[dataset](teacher_id, skill_id, batch)
+    name = f"{dataset}_{now_utc():%Y%m%d_%H%M}.{fmt}"
+    headers = {"Content-Disposition": f'attachment; filename="{name}"'}
+    if fmt == "parquet":
+        body = _parquet(columns, rows, batch)
+        return Response(stream_with_context(body), mimetype="application/vnd.apache.parquet", headers=headers)
+    return Response(stream_with_context(_csv(columns, rows)), mimetype="text/csv; charset=utf-8", headers=headers)
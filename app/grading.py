@@ -0,0 +1,130 @@
+"""Grading engine: a grader registry keyed by qtype plus compiled answer keys.
+
+A skill's questions are compiled once into an ``AnswerKey`` (frozensets of
+normalized answers), which can then grade one attempt or a batch of attempts
+without touching the ORM objects again.
+"""
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+
+_ARABIC_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹٫", "01234567890123456789.")
+
+def normalize_text(s) -> str:
+    return " ".join(str(s).translate(_ARABIC_DIGITS).split()).casefold()
+
+class Grader(ABC):
+    """Base grader: compiles the stored answers and checks one response."""
+
+    def compile(self, answers: list) -> frozenset:
+        return frozenset(str(a).strip() for a in answers if str(a).strip())
+
+    def collect(self, form, name: str) -> list[str]:
+        val = (form.get(name) or "").strip()
+        return [val] if val else []
+
+    @abstractmethod
+    def check(self, key, response: list[str]) -> bool:
+        ...
+
+GRADERS: dict[str, Grader] = {}
+
+def register_grader(*qtypes: str):
+    def deco(cls):
+        inst = cls()
+        for qt in qtypes:
+            GRADERS[qt] = inst
+        return cls
+    return deco
+
+@register_grader("mcq_single", "tf", "true_false", "image_mcq_single", "video_checkpoint", "video_cued_mcq_single")
+class SingleChoiceGrader(Grader):
+    def check(self, key, response):
+        return len(response) == 1 and response[0] in key
+
+@register_grader("mcq_multi")
+class MultiChoiceGrader(Grader):
+    def collect(self, form, name):
+        return [v for v in form.getlist(name) if v]
+
+    def check(self, key, response):
+        return bool(key) and frozenset(response) == key
+
+@register_grader("short", "short_text")
+class TextGrader(Grader):
+    def compile(self, answers):
+        return frozenset(normalize_text(a) for a in answers if normalize_text(a))
+
+    def check(self, key, response):
+        return bool(response) and normalize_text(response[0]) in key
+
+@register_grader("numeric")
+class NumericGrader(Grader):
+    @staticmethod
+    def _num(s) -> float | None:
+        try:
+            return float(normalize_text(s).replace(",", ""))
+        except ValueError:
+            return None
+
+    def compile(self, answers):
+        nums = (self._num(a) for a in answers)
+        return frozenset(n for n in nums if n is not None)
+
+    def check(self, key, response):
+        if not response:
+            return False
+        n = self._num(response[0])
+        return n is not None and any(abs(n - k) <= 1e-9 * max(1.0, abs(k)) for k in key)
+
+_FALLBACK = SingleChoiceGrader()
+
+@dataclass(frozen=True)
+class KeyEntry:
+    qid: str
+    qtype: str
+    key: frozenset
+    graded: bool
+
+@dataclass(frozen=True)
+class GradeResult:
+    correct: int
+    total: int
+    score: int
+    per_question: Mapping[str, bool]
+
+@dataclass(frozen=True)
+class AnswerKey:
+    entries: tuple[KeyEntry, ...]
+
+    def collect(self, form) -> dict[str, list[str]]:
+        """Read the ``q_<id>`` fields of a submitted test form."""
+        return {e.qid: GRADERS.get(e.qtype, _FALLBACK).collect(form, f"q_{e.qid}") for e in self.entries}
+
+    def grade(self, answers: Mapping[str, list] | None) -> GradeResult:
+        answers = answers or {}
+        per_question = {}
+        for e in self.entries:
+            resp = answers.get(e.qid) or []
+            per_question[e.qid] = e.graded and GRADERS[e.qtype].check(e.key, [str(r) for r in resp])
+        correct = sum(per_question.values())
+        total = max(len(self.entries), 1)
+        return GradeResult(correct, len(self.entries), int(round((correct / total) * 100)), per_question)
+
+    def grade_many(self, answer_sets: Iterable[Mapping[str, list] | None]) -> list[GradeResult]:
+        return [self.grade(a) for a in answer_sets]
+
+def compile_answer_key(questions: Iterable) -> AnswerKey:
+    """Compile Question rows (ordered as shown to the student) into an AnswerKey."""
+    entries = []
+    for q in questions:
+        grader = GRADERS.get(q.qtype)
+        answers = (q.correct_json or {}).get("answers") or []
+        key = grader.compile(answers) if grader else frozenset()
+        entries.append(KeyEntry(str(q.id), q.qtype, key, grader is not None and bool(key)))
+    return AnswerKey(tuple(entries))
+
+def grade_attempts(key: AnswerKey, attempts: Iterable) -> list[GradeResult]:
+    """Batch API for regrading: grade Attempt rows against one compiled key."""
+    return key.grade_many(a.answers_json for a in attempts)
@@ -21,6 +21,7 @@ STRINGS = {
   "select_teacher": {"ar":"اختر المعلم", "en":"Select Teacher"},
   "first_time_teacher": {"ar":"هذه أول مرة لك، الرجاء اختيار معلمك.", "en":"First login: please select your teacher."},
   "remediation": {"ar":"خطة علاجية", "en":"Remediation"},
+  "progress": {"ar":"تقدم الطلاب", "en":"Progress"},
   "language": {"ar":"اللغة", "en":"Language"},
 }
 
@@ -0,0 +1,103 @@
+"""Cached identity for Flask-Login's ``user_loader``.
+
+``current_user`` is an ``Identity``: a detached snapshot of the user's row
+(id, role, names, teacher…) kept in a small per-process LRU with a TTL, so
+the role checks at the top of every route usually cost no query. Updates or
+deletes of a ``User`` through the ORM drop its entry, both at flush and again
+after the commit. Other workers pick up a change within
+``IDENTITY_CACHE_TTL`` seconds. Code that changes the logged-in user loads
+the real row with ``current_user.row()``.
+"""
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app import db
+from app.models import User
+
+FIELDS = ("id", "username", "role", "name_ar", "name_en", "email", "email_digest", "student_id", "teacher_id")
+
+class Identity(UserMixin):
+    """Read-only snapshot of a ``User`` row."""
+
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+    @classmethod
+    def of(cls, user: User) -> "Identity":
+        return cls(**{f: getattr(user, f) for f in FIELDS})
+
+    def row(self) -> User | None:
+        return db.session.get(User, self.id)
+
+class IdentityCache:
+    def __init__(self, max_size: int = 1024, ttl: float = 30.0):
+        self._lock = threading.Lock()
+        self.configure(max_size, ttl)
+
+    def configure(self, max_size: int, ttl: float):
+        with self._lock:
+            self.max_size = max_size
+            self.ttl = ttl
+            self._items: OrderedDict[int, tuple[float, Identity]] = OrderedDict()
+
+    def get(self, user_id: int) -> Identity | None:
+        with self._lock:
+            hit = self._items.get(user_id)
+            if hit is None:
+                return None
+            if hit[0] < time.monotonic():
+                del self._items[user_id]
+                return None
+            self._items.move_to_end(user_id)
+            return hit[1]
+
+    def put(self, ident: Identity):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._items[ident.id] = (time.monotonic() + self.ttl, ident)
+            self._items.move_to_end(ident.id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_id: int | None = None):
+        """Drop one user, or everybody (after bulk updates that bypass the ORM)."""
+        with self._lock:
+            if user_id is None:
+                self._items.clear()
+            else:
+                self._items.pop(user_id, None)
+
+cache = IdentityCache()
+
+def load(user_id: int) -> Identity | None:
+    ident = cache.get(user_id)
+    if ident is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        ident = Identity.of(user)
+        cache.put(ident)
+    return ident
+
+def _user_changed(_mapper, _connection, target: User):
+    cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("_identity_changed", set()).add(target.id)
+
+def _after_commit(session):
+    # a request in this process may have re-cached the old row between flush and commit
+    for user_id in session.info.pop("_identity_changed", ()):
+        cache.invalidate(user_id)
+
+event.listen(User, "after_update", _user_changed)
+event.listen(User, "after_delete", _user_changed)
+event.listen(Session, "after_commit", _after_commit)
+
+def init_app(app):
+    cache.configure(int(app.config.get("IDENTITY_CACHE_SIZE", 1024)), float(app.config.get("IDENTITY_CACHE_TTL", 30)))
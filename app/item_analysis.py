@@ -0,0 +1,141 @@
+"""Classical item analysis of a skill's questions.
+
+``analyze`` takes each student's latest submitted attempt at a skill (for the
+whole school, or for one teacher's class) from ``attempt_answer`` and lays it
+out as a NumPy students × questions correctness matrix with a mask for the
+questions a student was never shown. One vectorized pass then gives, per
+question:
+
+- the p-value (share of students who answered it correctly),
+- the discrimination (corrected point-biserial: the correlation between the
+  item and the student's score on the *other* items),
+- the distractor frequencies (share of students who picked each choice),
+
+plus the KR-20 reliability of the whole test. Results are cached per process,
+stamped with the count, newest id and id sum of the submitted attempts in
+scope and the skill's ``content_version``, so they are recomputed after a new
+submission, a question edit, a purge, or a student joining or leaving the
+class.
+"""
+from __future__ import annotations
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+import numpy as np
+from flask import current_app
+from sqlalchemy import func
+from app import db
+from app.bundles import get_bundle
+from app.models import Attempt, AttemptAnswer, Skill, User
+
+@dataclass(frozen=True)
+class ItemStats:
+    question_id: int
+    n: int
+    p_value: float | None
+    discrimination: float | None
+    distractors: tuple[tuple[str, float], ...]  # (choice id, share of students who picked it)
+
+@dataclass(frozen=True)
+class ItemAnalysis:
+    skill_id: int
+    teacher_id: int | None
+    students: int
+    kr20: float | None
+    items: dict[int, ItemStats]
+
+_cache: OrderedDict[tuple[int, int | None], tuple[tuple, ItemAnalysis]] = OrderedDict()
+_lock = threading.Lock()
+
+def _submitted(skill_id: int, teacher_id: int | None, *columns):
+    q = db.session.query(*(columns or (func.max(Attempt.id),))) \
+        .filter(Attempt.skill_id == skill_id, Attempt.status == "submitted")
+    if teacher_id is not None:
+        q = q.join(User, User.id == Attempt.student_id).filter(User.teacher_id == teacher_id)
+    return q
+
+def _stamp(skill: Skill, teacher_id: int | None) -> tuple:
+    # the id sum changes when attempts leave the scope (purged, or their student moved to another class)
+    # even if the newest one stays
+    count, newest, total = _submitted(skill.id, teacher_id, func.count(Attempt.id), func.max(Attempt.id),
+                                      func.sum(Attempt.id)).one()
+    return count, newest, total, int(skill.content_version or 1)
+
+def _float(x) -> float | None:
+    return None if x is None or not np.isfinite(x) else round(float(x), 4)
+
+def _distractors(rows, col_of, choice_cols: set[int]) -> dict[int, dict[str, int]]:
+    picks = [(col_of[qid], str(choice)) for _, qid, _, resp in rows
+             if col_of.get(qid) in choice_cols for choice in set(json.loads(resp or "[]"))]
+    out: dict[int, dict[str, int]] = {}
+    if picks:
+        pairs, counts = np.unique(np.array(picks, dtype=str), axis=0, return_counts=True)
+        for (col, choice), n in zip(pairs, counts):
+            out.setdefault(int(col), {})[choice] = int(n)
+    return out
+
+def compute(skill: Skill, teacher_id: int | None = None) -> ItemAnalysis:
+    questions = get_bundle(skill).questions
+    qids = [q.id for q in questions]
+    col_of = {qid: j for j, qid in enumerate(qids)}
+    latest = _submitted(skill.id, teacher_id).group_by(Attempt.student_id)
+    rows = (db.session.query(AttemptAnswer.attempt_id, AttemptAnswer.question_id,
+                             AttemptAnswer.is_correct, AttemptAnswer.response)
+            .filter(AttemptAnswer.attempt_id.in_(latest.scalar_subquery())).all())
+    rows = [r for r in rows if r[1] in col_of]
+    if not rows or not qids:
+        return ItemAnalysis(skill.id, teacher_id, 0, None, {})
+
+    attempt_ids, row_idx = np.unique(np.fromiter((r[0] for r in rows), dtype=np.int64), return_inverse=True)
+    cols = np.fromiter((col_of[r[1]] for r in rows), dtype=np.int64)
+    correct = np.zeros((len(attempt_ids), len(qids)))
+    shown = np.zeros_like(correct)
+    correct[row_idx, cols] = np.fromiter((bool(r[2]) for r in rows), dtype=float)
+    shown[row_idx, cols] = 1.0
+
+    n = shown.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p = correct.sum(axis=0) / n
+        total = correct.sum(axis=1, keepdims=True)
+        rest = total - correct
+        rest_mean = (rest * shown).sum(axis=0) / n
+        di, dr = (correct - p) * shown, (rest - rest_mean) * shown
+        discrimination = (di * dr).sum(axis=0) / np.sqrt((di ** 2).sum(axis=0) * (dr ** 2).sum(axis=0))
+
+        used = n > 0
+        k = int(used.sum())
+        var = total.var()
+        kr20 = (k / (k - 1)) * (1 - (p[used] * (1 - p[used])).sum() / var) if k > 1 and var > 0 else None
+
+    choice_cols = {j for j, q in enumerate(questions) if q.choices}
+    picks = _distractors(rows, col_of, choice_cols)
+    items = {}
+    for j, q in enumerate(questions):
+        counts = picks.get(j, {})
+        shares = tuple((cid, round(counts.get(cid, 0) / float(n[j]), 4)) for cid, _ in q.choices) if n[j] else ()
+        items[q.id] = ItemStats(q.id, int(n[j]), _float(p[j]) if n[j] else None,
+                                _float(discrimination[j]) if n[j] else None, shares)
+    return ItemAnalysis(skill.id, teacher_id, len(attempt_ids), _float(kr20), items)
+
+def analyze(skill: Skill, teacher_id: int | None = None) -> ItemAnalysis:
+    """``compute`` through the per-process cache."""
+    key = (skill.id, teacher_id)
+    stamp = _stamp(skill, teacher_id)
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == stamp:
+            _cache.move_to_end(key)
+            return hit[1]
+    result = compute(skill, teacher_id)
+    size = int(current_app.config.get("ITEM_ANALYSIS_CACHE_SIZE", 64))
+    with _lock:
+        _cache[key] = (stamp, result)
+        _cache.move_to_end(key)
+        while len(_cache) > size:
+            _cache.popitem(last=False)
+    return result
+
+def clear():
+    with _lock:
+        _cache.clear()
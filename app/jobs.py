@@ -0,0 +1,173 @@
+"""Durable background jobs stored in the application database.
+
+Requests enqueue work (report rendering, teacher e-mails) into the ``job``
+table in the same transaction as the data it refers to, and a separate worker
+process (``python manage.py worker``) claims and runs it. Claiming is a
+conditional UPDATE, so several workers can poll the same table safely.
+
+A job still "running" after ``JOB_LOCK_TIMEOUT`` is taken to belong to a dead
+worker and is put back (or failed, once its attempts are used up). Handlers
+that can run longer than that call ``heartbeat()`` as they make progress.
+"""
+from __future__ import annotations
+import datetime as dt
+import time
+from contextvars import ContextVar
+from typing import Callable
+from flask import current_app
+from sqlalchemy import update
+from app import db
+from app.models import Job
+from app.utils import now_utc
+
+HANDLERS: dict[str, Callable[[dict], None]] = {}
+PERIODIC: dict[str, tuple[float, Callable[[], None]]] = {}
+_last_periodic_run: dict[str, float] = {}
+_running: ContextVar[int | None] = ContextVar("running_job", default=None)
+
+def job_handler(kind: str):
+    def deco(fn: Callable[[dict], None]):
+        HANDLERS[kind] = fn
+        return fn
+    return deco
+
+def periodic(seconds: float):
+    """Register a housekeeping function the worker calls every ``seconds``."""
+    def deco(fn: Callable[[], None]):
+        PERIODIC[fn.__name__] = (seconds, fn)
+        return fn
+    return deco
+
+def enqueue(kind: str, payload: dict | None = None, ref: str | None = None,
+            run_after: dt.datetime | None = None, max_attempts: int | None = None) -> Job:
+    """Add a job to the current session. The caller commits."""
+    job = Job(
+        kind=kind,
+        payload_json=payload or {},
+        ref=ref,
+        status="queued",
+        run_after=run_after or now_utc(),
+        max_attempts=max_attempts or int(current_app.config.get("JOB_MAX_ATTEMPTS", 5)),
+    )
+    db.session.add(job)
+    return job
+
+def _load_handlers():
+    # handlers register themselves on import
+    import app.tasks  # noqa: F401
+
+def _retry_delay(attempts: int) -> dt.timedelta:
+    base = int(current_app.config.get("JOB_RETRY_BASE_SECONDS", 30))
+    return dt.timedelta(seconds=min(base * (2 ** max(attempts - 1, 0)), 3600))
+
+def heartbeat():
+    """Keep the running job's lock fresh; rides on the handler's next commit. No-op outside the worker."""
+    job_id = _running.get()
+    if job_id is not None:
+        db.session.execute(update(Job).where(Job.id == job_id, Job.status == "running").values(locked_at=now_utc()))
+
+def requeue_stale() -> int:
+    """Put back jobs whose worker died while running them; fail those with no attempts left
+    (a job that kills its worker would otherwise come back forever). Returns how many were requeued."""
+    now = now_utc()
+    stale = (Job.status == "running", Job.locked_at < now - dt.timedelta(seconds=int(current_app.config.get("JOB_LOCK_TIMEOUT", 600))))
+    db.session.execute(
+        update(Job)
+        .where(*stale, Job.attempts >= Job.max_attempts)
+        .values(status="failed", locked_at=None, finished_at=now, last_error="worker stopped while running the job")
+    )
+    res = db.session.execute(update(Job).where(*stale).values(status="queued", locked_at=None))
+    db.session.commit()
+    return res.rowcount or 0
+
+def claim_next() -> Job | None:
+    now = now_utc()
+    candidates = (db.session.query(Job.id)
+                  .filter(Job.status == "queued", Job.run_after <= now)
+                  .order_by(Job.run_after.asc(), Job.id.asc())
+                  .limit(10).all())
+    for (job_id,) in candidates:
+        res = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "queued")
+            .values(status="running", locked_at=now, attempts=Job.attempts + 1)
+        )
+        db.session.commit()
+        if res.rowcount == 1:
+            return db.session.get(Job, job_id)
+    return None
+
+def run_job(job: Job) -> bool:
+    handler = HANDLERS.get(job.kind)
+    job_id = job.id
+    token = _running.set(job_id)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler for job kind {job.kind!r}")
+        handler(dict(job.payload_json or {}))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        current_app.logger.exception("Job %s (%s) failed on attempt %s", job.id, job.kind, job.attempts)
+        job.last_error = f"{type(e).__name__}: {e}"[:2000]
+        job.locked_at = None
+        if job.attempts < job.max_attempts and handler is not None:
+            job.status = "queued"
+            job.run_after = now_utc() + _retry_delay(job.attempts)
+        else:
+            job.status = "failed"
+            job.finished_at = now_utc()
+        db.session.commit()
+        return False
+    finally:
+        _running.reset(token)
+
+    job = db.session.get(Job, job_id)
+    job.status = "done"
+    job.locked_at = None
+    job.finished_at = now_utc()
+    db.session.commit()
+    return True
+
+def run_pending(limit: int | None = None) -> int:
+    """Run due jobs until the queue is empty (or ``limit`` jobs ran)."""
+    _load_handlers()
+    done = 0
+    while limit is None or done < limit:
+        job = claim_next()
+        if job is None:
+            break
+        run_job(job)
+        done += 1
+    return done
+
+def run_periodic(force: bool = False) -> int:
+    _load_handlers()
+    ran = 0
+    for name, (seconds, fn) in PERIODIC.items():
+        now = time.monotonic()
+        if not force and now - _last_periodic_run.get(name, float("-inf")) < seconds:
+            continue
+        _last_periodic_run[name] = now
+        try:
+            fn()
+            ran += 1
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Periodic task %s failed", name)
+    return ran
+
+def work(poll_interval: float | None = None, once: bool = False):
+    _load_handlers()
+    interval = poll_interval if poll_interval is not None else float(current_app.config.get("JOB_POLL_INTERVAL", 2))
+    current_app.logger.info("Job worker started (poll every %ss)", interval)
+    while True:
+        requeue_stale()
+        run_periodic()
+        ran = run_pending()
+        db.session.remove()
+        if once:
+            return ran
+        if not ran:
+            time.sleep(interval)
@@ -1,26 +1,227 @@
+"""Outgoing e-mail through the ``email_outbox`` table.
+
+Requests and jobs only ``queue_email``; the worker calls ``flush_outbox``,
+which sends every due message over one authenticated SMTP connection with
+throttling and retry/backoff. Teachers may opt into hourly or daily digests,
+in which case their messages are held and bundled by ``build_digests``.
+"""
+from __future__ import annotations
+import datetime as dt
+import os
 import smtplib
+import time
 from email.message import EmailMessage
 from flask import current_app
+from sqlalchemy import and_, update
+from app import db
+from app.models import EmailOutbox
+from app.utils import now_utc
 
-def send_email(to_email: str, subject: str, body: str, attachment_path: str | None = None):
-    cfg = current_app.config
-    if not cfg.get("SMTP_HOST") or not to_email:
-        return False
+DIGEST_PERIODS = ("hourly", "daily")
+
+class SMTPSender:
+    """One SMTP connection reused for many messages (reconnects when needed)."""
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.conn: smtplib.SMTP | None = None
+        self.sent_on_conn = 0
+        self._last_send = 0.0
+        rate = float(cfg.get("SMTP_MAX_PER_SECOND") or 0)
+        self.min_interval = 1.0 / rate if rate > 0 else 0.0
+        self.max_per_conn = int(cfg.get("SMTP_MAX_PER_CONNECTION") or 0)
+
+    def _connect(self):
+        cfg = self.cfg
+        conn = smtplib.SMTP(cfg["SMTP_HOST"], cfg["SMTP_PORT"], timeout=cfg.get("SMTP_TIMEOUT", 30))
+        if cfg.get("SMTP_TLS", True):
+            conn.starttls()
+        if cfg.get("SMTP_USER"):
+            conn.login(cfg["SMTP_USER"], cfg["SMTP_PASS"])
+        self.conn = conn
+        self.sent_on_conn = 0
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.conn = None
+
+    def send(self, msg: EmailMessage):
+        if self.min_interval:
+            wait = self._last_send + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+        if self.conn is not None and self.max_per_conn and self.sent_on_conn >= self.max_per_conn:
+            self.close()
+        if self.conn is None:
+            self._connect()
+        try:
+            self.conn.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # server dropped an idle connection: reconnect once and retry
+            self.conn = None
+            self._connect()
+            self.conn.send_message(msg)
+        self.sent_on_conn += 1
+        self._last_send = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
+def _from_addr(cfg) -> str:
+    return cfg.get("SMTP_FROM") or cfg.get("SMTP_USER") or ""
+
+def _report_attachment(attempt_id: int) -> str | None:
+    # rendered (or found in the report cache) only when the message actually goes out
+    from app.models import Attempt
+    from app.report_cache import ensure_report_pdf
+    attempt = db.session.get(Attempt, attempt_id)
+    return ensure_report_pdf(attempt) if attempt and attempt.status == "submitted" else None
+
+def build_message(cfg, to_email: str, subject: str, body: str, attachments: list[dict] | None = None) -> EmailMessage:
     msg = EmailMessage()
-    msg["From"] = cfg.get("SMTP_FROM") or cfg.get("SMTP_USER")
+    msg["From"] = _from_addr(cfg)
     msg["To"] = to_email
     msg["Subject"] = subject
     msg.set_content(body)
+    for att in attachments or []:
+        path = att.get("path")
+        if att.get("attempt_id"):
+            path = _report_attachment(int(att["attempt_id"]))
+        if not path or not os.path.exists(path):
+            continue
+        with open(path, "rb") as f:
+            msg.add_attachment(f.read(), maintype="application", subtype="pdf", filename=att.get("filename") or "report.pdf")
+    return msg
 
+def _next_digest_time(period: str, now: dt.datetime) -> dt.datetime:
+    if period == "hourly":
+        return now.replace(minute=0, second=0, microsecond=0) + dt.timedelta(hours=1)
+    hour = int(current_app.config.get("DIGEST_DAILY_HOUR", 14))
+    due = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    return due if due > now else due + dt.timedelta(days=1)
+
+def queue_email(to_email: str, subject: str, body: str, attachment_path: str | None = None,
+                attachment_name: str = "report.pdf", digest: str | None = None,
+                attachment_attempt_id: int | None = None) -> EmailOutbox | None:
+    """Add a message to the outbox in the current session. The caller commits."""
+    if not to_email:
+        return None
+    now = now_utc()
+    digest = digest if digest in DIGEST_PERIODS else None
+    attachments = []
     if attachment_path:
-        with open(attachment_path, "rb") as f:
-            data = f.read()
-        msg.add_attachment(data, maintype="application", subtype="pdf", filename="report.pdf")
+        attachments.append({"path": attachment_path, "filename": attachment_name})
+    if attachment_attempt_id:
+        attachments.append({"attempt_id": attachment_attempt_id, "filename": attachment_name})
+    msg = EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        body=body,
+        attachments_json=attachments,
+        status="held" if digest else "pending",
+        digest=digest,
+        next_attempt_at=_next_digest_time(digest, now) if digest else now,
+    )
+    db.session.add(msg)
+    return msg
 
-    with smtplib.SMTP(cfg["SMTP_HOST"], cfg["SMTP_PORT"]) as s:
-        s.starttls()
-        if cfg.get("SMTP_USER"):
-            s.login(cfg["SMTP_USER"], cfg["SMTP_PASS"])
-        s.send_message(msg)
+def build_digests(now: dt.datetime | None = None) -> int:
+    """Bundle held digest items that are due into one pending message per recipient."""
+    now = now or now_utc()
+    held = (EmailOutbox.query
+            .filter(EmailOutbox.status == "held", EmailOutbox.next_attempt_at <= now)
+            .order_by(EmailOutbox.to_email.asc(), EmailOutbox.id.asc()).all())
+    by_recipient: dict[str, list[EmailOutbox]] = {}
+    for m in held:
+        by_recipient.setdefault(m.to_email, []).append(m)
+    for to_email, items in by_recipient.items():
+        body = [f"ملخص التقارير الجديدة ({len(items)}):", ""]
+        attachments = []
+        for i, m in enumerate(items, 1):
+            body.append(f"{i}. {m.subject}")
+            if m.body:
+                body.append(f"   {m.body}")
+            for att in m.attachments_json or []:
+                attachments.append(dict(att, filename=f"{i:03d}_{att.get('filename') or 'report.pdf'}"))
+            m.status = "bundled"
+        db.session.add(EmailOutbox(to_email=to_email, subject=f"ملخص تقارير الاختبارات ({len(items)})",
+                                   body="\n".join(body), attachments_json=attachments, status="pending",
+                                   next_attempt_at=now_utc()))
+    db.session.commit()
+    return len(by_recipient)
+
+def _backoff(attempts: int) -> dt.timedelta:
+    base = int(current_app.config.get("SMTP_RETRY_BASE_SECONDS", 60))
+    return dt.timedelta(seconds=min(base * (2 ** max(attempts - 1, 0)), 6 * 3600))
+
+def flush_outbox(limit: int = 200) -> int:
+    """Send due pending messages over a single SMTP connection. Returns how many were sent."""
+    cfg = current_app.config
+    if not cfg.get("SMTP_HOST"):
+        return 0
+    now = now_utc()
+    max_attempts = int(cfg.get("SMTP_MAX_ATTEMPTS", 5))
+    # messages left in "sending" by a worker that died mid-batch go back to the queue,
+    # unless they have used up their attempts (a message that kills the worker would loop forever)
+    stale = and_(EmailOutbox.status == "sending",
+                 EmailOutbox.next_attempt_at < now - dt.timedelta(seconds=int(cfg.get("JOB_LOCK_TIMEOUT", 600))))
+    db.session.execute(update(EmailOutbox).where(stale, EmailOutbox.attempts >= max_attempts)
+                       .values(status="failed", last_error="interrupted while sending"))
+    db.session.execute(update(EmailOutbox).where(stale).values(status="pending"))
+    ids = [r[0] for r in (db.session.query(EmailOutbox.id)
+                          .filter(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+                          .order_by(EmailOutbox.id.asc()).limit(limit).all())]
+    if not ids:
+        db.session.commit()
+        return 0
+
+    sent = 0
+    with SMTPSender(cfg) as sender:
+        for msg_id in ids:
+            # claim each message so a second worker never sends the same one
+            claimed = db.session.execute(update(EmailOutbox)
+                                         .where(EmailOutbox.id == msg_id, EmailOutbox.status == "pending")
+                                         .values(status="sending", attempts=EmailOutbox.attempts + 1, next_attempt_at=now_utc()))
+            db.session.commit()
+            if claimed.rowcount != 1:
+                continue
+            m = db.session.get(EmailOutbox, msg_id)
+            try:
+                sender.send(build_message(cfg, m.to_email, m.subject, m.body, m.attachments_json))
+            except Exception as e:
+                # a message that cannot be built (e.g. its report fails to render) is retried and
+                # eventually failed like an SMTP error, without abandoning the rest of the batch
+                if isinstance(e, (smtplib.SMTPException, OSError)):
+                    sender.close()
+                db.session.rollback()
+                m = db.session.get(EmailOutbox, msg_id)
+                m.last_error = f"{type(e).__name__}: {e}"[:2000]
+                if m.attempts >= max_attempts or isinstance(e, smtplib.SMTPRecipientsRefused):
+                    m.status = "failed"
+                else:
+                    m.status = "pending"
+                    m.next_attempt_at = now_utc() + _backoff(m.attempts)
+                current_app.logger.warning("E-mail %s to %s failed: %s", m.id, m.to_email, m.last_error)
+            else:
+                m.status = "sent"
+                m.sent_at = now_utc()
+                sent += 1
+            db.session.commit()
+    return sent
+
+def send_email(to_email: str, subject: str, body: str, attachment_path: str | None = None):
+    """Send one message right away (prefer ``queue_email`` in request handlers)."""
+    cfg = current_app.config
+    if not cfg.get("SMTP_HOST") or not to_email:
+        return False
+    with SMTPSender(cfg) as sender:
+        sender.send(build_message(cfg, to_email, subject, body,
+                                  [{"path": attachment_path, "filename": "report.pdf"}] if attachment_path else None))
     return True
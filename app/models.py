@@ -11,12 +11,18 @@ class User(db.Model, UserMixin):
     name_en = db.Column(db.String(200), nullable=True)
     role = db.Column(db.String(20), nullable=False)  # chairman|teacher|student
     email = db.Column(db.String(200), nullable=True)
+    email_digest = db.Column(db.String(10), nullable=True)  # None (each report) | hourly | daily
 
     student_id = db.Column(db.String(50), unique=True, nullable=True)
     teacher_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
     password_hash = db.Column(db.String(255), nullable=True)
 
-    created_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=dt.datetime.utcnow)  # keyset-paginated
+
+    __table_args__ = (
+        db.Index("ix_user_role_teacher", "role", "teacher_id"),
+        db.Index("ix_user_role_created", "role", "created_at"),
+    )
 
     def set_password(self, pw: str):
         self.password_hash = generate_password_hash(pw)
@@ -33,8 +39,15 @@ class Skill(db.Model):
     order = db.Column(db.Integer, default=0)
     pass_threshold = db.Column(db.Integer, default=60)
     time_limit_min = db.Column(db.Integer, default=10)
+    content_version = db.Column(db.Integer, nullable=False, default=1)  # bumped on any skill/question edit (app.bundles)
+    # set when the skill is deleted; the rows are removed later by the purge_skill job (app.purge)
+    deleted_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
 
+    @classmethod
+    def visible(cls):
+        return cls.query.filter(cls.deleted_at.is_(None))
+
 class StudentSkillStatus(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -42,7 +55,59 @@ class StudentSkillStatus(db.Model):
     unlocked = db.Column(db.Boolean, default=False)
     completed = db.Column(db.Boolean, default=False)
     extra_attempt_week = db.Column(db.String(12), nullable=True)
-    __table_args__ = (UniqueConstraint("student_id", "skill_id", name="uq_student_skill"),)
+    __table_args__ = (
+        UniqueConstraint("student_id", "skill_id", name="uq_student_skill"),
+        db.Index("ix_student_skill_status_skill", "skill_id"),
+    )
+
+class StudentSkillStats(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    skill_id = db.Column(db.Integer, db.ForeignKey("skill.id"), nullable=False)
+    attempts_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    best_score = db.Column(db.Integer, nullable=True)
+    last_score = db.Column(db.Integer, nullable=True)
+    last_week = db.Column(db.String(12), nullable=True)
+    last_attempt_id = db.Column(db.Integer, nullable=True)
+    updated_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
+    __table_args__ = (
+        UniqueConstraint("student_id", "skill_id", name="uq_student_skill_stats"),
+        db.Index("ix_student_skill_stats_skill", "skill_id"),
+    )
+
+    @property
+    def avg_score(self) -> float:
+        return (self.score_sum / self.attempts_count) if self.attempts_count else 0.0
+
+class _Rollup:
+    """Running totals over submitted attempts, kept by ``app.rollups``."""
+    id = db.Column(db.Integer, primary_key=True)
+    attempts_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    passed_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
+
+    @property
+    def avg_score(self) -> float:
+        return (self.score_sum / self.attempts_count) if self.attempts_count else 0.0
+
+    @property
+    def pass_rate(self) -> float:
+        return (100.0 * self.passed_count / self.attempts_count) if self.attempts_count else 0.0
+
+class StudentRollup(_Rollup, db.Model):
+    student_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    __table_args__ = (UniqueConstraint("student_id", name="uq_student_rollup"),)
+
+class TeacherRollup(_Rollup, db.Model):
+    # totals of the teacher's current students (moved along when a student changes teacher)
+    teacher_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    __table_args__ = (UniqueConstraint("teacher_id", name="uq_teacher_rollup"),)
+
+class SkillRollup(_Rollup, db.Model):
+    skill_id = db.Column(db.Integer, db.ForeignKey("skill.id"), nullable=False)
+    __table_args__ = (UniqueConstraint("skill_id", name="uq_skill_rollup"),)
 
 class Media(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -51,7 +116,9 @@ class Media(db.Model):
     url = db.Column(db.Text, nullable=False)
     storage_key = db.Column(db.Text, nullable=True)
     uploaded_by = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
-    created_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=dt.datetime.utcnow)  # keyset-paginated
+
+    __table_args__ = (db.Index("ix_media_created", "created_at"),)
 
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -66,11 +133,15 @@ class Question(db.Model):
     meta_json = db.Column(db.JSON, nullable=True)
     created_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
 
+    __table_args__ = (db.Index("ix_question_skill", "skill_id", "id"),)
+
 class Attempt(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     skill_id = db.Column(db.Integer, db.ForeignKey("skill.id"), nullable=False)
     week_key = db.Column(db.String(12), nullable=False)
+    # 1 for the weekly attempt, 2+ for extra attempts granted by the teacher
+    attempt_no = db.Column(db.Integer, nullable=False, default=1, server_default="1")
 
     started_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
     ended_at = db.Column(db.DateTime, nullable=True)
@@ -79,10 +150,35 @@ class Attempt(db.Model):
     score = db.Column(db.Integer, default=0)
     status = db.Column(db.String(20), default="in_progress")
     answers_json = db.Column(db.JSON, nullable=True)
+    # JSON text merged in place by the autosave endpoint ({"<question id>": [values]})
+    draft_answers_json = db.Column(db.Text, nullable=True)
+    last_saved_at = db.Column(db.DateTime, nullable=True)
+    # started_at + the skill's time limit; in-progress attempts past it are auto-submitted (app.deadlines)
+    deadline_at = db.Column(db.DateTime, nullable=True)
 
-    created_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=dt.datetime.utcnow)  # keyset-paginated
 
-    __table_args__ = (UniqueConstraint("student_id", "skill_id", "week_key", name="uq_attempt_week"),)
+    __table_args__ = (
+        UniqueConstraint("student_id", "skill_id", "week_key", "attempt_no", name="uq_attempt_week_no"),
+        db.Index("ix_attempt_status_deadline", "status", "deadline_at"),
+        db.Index("ix_attempt_student_status", "student_id", "status"),
+        db.Index("ix_attempt_skill", "skill_id", "id"),
+        db.Index("ix_attempt_student_created", "student_id", "created_at"),
+    )
+
+class AttemptAnswer(db.Model):
+    """One row per (attempt, question) of a submitted attempt; ``answers_json`` stays the source of truth."""
+    id = db.Column(db.Integer, primary_key=True)
+    attempt_id = db.Column(db.Integer, db.ForeignKey("attempt.id"), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey("question.id"), nullable=False)
+    response = db.Column(db.Text, nullable=True)  # JSON list of the submitted values
+    is_correct = db.Column(db.Boolean, nullable=False, default=False)
+    time_spent = db.Column(db.Integer, nullable=True)  # seconds; not measured per question yet
+
+    __table_args__ = (
+        UniqueConstraint("attempt_id", "question_id", name="uq_attempt_answer"),
+        db.Index("ix_attempt_answer_question_correct", "question_id", "is_correct"),
+    )
 
 class Report(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -90,7 +186,9 @@ class Report(db.Model):
     teacher_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     url = db.Column(db.Text, nullable=False)
     storage_key = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=dt.datetime.utcnow)  # keyset-paginated
+
+    __table_args__ = (db.Index("ix_report_teacher_created", "teacher_id", "created_at"),)
 
 class Remediation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -100,7 +198,14 @@ class Remediation(db.Model):
     notes_ar = db.Column(db.Text, nullable=True)
     notes_en = db.Column(db.Text, nullable=True)
     file_media_id = db.Column(db.Integer, db.ForeignKey("media.id"), nullable=False)
-    created_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=dt.datetime.utcnow)  # keyset-paginated
+
+    __table_args__ = (
+        db.Index("ix_remediation_student_skill", "student_id", "skill_id", "created_at"),
+        db.Index("ix_remediation_teacher_created", "teacher_id", "created_at"),
+        db.Index("ix_remediation_skill", "skill_id"),
+        db.Index("ix_remediation_student_created", "student_id", "created_at"),
+    )
 
 class ImportBatch(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -108,8 +213,18 @@ class ImportBatch(db.Model):
     skill_id = db.Column(db.Integer, db.ForeignKey("skill.id"), nullable=False)
     filename = db.Column(db.String(255), nullable=False)
     source_type = db.Column(db.String(20), nullable=False)  # pdf|docx
-    status = db.Column(db.String(20), default="draft")
-    created_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
+    status = db.Column(db.String(20), default="draft")  # processing|draft|failed|completed
+    storage_key = db.Column(db.String(500), nullable=True)
+    progress_done = db.Column(db.Integer, nullable=False, default=0)  # pages (PDF) or paragraphs (DOCX) read
+    progress_total = db.Column(db.Integer, nullable=True)
+    truncated = db.Column(db.Boolean, nullable=False, default=False)  # stopped at IMPORT_MAX_ITEMS
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=dt.datetime.utcnow)  # keyset-paginated
+
+    __table_args__ = (
+        db.Index("ix_import_batch_skill", "skill_id"),
+        db.Index("ix_import_batch_created", "created_at"),
+    )
 
 class ImportItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -117,3 +232,53 @@ class ImportItem(db.Model):
     raw_text = db.Column(db.Text, nullable=False)
     suggested_type = db.Column(db.String(50), nullable=True)
     created_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
+
+    __table_args__ = (db.Index("ix_import_item_batch", "batch_id", "id"),)
+
+class RosterImport(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    created_by = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    storage_key = db.Column(db.String(500), nullable=True)  # removed once the job has run
+    status = db.Column(db.String(20), nullable=False, default="processing")  # processing|done|failed
+    progress_done = db.Column(db.Integer, nullable=False, default=0)  # passwords hashed
+    progress_total = db.Column(db.Integer, nullable=False, default=0)
+    created = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
+
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload_json = db.Column(db.JSON, nullable=True)
+    ref = db.Column(db.String(100), nullable=True)  # e.g. "attempt:12", what the job is about
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued|running|done|failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_after = db.Column(db.DateTime, nullable=False, default=dt.datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_job_status_run_after", "status", "run_after"),
+        db.Index("ix_job_ref", "ref"),
+    )
+
+class EmailOutbox(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(200), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False, default="")
+    attachments_json = db.Column(db.JSON, nullable=True)  # [{"path"|"attempt_id": ..., "filename": ...}]
+    # pending -> sent|failed; digest items wait as "held" until bundled, then become "bundled"
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    digest = db.Column(db.String(10), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=dt.datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (db.Index("ix_email_outbox_status_next", "status", "next_attempt_at"),)
@@ -0,0 +1,86 @@
+"""Keyset (seek) pagination over ``(created_at, id)``.
+
+A page is fetched with ``WHERE (created_at, id) < :cursor ORDER BY created_at
+DESC, id DESC LIMIT n + 1`` (or the mirror image for oldest-first), so every
+page costs the same index seek however deep the user has paged, and rows
+inserted meanwhile never shift or duplicate what is shown. Cursors are opaque
+URL-safe tokens of the last row's key.
+"""
+from __future__ import annotations
+import base64
+import datetime as dt
+import json
+from dataclasses import dataclass, field
+from flask import current_app, request, url_for
+from sqlalchemy import tuple_
+
+SORTS = ("newest", "oldest")
+
+def encode_cursor(created_at: dt.datetime, row_id: int) -> str:
+    # created_at is NOT NULL on every paginated table (migration 0015); a NULL key could not round-trip
+    raw = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token: str | None) -> tuple[dt.datetime, int] | None:
+    if not token:
+        return None
+    try:
+        created, row_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return dt.datetime.fromisoformat(created), int(row_id)
+    except (ValueError, TypeError):
+        return None  # a mangled cursor just means "first page"
+
+@dataclass
+class Page:
+    items: list
+    param: str
+    cursor: str | None = None
+    next_cursor: str | None = None
+    sort: str = "newest"
+    _args: dict = field(default_factory=dict, repr=False)
+
+    def url(self, cursor: str | None) -> str:
+        args = {k: v for k, v in self._args.items() if k != self.param}
+        if cursor:
+            args[self.param] = cursor
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+    @property
+    def first_url(self) -> str | None:
+        return self.url(None) if self.cursor else None
+
+    @property
+    def next_url(self) -> str | None:
+        return self.url(self.next_cursor) if self.next_cursor else None
+
+def paginate(query, created_col, id_col, param: str = "after", per_page: int | None = None) -> Page:
+    """Return one page of ``query`` using the ``param`` cursor and ``sort``/``per_page`` from the request."""
+    args = request.args.to_dict()
+    sort = args.get("sort") if args.get("sort") in SORTS else "newest"
+    limit = per_page or int(current_app.config.get("PAGE_SIZE", 50))
+    try:
+        limit = max(1, min(int(args.get("per_page") or limit), int(current_app.config.get("PAGE_SIZE_MAX", 200))))
+    except ValueError:
+        pass
+    token = args.get(param)
+    cursor = decode_cursor(token)
+    key = tuple_(created_col, id_col)
+    if cursor:
+        query = query.filter(key < cursor if sort == "newest" else key > cursor)
+    if sort == "newest":
+        query = query.order_by(created_col.desc(), id_col.desc())
+    else:
+        query = query.order_by(created_col.asc(), id_col.asc())
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(_get(last, created_col), _get(last, id_col))
+    return Page(rows, param, token if cursor else None, next_cursor, sort, args)
+
+def _get(row, col):
+    # entities and column rows expose the key directly; (entity, extra columns) rows via the entity
+    if hasattr(row, col.key):
+        return getattr(row, col.key)
+    return getattr(row[0], col.key)
@@ -0,0 +1,117 @@
+"""Student × skill progress matrix for a teacher's class.
+
+``load`` reads the class in two aggregate queries (``student_skill_status``
+and ``student_skill_stats``, each joined to the teacher's students) besides
+the student and skill lists, and pivots them into NumPy arrays: a bit-flag
+grid (unlocked, completed, passed, attempted this week, extra attempt this
+week) and best/last score grids, with -1 for "no attempt". The rendered
+table is cached per process keyed by a digest of those arrays, so a page
+whose data has not changed is served without re-rendering 200 × 40 cells.
+"""
+from __future__ import annotations
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+import numpy as np
+from flask import current_app
+from markupsafe import Markup
+from app import db
+from app.models import Skill, StudentSkillStats, StudentSkillStatus, User
+from app.utils import iso_week_key
+
+UNLOCKED, COMPLETED, PASSED, THIS_WEEK, EXTRA = 1, 2, 4, 8, 16
+
+@dataclass(frozen=True)
+class ProgressGrid:
+    teacher_id: int
+    week: str
+    students: tuple[tuple[int, str, str], ...]  # (id, name_ar, student_id)
+    skills: tuple[tuple[int, str], ...]  # (id, name_ar)
+    flags: np.ndarray  # uint8, students × skills
+    best: np.ndarray  # int16, -1 when never attempted
+    last: np.ndarray
+
+    @property
+    def digest(self) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(repr((self.week, self.students, self.skills)).encode())
+        for a in (self.flags, self.best, self.last):
+            h.update(a.tobytes())
+        return h.hexdigest()
+
+    def summary(self) -> list[tuple[int, int]]:
+        """(students who passed, students unlocked) per skill."""
+        return list(zip(((self.flags & PASSED) > 0).sum(axis=0).tolist(),
+                        ((self.flags & UNLOCKED) > 0).sum(axis=0).tolist()))
+
+_cache: OrderedDict[tuple[int, str], Markup] = OrderedDict()
+_lock = threading.Lock()
+
+def _pivot(rows, row_of: dict[int, int], col_of: dict[int, int]):
+    rows = [r for r in rows if r[0] in row_of and r[1] in col_of]
+    i = np.fromiter((row_of[r[0]] for r in rows), dtype=np.int64, count=len(rows))
+    j = np.fromiter((col_of[r[1]] for r in rows), dtype=np.int64, count=len(rows))
+    return rows, i, j
+
+def load(teacher_id: int) -> ProgressGrid:
+    week = iso_week_key()
+    students = tuple(tuple(r) for r in db.session.query(User.id, User.name_ar, User.student_id)
+                     .filter(User.role == "student", User.teacher_id == teacher_id)
+                     .order_by(User.name_ar.asc(), User.id.asc()))
+    skills = Skill.visible().with_entities(Skill.id, Skill.name_ar, Skill.pass_threshold) \
+        .order_by(Skill.order.asc(), Skill.id.asc()).all()
+    row_of = {s[0]: i for i, s in enumerate(students)}
+    col_of = {s.id: j for j, s in enumerate(skills)}
+    shape = (len(students), len(skills))
+    flags = np.zeros(shape, dtype=np.uint8)
+    best = np.full(shape, -1, dtype=np.int16)
+    last = np.full(shape, -1, dtype=np.int16)
+
+    statuses, i, j = _pivot(
+        db.session.query(StudentSkillStatus.student_id, StudentSkillStatus.skill_id, StudentSkillStatus.unlocked,
+                         StudentSkillStatus.completed, StudentSkillStatus.extra_attempt_week)
+        .join(User, User.id == StudentSkillStatus.student_id)
+        .filter(User.role == "student", User.teacher_id == teacher_id).all(),  # seeks ix_user_role_teacher
+        row_of, col_of)
+    flags[i, j] = np.fromiter((UNLOCKED * bool(r[2]) | COMPLETED * bool(r[3]) | EXTRA * (r[4] == week)
+                               for r in statuses), dtype=np.uint8, count=len(statuses))
+
+    stats, i, j = _pivot(
+        db.session.query(StudentSkillStats.student_id, StudentSkillStats.skill_id, StudentSkillStats.best_score,
+                         StudentSkillStats.last_score, StudentSkillStats.last_week)
+        .join(User, User.id == StudentSkillStats.student_id)
+        .filter(User.role == "student", User.teacher_id == teacher_id).all(),
+        row_of, col_of)
+    best[i, j] = np.fromiter((r[2] if r[2] is not None else -1 for r in stats), dtype=np.int16, count=len(stats))
+    last[i, j] = np.fromiter((r[3] if r[3] is not None else -1 for r in stats), dtype=np.int16, count=len(stats))
+    flags[i, j] |= np.fromiter((THIS_WEEK * (r[4] == week) for r in stats), dtype=np.uint8, count=len(stats))
+    threshold = np.array([int(s.pass_threshold or 60) for s in skills], dtype=np.int16)
+    flags |= np.where(best >= threshold, PASSED, 0).astype(np.uint8)
+
+    return ProgressGrid(teacher_id, week, students, tuple((s.id, s.name_ar) for s in skills), flags, best, last)
+
+def render(grid: ProgressGrid) -> Markup:
+    """The matrix table for ``grid``, through the per-process cache."""
+    key = (grid.teacher_id, grid.digest)
+    with _lock:
+        html = _cache.get(key)
+        if html is not None:
+            _cache.move_to_end(key)
+            return html
+    # rendered without context processors, like the skill bundles
+    html = Markup(current_app.jinja_env.get_template("_progress_grid.html").render(
+        grid=grid, rows=zip(grid.students, grid.flags.tolist(), grid.best.tolist(), grid.last.tolist()),
+        summary=grid.summary(), flag=dict(unlocked=UNLOCKED, completed=COMPLETED, passed=PASSED,
+                                          this_week=THIS_WEEK, extra=EXTRA)))
+    size = int(current_app.config.get("PROGRESS_CACHE_SIZE", 64))
+    with _lock:
+        _cache[key] = html
+        _cache.move_to_end(key)
+        while len(_cache) > size:
+            _cache.popitem(last=False)
+    return html
+
+def clear():
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,105 @@
+"""Background removal of deleted skills.
+
+``skill_delete`` only stamps ``Skill.deleted_at`` (the skill disappears from
+every list at once) and enqueues a ``purge_skill`` job. The job deletes the
+skill's rows table by table in bounded chunks, committing after each one so no
+transaction holds the write lock for long, and removes the report PDFs and
+remediation uploads that belonged to them. A job that runs out of its chunk
+budget re-enqueues itself and carries on where it stopped.
+"""
+from __future__ import annotations
+from flask import current_app
+from sqlalchemy import delete, exists, select
+from app import db, report_cache, rollups
+from app.models import (Attempt, AttemptAnswer, ImportBatch, ImportItem, Media, Question, Remediation, Report, Skill,
+                        SkillRollup, StudentSkillStats, StudentSkillStatus)
+from app.storage import delete_stored
+
+def _delete_chunk(model, where, size: int) -> int:
+    ids = select(model.id).where(where).limit(size).scalar_subquery()
+    res = db.session.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+    db.session.commit()
+    return res.rowcount
+
+def _remove_files(keys):
+    for key in keys:
+        delete_stored(key)
+
+def _purge_attempts(skill: Skill, size: int) -> int:
+    attempts = Attempt.query.filter_by(skill_id=skill.id).order_by(Attempt.id.asc()).limit(size).all()
+    if not attempts:
+        return 0
+    ids = [a.id for a in attempts]
+    threshold = int(skill.pass_threshold or 60)
+    rollups.forget_attempts([(a.student_id, a.skill_id, a.score, (a.score or 0) >= threshold)
+                             for a in attempts if a.status == "submitted"])
+    files = [k for (k,) in db.session.query(Report.storage_key)
+              .filter(Report.attempt_id.in_(ids), Report.storage_key.isnot(None))]
+    db.session.execute(delete(Report).where(Report.attempt_id.in_(ids)).execution_options(synchronize_session=False))
+    db.session.execute(delete(AttemptAnswer).where(AttemptAnswer.attempt_id.in_(ids))
+                       .execution_options(synchronize_session=False))
+    db.session.execute(delete(Attempt).where(Attempt.id.in_(ids)).execution_options(synchronize_session=False))
+    db.session.commit()
+    _remove_files(files)
+    report_cache.remove_for_attempts(ids)
+    return len(ids)
+
+def _purge_remediations(skill: Skill, size: int) -> int:
+    rows = (db.session.query(Remediation.id, Remediation.file_media_id)
+            .filter(Remediation.skill_id == skill.id).order_by(Remediation.id.asc()).limit(size).all())
+    if not rows:
+        return 0
+    db.session.execute(delete(Remediation).where(Remediation.id.in_([r.id for r in rows]))
+                       .execution_options(synchronize_session=False))
+    # uploads no other remediation points at are orphans now
+    orphan = (Media.id.in_({r.file_media_id for r in rows})
+              & ~exists().where(Remediation.file_media_id == Media.id))
+    files = [k for (k,) in db.session.query(Media.storage_key).filter(orphan)]
+    db.session.execute(delete(Media).where(orphan).execution_options(synchronize_session=False))
+    db.session.commit()
+    _remove_files(files)
+    return len(rows)
+
+def _purge_import_batches(skill: Skill, size: int) -> int:
+    rows = (db.session.query(ImportBatch.id, ImportBatch.storage_key)
+            .filter(ImportBatch.skill_id == skill.id).order_by(ImportBatch.id.asc()).limit(size).all())
+    if not rows:
+        return 0
+    db.session.execute(delete(ImportBatch).where(ImportBatch.id.in_([r.id for r in rows]))
+                       .execution_options(synchronize_session=False))
+    db.session.commit()
+    _remove_files(r.storage_key for r in rows)
+    return len(rows)
+
+def _steps(skill: Skill):
+    sid = skill.id
+    yield lambda n: _purge_attempts(skill, n)
+    yield lambda n: _purge_remediations(skill, n)
+    yield lambda n: _delete_chunk(Question, Question.skill_id == sid, n)
+    yield lambda n: _delete_chunk(StudentSkillStatus, StudentSkillStatus.skill_id == sid, n)
+    yield lambda n: _delete_chunk(StudentSkillStats, StudentSkillStats.skill_id == sid, n)
+    yield lambda n: _delete_chunk(SkillRollup, SkillRollup.skill_id == sid, n)
+    yield lambda n: _delete_chunk(ImportItem, ImportItem.batch_id.in_(
+        select(ImportBatch.id).where(ImportBatch.skill_id == sid)), n)
+    yield lambda n: _purge_import_batches(skill, n)
+
+def purge_skill(skill_id: int, chunk_size: int | None = None, max_chunks: int | None = None) -> bool:
+    """Delete a soft-deleted skill and everything under it. Returns False if the chunk budget ran out first."""
+    cfg = current_app.config
+    size = chunk_size or int(cfg.get("PURGE_CHUNK_SIZE", 500))
+    budget = max_chunks or int(cfg.get("PURGE_MAX_CHUNKS", 50))
+    skill = db.session.get(Skill, skill_id)
+    if skill is None or skill.deleted_at is None:
+        return True
+    for step in _steps(skill):
+        while True:
+            if budget <= 0:
+                return False
+            n = step(size)
+            if n:
+                budget -= 1  # steps that are already empty cost nothing, so a re-run always progresses
+            if n < size:
+                break
+    db.session.delete(skill)
+    db.session.commit()
+    return True
@@ -0,0 +1,134 @@
+"""On-demand, content-addressed attempt report PDFs.
+
+A report is rendered the first time someone downloads (or e-mails) it and is
+stored as ``REPORTS_DIR/<attempt id>-<sha256>.pdf``, where the hash covers
+everything the report prints: the attempt's answers and score, the student's
+name, their weakest skills, the skill's content version and the report
+template version. A repeat download is a file hit; any change to those inputs
+yields a new name, so stale PDFs are never served and simply age out through
+``evict`` (oldest-used first, sparing files used in the last
+``REPORT_EVICT_MIN_AGE`` seconds) once the directory exceeds its byte budget.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import tempfile
+import time
+from flask import current_app
+from app import db, stats
+from app.bundles import get_bundle
+from app.models import Attempt, Skill, User
+from app.reporting import TEMPLATE_VERSION, attempt_report_lines, generate_report_pdf, render_many
+
+REPORT_TITLE = "تقرير نتيجة الاختبار"
+
+def content_hash(attempt: Attempt, skill: Skill, student: User, weak: list[Skill]) -> str:
+    payload = {
+        "attempt": attempt.id,
+        "student": student.name_ar,
+        "weak": [(s.id, s.name_ar) for s in weak],
+        "answers": attempt.answers_json or {},
+        "score": attempt.score,
+        "time": attempt.time_seconds,
+        "skill_version": int(skill.content_version or 1),
+        "template": TEMPLATE_VERSION,
+    }
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def cached_path(attempt_id: int, digest: str) -> str:
+    return os.path.join(current_app.config["REPORTS_DIR"], f"{attempt_id}-{digest}.pdf")
+
+def report_lines(attempt: Attempt, student: User, skill: Skill, weak: list[Skill]) -> list[str]:
+    return attempt_report_lines(attempt, skill, student, get_bundle(skill).questions, [s.name_ar for s in weak])
+
+def _report(attempt: Attempt, student: User, skill: Skill) -> tuple[str, list[Skill]]:
+    weak = stats.weakest_skills(student.id)
+    return cached_path(attempt.id, content_hash(attempt, skill, student, weak)), weak
+
+def _touch(path: str):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def ensure_report_pdf(attempt: Attempt) -> str:
+    """Path of the attempt's report PDF, rendering it if it is not cached yet."""
+    skill = db.session.get(Skill, attempt.skill_id)
+    student = db.session.get(User, attempt.student_id)
+    path, weak = _report(attempt, student, skill)
+    if os.path.exists(path):
+        _touch(path)
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # render to a temp name and rename so concurrent readers never see half a file
+    fd, tmp = tempfile.mkstemp(suffix=".pdf.tmp", dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        generate_report_pdf(tmp, REPORT_TITLE, report_lines(attempt, student, skill, weak))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+def prerender(attempt_ids: list[int], workers: int | None = None) -> list[str]:
+    """Batch API: make sure these attempts' reports are cached, rendering misses in a process pool."""
+    attempts = Attempt.query.filter(Attempt.id.in_(attempt_ids), Attempt.status == "submitted").all()
+    students = {u.id: u for u in User.query.filter(User.id.in_({a.student_id for a in attempts})).all()}
+    skills = {s.id: s for s in Skill.query.filter(Skill.id.in_({a.skill_id for a in attempts})).all()}
+    paths, jobs = [], []
+    for a in attempts:
+        student, skill = students[a.student_id], skills[a.skill_id]
+        path, weak = _report(a, student, skill)
+        paths.append(path)
+        if not os.path.exists(path):
+            jobs.append((path, REPORT_TITLE, report_lines(a, student, skill, weak)))
+    render_many(jobs, workers=workers or current_app.config.get("REPORT_WORKERS") or None)
+    return paths
+
+def evict(max_bytes: int | None = None) -> int:
+    """Delete least recently used PDFs until the directory fits the budget. Returns files removed."""
+    if max_bytes is None:
+        max_bytes = int(current_app.config.get("REPORTS_DIR_MAX_BYTES", 0))
+    if max_bytes <= 0:
+        return 0
+    folder = current_app.config["REPORTS_DIR"]
+    # a file just rendered or hit may be about to be sent by a request
+    recent = time.time() - int(current_app.config.get("REPORT_EVICT_MIN_AGE", 300))
+    entries = []
+    with os.scandir(folder) as it:
+        for e in it:
+            if e.is_file() and e.name.endswith(".pdf"):
+                st = e.stat()
+                entries.append((st.st_mtime, st.st_size, e.path))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for mtime, size, path in sorted(entries):
+        if total <= max_bytes or mtime > recent:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+def remove_for_attempts(attempt_ids) -> int:
+    """Delete every cached PDF of these attempts (all content versions). Returns files removed."""
+    prefixes = {f"{i}-" for i in attempt_ids}
+    folder = current_app.config["REPORTS_DIR"]
+    if not prefixes or not os.path.isdir(folder):
+        return 0
+    removed = 0
+    with os.scandir(folder) as it:
+        for e in it:
+            if e.name.endswith(".pdf") and e.name[:e.name.find("-") + 1] in prefixes:
+                try:
+                    os.remove(e.path)
+                    removed += 1
+                except OSError:
+                    pass
+    return removed
@@ -1,21 +1,146 @@
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import arabic_reshaper
+from bidi.algorithm import get_display
 from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 
-def generate_report_pdf(path: str, title_ar: str, lines_ar: list[str]):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    c = canvas.Canvas(path, pagesize=A4)
+# Bump when the report layout changes so cached PDFs are regenerated.
+TEMPLATE_VERSION = 2
+
+FONT_NAME = "ReportArabic"
+FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/noto/NotoNaskhArabic-Regular.ttf",
+    "/usr/share/fonts/truetype/fonts-arabeyes/ae_AlMohanad.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+)
+_ARABIC = re.compile("[\u0600-\u06FF\u0750-\u077F\uFB50-\uFDFF\uFE70-\uFEFF]")
+
+def find_font(preferred: str | None = None) -> str | None:
+    for path in ((preferred,) if preferred else ()) + FONT_CANDIDATES:
+        if path and os.path.exists(path):
+            return path
+    return None
+
+@lru_cache(maxsize=4096)
+def shape(text: str) -> str:
+    """Join Arabic letters and reorder to visual order for drawing."""
+    if not text or not _ARABIC.search(text):
+        return text
+    return get_display(arabic_reshaper.reshape(text))
+
+class ReportEngine:
+    """Draws report PDFs; fonts and the page template are set up once per process."""
+
     width, height = A4
-    y = height - 50
-    c.setFont("Helvetica", 14)
-    c.drawRightString(width - 40, y, title_ar)
-    y -= 30
-    c.setFont("Helvetica", 11)
-    for line in lines_ar:
-        if y < 60:
-            c.showPage()
-            y = height - 50
-            c.setFont("Helvetica", 11)
-        c.drawRightString(width - 40, y, line)
-        y -= 18
-    c.save()
+    margin = 40
+    line_height = 18
+
+    def __init__(self, font_path: str | None = None):
+        path = find_font(font_path)
+        if path:
+            if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+                pdfmetrics.registerFont(TTFont(FONT_NAME, path))
+            self.font = FONT_NAME
+        else:
+            # no Arabic-capable font on this machine: text renders, glyphs will not
+            self.font = "Helvetica"
+        self.font_path = path
+        self.footer = shape("مدرسة الثغر — منصة قياس المهارات")
+
+    def _page(self, c, page_no: int):
+        c.setFont(self.font, 8)
+        c.drawString(self.margin, 30, str(page_no))
+        c.drawRightString(self.width - self.margin, 30, self.footer)
+        c.line(self.margin, 42, self.width - self.margin, 42)
+        c.setFont(self.font, 11)
+
+    def render(self, path: str, title: str, lines: list[str]) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        c = canvas.Canvas(path, pagesize=A4, pageCompression=1)
+        right = self.width - self.margin
+        page_no = 1
+        y = self.height - 50
+        c.setFont(self.font, 14)
+        c.drawRightString(right, y, shape(title))
+        y -= 30
+        self._page(c, page_no)
+        for line in lines:
+            if y < 60:
+                c.showPage()
+                page_no += 1
+                y = self.height - 50
+                self._page(c, page_no)
+            c.drawRightString(right, y, shape(line))
+            y -= self.line_height
+        c.save()
+        return path
+
+_engine: ReportEngine | None = None
+
+def get_engine(font_path: str | None = None) -> ReportEngine:
+    global _engine
+    if _engine is None:
+        if font_path is None:
+            try:
+                from flask import current_app
+                font_path = current_app.config.get("REPORT_FONT_PATH") or None
+            except RuntimeError:
+                font_path = None
+        _engine = ReportEngine(font_path)
+    return _engine
+
+def generate_report_pdf(path: str, title_ar: str, lines_ar: list[str]):
+    return get_engine().render(path, title_ar, lines_ar)
+
+def _pool_init(font_path: str | None):
+    get_engine(font_path)
+
+def _pool_render(job: tuple[str, str, list[str]]) -> str:
+    return get_engine().render(*job)
+
+def render_many(jobs: list[tuple[str, str, list[str]]], workers: int | None = None,
+                font_path: str | None = None) -> list[str]:
+    """Render (path, title, lines) jobs across a process pool; returns paths in order."""
+    if not jobs:
+        return []
+    if workers == 1 or len(jobs) == 1:
+        eng = get_engine(font_path)
+        return [eng.render(*j) for j in jobs]
+    font_path = font_path or get_engine().font_path
+    with ProcessPoolExecutor(max_workers=workers, initializer=_pool_init, initargs=(font_path,)) as pool:
+        chunk = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+        return list(pool.map(_pool_render, jobs, chunksize=chunk))
+
+def attempt_report_lines(attempt, skill, student, questions, weak_names: list[str]) -> list[str]:
+    passed = (attempt.score or 0) >= int(skill.pass_threshold or 60)
+    answers = attempt.answers_json or {}
+    ended = attempt.ended_at or attempt.created_at
+    lines = [
+        f"اسم الطالب: {student.name_ar} ({student.student_id})",
+        f"المهارة: {skill.name_ar}",
+        f"النتيجة: {attempt.score}% | الحالة: {'ناجح' if passed else 'راسب'}",
+        f"الوقت المستهلك: {attempt.time_seconds} ثانية",
+        f"التاريخ: {ended.strftime('%Y-%m-%d %H:%M UTC')}",
+        "—",
+        "تفاصيل الإجابات:",
+    ]
+    for q in questions:
+        a = answers.get(str(q.id), [])
+        ca = q.correct
+        lines.append(f"س: {q.prompt_ar[:120]}")
+        lines.append(f"إجابة الطالب: {', '.join(a) if a else '-'}")
+        lines.append(f"الإجابة الصحيحة: {', '.join(ca) if ca else '-'}")
+        lines.append(" ")
+
+    if weak_names:
+        lines.append("أضعف المهارات (الأكثر احتياجاً):")
+        lines.extend(f"- {n}" for n in weak_names)
+    return lines
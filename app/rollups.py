@@ -0,0 +1,104 @@
+"""Precomputed dashboard numbers per student, per teacher and per skill.
+
+``record_attempts`` folds submitted attempts into ``student_rollup``,
+``teacher_rollup`` and ``skill_rollup`` in the same transaction that submits
+them (the submit route and the deadline sweeper), so the chairman and teacher
+dashboards read a few indexed rows instead of averaging ``attempt``.
+``forget_attempts`` takes attempts back out before the purge deletes them,
+``move_student`` carries a student's totals over when they change teacher, and
+``rebuild`` recomputes all three tables from ``attempt``.
+"""
+from __future__ import annotations
+from sqlalchemy import case, delete, func, literal, select
+from app import db
+from app.dbutil import upsert
+from app.models import Attempt, Skill, SkillRollup, StudentRollup, TeacherRollup, User
+from app.utils import now_utc
+
+def _upsert_stmt(model, key: str):
+    t = model.__table__
+    stmt = upsert(t)
+    return stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={
+            "attempts_count": t.c.attempts_count + stmt.excluded.attempts_count,
+            "score_sum": t.c.score_sum + stmt.excluded.score_sum,
+            "passed_count": t.c.passed_count + stmt.excluded.passed_count,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+def _fold(model, key: str, totals: dict[int, list[int]]):
+    if not totals:
+        return
+    now = now_utc()
+    # rows in key order, so concurrent submits lock them in the same order
+    db.session.execute(_upsert_stmt(model, key), [
+        {key: k, "attempts_count": n, "score_sum": s, "passed_count": p, "updated_at": now}
+        for k, (n, s, p) in sorted(totals.items())
+    ])
+
+def _apply(rows, sign: int):
+    if not rows:
+        return
+    teacher_of = dict(db.session.execute(
+        select(User.id, User.teacher_id).where(User.id.in_({r[0] for r in rows}))).all())
+    by_student: dict[int, list[int]] = {}
+    by_teacher: dict[int, list[int]] = {}
+    by_skill: dict[int, list[int]] = {}
+    for student_id, skill_id, score, passed in rows:
+        for totals, k in ((by_student, student_id), (by_teacher, teacher_of.get(student_id)), (by_skill, skill_id)):
+            if k is None:
+                continue
+            t = totals.setdefault(k, [0, 0, 0])
+            t[0] += sign
+            t[1] += sign * int(score or 0)
+            t[2] += sign * int(bool(passed))
+    _fold(StudentRollup, "student_id", by_student)
+    _fold(TeacherRollup, "teacher_id", by_teacher)
+    _fold(SkillRollup, "skill_id", by_skill)
+
+def record_attempts(rows: list[tuple[int, int, int, bool]]):
+    """Add (student_id, skill_id, score, passed) tuples of newly submitted attempts. Does not commit."""
+    _apply(rows, 1)
+
+def record_attempt(attempt: Attempt, passed: bool):
+    record_attempts([(attempt.student_id, attempt.skill_id, attempt.score, passed)])
+
+def forget_attempts(rows: list[tuple[int, int, int, bool]]):
+    """Take submitted attempts that are about to be deleted back out. Does not commit."""
+    _apply(rows, -1)
+
+def move_student(student_id: int, old_teacher_id: int | None, new_teacher_id: int | None):
+    """Carry a student's totals from one teacher's rollup to another's. Does not commit."""
+    if old_teacher_id == new_teacher_id:
+        return
+    row = StudentRollup.query.filter_by(student_id=student_id).first()
+    if row is None or not row.attempts_count:
+        return
+    totals = [row.attempts_count, row.score_sum, row.passed_count]
+    if old_teacher_id:
+        _fold(TeacherRollup, "teacher_id", {old_teacher_id: [-x for x in totals]})
+    if new_teacher_id:
+        _fold(TeacherRollup, "teacher_id", {new_teacher_id: totals})
+
+def rebuild() -> int:
+    """Recompute every rollup from submitted attempts (pass marks use the skills' current thresholds). Commits."""
+    a, sk, u = Attempt.__table__, Skill.__table__, User.__table__
+    passed = case((a.c.score >= func.coalesce(func.nullif(sk.c.pass_threshold, 0), 60), 1), else_=0)
+    source = a.join(sk, sk.c.id == a.c.skill_id).join(u, u.c.id == a.c.student_id)
+    total = 0
+    for model, key, col in ((StudentRollup, "student_id", a.c.student_id),
+                            (TeacherRollup, "teacher_id", u.c.teacher_id),
+                            (SkillRollup, "skill_id", a.c.skill_id)):
+        db.session.execute(delete(model))
+        src = (select(col, func.count(a.c.id), func.coalesce(func.sum(a.c.score), 0),
+                      func.coalesce(func.sum(passed), 0), literal(now_utc()))
+               .select_from(source)
+               .where(a.c.status == "submitted", col.isnot(None))
+               .group_by(col))
+        res = db.session.execute(model.__table__.insert().from_select(
+            [key, "attempts_count", "score_sum", "passed_count", "updated_at"], src))
+        total += res.rowcount or 0
+    db.session.commit()
+    return total
@@ -0,0 +1,215 @@
+"""Bulk student roster import (CSV or XLSX).
+
+The whole file is parsed and validated first (required fields, duplicates in
+the file, students that already exist, unknown teachers); if any row is
+wrong nothing is written and every error is reported with its line number.
+A clean file is then provisioned in one transaction: passwords are hashed
+across a process pool (``iter_hashes``), users go in with chunked multi-row
+INSERTs, and each new student gets a ``student_skill_status`` row per skill
+with only the first skill unlocked.
+
+The chairman's upload only validates; the file is saved and ``run_import``
+does the hashing and inserts in the worker, recording progress on its
+``RosterImport`` row for the status page to poll.
+"""
+from __future__ import annotations
+import csv
+import io
+import os
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from flask import current_app
+from sqlalchemy import insert, select
+from werkzeug.security import generate_password_hash
+from app import db
+from app.jobs import heartbeat
+from app.models import RosterImport, Skill, StudentSkillStatus, User
+from app.storage import delete_stored, local_copy
+
+COLUMNS = {
+    "student_id": ("student_id", "student id", "رقم الطالب"),
+    "name": ("name", "name_ar", "الاسم", "اسم الطالب"),
+    "teacher": ("teacher", "المعلم"),
+    "password": ("password", "initial_password", "كلمة المرور"),
+}
+
+class RosterError(Exception):
+    pass
+
+@dataclass
+class RosterResult:
+    rows: list[dict] = field(default_factory=list)
+    errors: list[tuple[int, str]] = field(default_factory=list)  # (line, message)
+    created: int = 0
+
+def _cell(v) -> str:
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)  # Excel hands numeric ids back as floats
+    return "" if v is None else str(v).strip()
+
+def _read_csv(data: bytes) -> list[list[str]]:
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        text = data.decode("cp1256")  # Excel's "CSV" on Arabic Windows
+    return list(csv.reader(io.StringIO(text)))
+
+def _read_xlsx(data: bytes) -> list[list]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise RosterError("استيراد ملفات XLSX يتطلب الحزمة openpyxl؛ احفظ الملف بصيغة CSV.") from e
+    wb = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        return [list(r) for r in wb.worksheets[0].iter_rows(values_only=True)]
+    finally:
+        wb.close()
+
+def parse(filename: str, data: bytes) -> list[tuple[int, dict]]:
+    """(line number, {student_id, name, teacher, password}) for each non-empty row."""
+    table = _read_xlsx(data) if filename.lower().endswith(".xlsx") else _read_csv(data)
+    if not table:
+        raise RosterError("الملف فارغ.")
+    header = [_cell(h).lower() for h in table[0]]
+    index = {}
+    for key, aliases in COLUMNS.items():
+        index[key] = next((i for i, h in enumerate(header) if h in aliases), None)
+    if index["student_id"] is None or index["password"] is None:
+        raise RosterError("يجب أن يحتوي الملف على عمودي student_id و password.")
+    out = []
+    for line, raw in enumerate(table[1:], start=2):
+        values = {k: _cell(raw[i]) if i is not None and i < len(raw) else "" for k, i in index.items()}
+        if any(values.values()):
+            out.append((line, values))
+    return out
+
+def validate(rows: list[tuple[int, dict]]) -> RosterResult:
+    res = RosterResult()
+    max_rows = int(current_app.config.get("ROSTER_MAX_ROWS", 20000))
+    if len(rows) > max_rows:
+        res.errors.append((0, f"عدد الصفوف ({len(rows)}) أكبر من الحد المسموح ({max_rows})."))
+        return res
+    teachers = db.session.query(User.id, User.username, User.name_ar).filter_by(role="teacher").all()
+    by_key: dict[str, int | None] = {}
+    for t in teachers:
+        by_key[str(t.id)] = by_key[t.username.lower()] = t.id
+        # a name shared by two teachers is ambiguous
+        name = (t.name_ar or "").strip()
+        by_key[name] = None if name in by_key and by_key[name] != t.id else t.id
+
+    ids = [r["student_id"] for _, r in rows if r["student_id"]]
+    existing = set()
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        existing |= {s for (s,) in db.session.execute(select(User.student_id).where(User.student_id.in_(chunk)))}
+        existing |= {u[len("student_"):] for (u,) in db.session.execute(
+            select(User.username).where(User.username.in_([f"student_{s}" for s in chunk])))}
+
+    seen: dict[str, int] = {}
+    for line, r in rows:
+        sid = r["student_id"]
+        problems = []
+        if not sid:
+            problems.append("رقم الطالب مفقود")
+        elif sid in seen:
+            problems.append(f"رقم الطالب مكرر (السطر {seen[sid]})")
+        elif sid in existing:
+            problems.append("رقم الطالب موجود مسبقًا")
+        if not r["password"]:
+            problems.append("كلمة المرور مفقودة")
+        teacher_id = None
+        if r["teacher"]:
+            teacher_id = by_key.get(r["teacher"].lower(), by_key.get(r["teacher"]))
+            if teacher_id is None:
+                problems.append(f"المعلم غير معروف: {r['teacher']}")
+        if sid:
+            seen.setdefault(sid, line)
+        if problems:
+            res.errors.append((line, "، ".join(problems)))
+        else:
+            res.rows.append({"student_id": sid, "name_ar": r["name"] or f"طالب {sid}",
+                             "teacher_id": teacher_id, "password": r["password"]})
+    return res
+
+def iter_hashes(passwords: list[str], workers: int | None = None) -> Iterator[str]:
+    """``generate_password_hash`` for each password in order, across a process pool for large lists."""
+    if workers == 1 or len(passwords) < 32:
+        yield from (generate_password_hash(p) for p in passwords)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunk = max(1, len(passwords) // ((workers or os.cpu_count() or 1) * 4))
+        yield from pool.map(generate_password_hash, passwords, chunksize=chunk)
+
+def hash_many(passwords: list[str], workers: int | None = None) -> list[str]:
+    return list(iter_hashes(passwords, workers))
+
+def _workers() -> int | None:
+    return int(current_app.config.get("ROSTER_HASH_WORKERS", 0)) or None
+
+def provision(res: RosterResult, hashes: list[str] | None = None) -> int:
+    """Create the validated students and their skill statuses in one transaction. Commits.
+    ``hashes`` are the rows' password hashes when the caller has already computed them."""
+    size = int(current_app.config.get("ROSTER_CHUNK_SIZE", 1000))
+    if hashes is None:
+        hashes = hash_many([r["password"] for r in res.rows], workers=_workers())
+    skills = db.session.query(Skill.id).filter(Skill.deleted_at.is_(None)).order_by(Skill.order.asc(), Skill.id.asc()).all()
+    first_skill = skills[0].id if skills else None
+    users = [{"username": f"student_{r['student_id']}", "name_ar": r["name_ar"], "role": "student",
+              "student_id": r["student_id"], "teacher_id": r["teacher_id"], "password_hash": h}
+             for r, h in zip(res.rows, hashes)]
+    for i in range(0, len(users), size):
+        new_ids = db.session.scalars(insert(User).returning(User.id), users[i:i + size]).all()
+        statuses = [{"student_id": uid, "skill_id": sk.id, "unlocked": sk.id == first_skill, "completed": False}
+                    for uid in new_ids for sk in skills]
+        if statuses:
+            db.session.execute(insert(StudentSkillStatus), statuses)
+    db.session.commit()
+    res.created = len(users)
+    return res.created
+
+def import_roster(filename: str, data: bytes) -> RosterResult:
+    """Parse, validate and (only if every row is valid) provision. Raises RosterError for unreadable files."""
+    res = validate(parse(filename, data))
+    if res.rows and not res.errors:
+        provision(res)
+    return res
+
+def run_import(import_id: int) -> int:
+    """Provision a "processing" ``RosterImport`` and mark it "done" (or "failed"). Returns the number created.
+
+    The file is validated again, since students may have been added since the upload. Progress is
+    committed every ``ROSTER_CHUNK_SIZE`` hashes; the students and the "done" status commit together,
+    and the uploaded file (it holds plaintext passwords) is deleted either way."""
+    job = db.session.get(RosterImport, import_id)
+    if job is None or job.status != "processing":
+        return 0
+    size = int(current_app.config.get("ROSTER_CHUNK_SIZE", 1000))
+    try:
+        with local_copy(job.storage_key) as path:
+            with open(path, "rb") as fh:
+                res = validate(parse(job.filename, fh.read()))
+        if res.errors:
+            raise RosterError("؛ ".join(f"السطر {line}: {msg}" if line else msg for line, msg in res.errors[:20]))
+        job.progress_total, job.progress_done = len(res.rows), 0
+        db.session.commit()
+        hashes = []
+        for h in iter_hashes([r["password"] for r in res.rows], workers=_workers()):
+            hashes.append(h)
+            if len(hashes) % size == 0:
+                job.progress_done = len(hashes)
+                heartbeat()  # a large roster can outlast JOB_LOCK_TIMEOUT
+                db.session.commit()
+        job.status, job.progress_done, job.created = "done", len(hashes), len(hashes)
+        provision(res, hashes)
+    except Exception as e:
+        # a file that does not validate now will not on a retry either
+        db.session.rollback()
+        if not isinstance(e, RosterError):
+            current_app.logger.exception("Roster import %s failed", import_id)
+        job = db.session.get(RosterImport, import_id)
+        job.status, job.error = "failed", (str(e) if isinstance(e, RosterError) else f"{type(e).__name__}: {e}")[:2000]
+    delete_stored(job.storage_key)
+    job.storage_key = None
+    db.session.commit()
+    return job.created
@@ -1,8 +1,12 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, current_app, jsonify
 from flask_login import login_required, current_user
-from sqlalchemy import func
-from app import db
-from app.models import User, Skill, Question, Attempt
+from app import attempt_answers, db, exports, item_analysis, roster, sqltrace
+from app.models import User, Skill, Question, RosterImport, SkillRollup, StudentRollup, TeacherRollup
+from app.bundles import bump_version
+from app.pagination import paginate
+from app.storage import save_upload
+from app.jobs import enqueue
+from app.utils import now_utc
 
 bp = Blueprint("chairman", __name__)
 
@@ -10,26 +14,48 @@ def _require_chairman():
     if current_user.role != "chairman":
         abort(403)
 
+def _user_filters(query, q: str, teacher_id: int | None = None):
+    if q:
+        like = f"%{q}%"
+        query = query.filter(User.name_ar.ilike(like) | User.username.ilike(like) | User.student_id.ilike(like))
+    if teacher_id:
+        query = query.filter(User.teacher_id == teacher_id)
+    return query
+
 @bp.get("/dashboard")
 @login_required
 def dashboard():
     _require_chairman()
-    teachers = User.query.filter_by(role="teacher").all()
-    students = User.query.filter_by(role="student").all()
-    skills = Skill.query.order_by(Skill.order.asc()).all()
-    sperf = (db.session.query(User.id, User.name_ar, User.student_id, func.avg(Attempt.score))
-             .outerjoin(Attempt, Attempt.student_id==User.id)
-             .filter(User.role=="student")
-             .group_by(User.id).all())
-    return render_template("chairman_dashboard.html", teachers=teachers, students=students, skills=skills, sperf=sperf)
+    q = (request.args.get("q") or "").strip()
+    teacher_id = request.args.get("teacher_id", type=int)
+    teacher_count = User.query.filter_by(role="teacher").count()
+    student_count = User.query.filter_by(role="student").count()
+    # every number below comes from the rollup tables (app.rollups), never from attempt
+    teachers = (db.session.query(User.id, User.name_ar, TeacherRollup)
+                .outerjoin(TeacherRollup, TeacherRollup.teacher_id == User.id)
+                .filter(User.role == "teacher").order_by(User.name_ar.asc()).all())
+    skills = (db.session.query(Skill, SkillRollup).outerjoin(SkillRollup, SkillRollup.skill_id == Skill.id)
+              .filter(Skill.deleted_at.is_(None)).order_by(Skill.order.asc()).all())
+    sperf = (db.session.query(User.id, User.name_ar, User.student_id, User.created_at, StudentRollup)
+             .outerjoin(StudentRollup, StudentRollup.student_id == User.id)
+             .filter(User.role == "student"))
+    page = paginate(_user_filters(sperf, q, teacher_id), User.created_at, User.id)
+    return render_template("chairman_dashboard.html", teacher_count=teacher_count, student_count=student_count,
+                           teachers=teachers, skills=skills, sperf=page, q=q, teacher_id=teacher_id)
 
 @bp.get("/users")
 @login_required
 def users():
     _require_chairman()
-    teachers = User.query.filter_by(role="teacher").order_by(User.id.desc()).all()
-    students = User.query.filter_by(role="student").order_by(User.id.desc()).all()
-    return render_template("chairman_users.html", teachers=teachers, students=students)
+    q = (request.args.get("q") or "").strip()
+    teacher_id = request.args.get("teacher_id", type=int)
+    # the "add student" form needs every teacher; the lists below are paged
+    all_teachers = User.query.with_entities(User.id, User.name_ar).filter_by(role="teacher").order_by(User.name_ar.asc()).all()
+    teachers = paginate(_user_filters(User.query.filter_by(role="teacher"), q), User.created_at, User.id, param="t_after")
+    students = paginate(_user_filters(User.query.filter_by(role="student"), q, teacher_id),
+                        User.created_at, User.id, param="s_after")
+    return render_template("chairman_users.html", all_teachers=all_teachers, teachers=teachers, students=students,
+                           q=q, teacher_id=teacher_id)
 
 @bp.post("/users/teacher")
 @login_required
@@ -72,11 +98,55 @@ def create_student():
     flash("تم إنشاء الطالب وإضافته للقائمة.", "success")
     return redirect(url_for("chairman.users"))
 
+@bp.post("/users/import")
+@login_required
+def import_roster():
+    _require_chairman()
+    f = request.files.get("file")
+    if not f or not f.filename:
+        flash("الرجاء اختيار ملف.", "danger")
+        return redirect(url_for("chairman.users"))
+    try:
+        res = roster.validate(roster.parse(f.filename, f.read()))
+    except roster.RosterError as e:
+        flash(str(e), "danger")
+        return redirect(url_for("chairman.users"))
+    if res.errors:
+        return render_template("chairman_roster_errors.html", errors=res.errors, valid=len(res.rows)), 400
+    if not res.rows:
+        flash("لا توجد صفوف في الملف.", "danger")
+        return redirect(url_for("chairman.users"))
+
+    # hashing thousands of passwords takes minutes: the worker provisions (app.roster.run_import)
+    f.stream.seek(0)
+    saved = save_upload(f, "rosters")
+    job = RosterImport(created_by=current_user.id, filename=saved["filename"], storage_key=saved["storage_key"],
+                       status="processing", progress_total=len(res.rows))
+    db.session.add(job)
+    db.session.flush()
+    enqueue("import_roster", {"roster_import_id": job.id}, ref=f"roster:{job.id}")
+    db.session.commit()
+    return redirect(url_for("chairman.roster_import", import_id=job.id))
+
+@bp.get("/users/import/<int:import_id>")
+@login_required
+def roster_import(import_id: int):
+    _require_chairman()
+    job = RosterImport.query.get_or_404(import_id)
+    return render_template("chairman_roster_import.html", job=job)
+
+@bp.get("/users/import/<int:import_id>/progress")
+@login_required
+def roster_import_progress(import_id: int):
+    _require_chairman()
+    job = RosterImport.query.get_or_404(import_id)
+    return jsonify({"status": job.status, "done": job.progress_done or 0, "total": job.progress_total})
+
 @bp.get("/skills")
 @login_required
 def skills():
     _require_chairman()
-    skills = Skill.query.order_by(Skill.order.asc()).all()
+    skills = Skill.visible().order_by(Skill.order.asc()).all()
     return render_template("chairman_skills.html", skills=skills)
 
 @bp.post("/skills")
@@ -98,7 +168,7 @@ def skill_create():
 @login_required
 def skill_edit(skill_id: int):
     _require_chairman()
-    s = Skill.query.get_or_404(skill_id)
+    s = Skill.visible().filter_by(id=skill_id).first_or_404()
     if request.method == "GET":
         return render_template("skill_form.html", skill=s, action=url_for("chairman.skill_edit", skill_id=s.id))
     s.name_ar = request.form.get("name_ar") or s.name_ar
@@ -106,6 +176,7 @@ def skill_edit(skill_id: int):
     s.order = int(request.form.get("order") or s.order or 0)
     s.pass_threshold = int(request.form.get("pass_threshold") or s.pass_threshold or 60)
     s.time_limit_min = int(request.form.get("time_limit_min") or s.time_limit_min or 10)
+    bump_version(s.id)
     db.session.commit()
     flash("تم تحديث المهارة.", "success")
     return redirect(url_for("chairman.skills"))
@@ -114,24 +185,10 @@ def skill_edit(skill_id: int):
 @login_required
 def skill_delete(skill_id: int):
     _require_chairman()
-    # delete dependents to avoid FK issues in Postgres
-    from app.models import Attempt, Report, Remediation, ImportBatch, ImportItem, StudentSkillStatus
-    Question.query.filter_by(skill_id=skill_id).delete(synchronize_session=False)
-
-    attempt_ids = [a.id for a in Attempt.query.filter_by(skill_id=skill_id).all()]
-    if attempt_ids:
-        Report.query.filter(Report.attempt_id.in_(attempt_ids)).delete(synchronize_session=False)
-    Attempt.query.filter_by(skill_id=skill_id).delete(synchronize_session=False)
-    Remediation.query.filter_by(skill_id=skill_id).delete(synchronize_session=False)
-    StudentSkillStatus.query.filter_by(skill_id=skill_id).delete(synchronize_session=False)
-
-    batch_ids = [b.id for b in ImportBatch.query.filter_by(skill_id=skill_id).all()]
-    if batch_ids:
-        ImportItem.query.filter(ImportItem.batch_id.in_(batch_ids)).delete(synchronize_session=False)
-    ImportBatch.query.filter_by(skill_id=skill_id).delete(synchronize_session=False)
-
-    s = Skill.query.get_or_404(skill_id)
-    db.session.delete(s)
+    s = Skill.visible().filter_by(id=skill_id).first_or_404()
+    # hide now; attempts, reports and uploads are removed in chunks by the worker (app.purge)
+    s.deleted_at = now_utc()
+    enqueue("purge_skill", {"skill_id": s.id}, ref=f"skill:{s.id}")
     db.session.commit()
     flash("تم حذف المهارة.", "success")
     return redirect(url_for("chairman.skills"))
@@ -140,16 +197,21 @@ def skill_delete(skill_id: int):
 @login_required
 def question_tool():
     _require_chairman()
-    skills = Skill.query.order_by(Skill.order.asc()).all()
+    skills = Skill.visible().order_by(Skill.order.asc()).all()
     skill_id = request.args.get("skill_id", type=int)
+    teacher_id = request.args.get("teacher_id", type=int)
     qs = Question.query.filter_by(skill_id=skill_id).order_by(Question.id.desc()).all() if skill_id else []
-    return render_template("chairman_questions.html", skills=skills, skill_id=skill_id, questions=qs)
+    skill = next((s for s in skills if s.id == skill_id), None)
+    analysis = item_analysis.analyze(skill, teacher_id) if skill else None
+    teachers = User.query.with_entities(User.id, User.name_ar).filter_by(role="teacher").order_by(User.name_ar.asc()).all()
+    return render_template("chairman_questions.html", skills=skills, skill_id=skill_id, questions=qs,
+                           analysis=analysis, teachers=teachers, teacher_id=teacher_id)
 
 @bp.route("/questions/new", methods=["GET","POST"])
 @login_required
 def question_new():
     _require_chairman()
-    skills = Skill.query.order_by(Skill.order.asc()).all()
+    skills = Skill.visible().order_by(Skill.order.asc()).all()
     if request.method == "GET":
         return render_template("question_form.html", skills=skills, q=None, action=url_for("chairman.question_new"))
     # create
@@ -180,6 +242,7 @@ def question_new():
         meta={"checkpoint_seconds": int(request.form.get("checkpoint_seconds") or 0)}
     q = Question(skill_id=skill_id, qtype=qtype, prompt_ar=prompt_ar, options_json=options, correct_json=correct_json, media_json=media, meta_json=meta)
     db.session.add(q)
+    bump_version(skill_id)
     db.session.commit()
     flash("تم إضافة السؤال.", "success")
     return redirect(url_for("chairman.question_tool", skill_id=skill_id))
@@ -189,10 +252,11 @@ def question_new():
 def question_edit(question_id: int):
     _require_chairman()
     q = Question.query.get_or_404(question_id)
-    skills = Skill.query.order_by(Skill.order.asc()).all()
+    skills = Skill.visible().order_by(Skill.order.asc()).all()
     if request.method == "GET":
         return render_template("question_form.html", skills=skills, q=q, action=url_for("chairman.question_edit", question_id=q.id))
     # update
+    old_skill_id = q.skill_id
     q.skill_id = int(request.form.get("skill_id") or q.skill_id)
     q.qtype = request.form.get("qtype") or q.qtype
     q.prompt_ar = request.form.get("prompt_ar") or q.prompt_ar
@@ -219,6 +283,7 @@ def question_edit(question_id: int):
         q.meta_json={"checkpoint_seconds": int(request.form.get("checkpoint_seconds") or 0)}
     else:
         q.media_json=None; q.meta_json=None
+    bump_version(q.skill_id, old_skill_id)
     db.session.commit()
     flash("تم حفظ السؤال.", "success")
     return redirect(url_for("chairman.question_tool", skill_id=q.skill_id))
@@ -229,7 +294,46 @@ def question_delete(question_id: int):
     _require_chairman()
     q = Question.query.get_or_404(question_id)
     sid = q.skill_id
+    attempt_answers.drop_question(q.id)
     db.session.delete(q)
+    bump_version(sid)
     db.session.commit()
     flash("تم حذف السؤال.", "success")
     return redirect(url_for("chairman.question_tool", skill_id=sid))
+
+@bp.get("/debug/endpoints")
+@login_required
+def debug_endpoints():
+    _require_chairman()
+    endpoints = sorted(f"{r.rule}  →  {r.endpoint}" for r in current_app.url_map.iter_rules())
+    return render_template("chairman_debug_endpoints.html", endpoints=endpoints)
+
+@bp.get("/debug/sql")
+@login_required
+def debug_sql():
+    _require_chairman()
+    recent = list(reversed(sqltrace.RECENT))
+    by_endpoint: dict[str, dict] = {}
+    for r in recent:
+        e = by_endpoint.setdefault(r["endpoint"] or r["path"], {"requests": 0, "max_queries": 0, "total_ms": 0.0, "repeated": 0})
+        e["requests"] += 1
+        e["max_queries"] = max(e["max_queries"], r["queries"])
+        e["total_ms"] += r["ms"]
+        e["repeated"] += 1 if r["repeated"] else 0
+    summary = sorted(by_endpoint.items(), key=lambda kv: kv[1]["max_queries"], reverse=True)
+    return render_template("chairman_debug_sql.html", enabled=current_app.config.get("SQL_INSTRUMENT"),
+                           threshold=current_app.config.get("SQL_N_PLUS_ONE_THRESHOLD", 5),
+                           summary=summary, recent=recent)
+
+@bp.get("/export/<dataset>")
+@login_required
+def export(dataset: str):
+    _require_chairman()
+    fmt = request.args.get("format") or "csv"
+    if dataset not in exports.DATASETS or fmt not in exports.FORMATS:
+        abort(404)
+    try:
+        return exports.export_response(dataset, fmt, skill_id=request.args.get("skill_id", type=int))
+    except exports.ExportUnavailable:
+        flash("تصدير Parquet غير متاح على هذا الخادم.", "danger")
+        return redirect(url_for("chairman.dashboard"))
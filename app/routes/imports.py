@@ -1,12 +1,13 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, jsonify
 from flask_login import login_required, current_user
 from app import db
 from app.models import Skill, ImportBatch, ImportItem, Question
 from app.storage import save_upload
+from app.bundles import bump_version
+from app.jobs import enqueue
+from app.pagination import paginate
 from app.utils import ensure_allowed_ext
 import os
-import fitz
-from docx import Document
 
 bp = Blueprint("imports", __name__)
 
@@ -20,9 +21,16 @@ def _can_manage():
 def index():
     if not _can_manage():
         abort(403)
-    skills = Skill.query.order_by(Skill.order.asc()).all()
-    batches = ImportBatch.query.order_by(ImportBatch.id.desc()).all()
-    return render_template("import_index.html", skills=skills, batches=batches)
+    skills = Skill.visible().order_by(Skill.order.asc()).all()
+    skill_id = request.args.get("skill_id", type=int)
+    status = request.args.get("status") or ""
+    query = ImportBatch.query
+    if skill_id:
+        query = query.filter(ImportBatch.skill_id == skill_id)
+    if status:
+        query = query.filter(ImportBatch.status == status)
+    batches = paginate(query, ImportBatch.created_at, ImportBatch.id)
+    return render_template("import_index.html", skills=skills, batches=batches, skill_id=skill_id, status=status)
 
 @bp.post("/upload")
 @login_required
@@ -43,32 +51,15 @@ def upload():
     source_type = "pdf" if lower.endswith(".pdf") else "docx"
     saved = save_upload(f, "imports")
 
-    batch = ImportBatch(created_by=current_user.id, skill_id=skill_id, filename=os.path.basename(f.filename), source_type=source_type)
+    # extraction runs in the worker (app.doc_import.extract_batch); the review page polls its progress
+    batch = ImportBatch(created_by=current_user.id, skill_id=skill_id, filename=os.path.basename(f.filename),
+                        source_type=source_type, status="processing", storage_key=saved["storage_key"])
     db.session.add(batch)
+    db.session.flush()
+    enqueue("extract_import", {"batch_id": batch.id}, ref=f"import:{batch.id}")
     db.session.commit()
 
-    blocks = []
-    if source_type == "docx":
-        doc = Document(saved["storage_key"])
-        for p in doc.paragraphs:
-            txt = (p.text or "").strip()
-            if txt:
-                blocks.append(txt)
-    else:
-        doc = fitz.open(saved["storage_key"])
-        for page in doc:
-            txt = (page.get_text() or "").strip()
-            for part in [x.strip() for x in txt.split("\n\n") if x.strip()]:
-                blocks.append(part)
-
-    if not blocks:
-        blocks = ["(لم يتم استخراج نص. الرجاء إدخال الأسئلة يدوياً)"]
-
-    for b in blocks[:200]:
-        db.session.add(ImportItem(batch_id=batch.id, raw_text=b))
-    db.session.commit()
-
-    flash("تم إنشاء مسودة استيراد. الرجاء مراجعة البنود.", "success")
+    flash("تم رفع الملف وجارٍ استخراج البنود.", "success")
     return redirect(url_for("imports.review", batch_id=batch.id))
 
 @bp.get("/<int:batch_id>/review")
@@ -77,17 +68,32 @@ def review(batch_id: int):
     if not _can_manage():
         abort(403)
     batch = ImportBatch.query.get_or_404(batch_id)
-    items = ImportItem.query.filter_by(batch_id=batch.id).order_by(ImportItem.id.asc()).all()
+    items = []
+    if batch.status != "processing":
+        items = ImportItem.query.filter_by(batch_id=batch.id).order_by(ImportItem.id.asc()).all()
     skill = Skill.query.get(batch.skill_id)
     return render_template("import_review.html", batch=batch, items=items, skill=skill)
 
+@bp.get("/<int:batch_id>/progress")
+@login_required
+def progress(batch_id: int):
+    if not _can_manage():
+        abort(403)
+    batch = ImportBatch.query.get_or_404(batch_id)
+    return jsonify({"status": batch.status, "done": batch.progress_done or 0, "total": batch.progress_total})
+
 @bp.post("/<int:batch_id>/apply")
 @login_required
 def apply(batch_id: int):
     if not _can_manage():
         abort(403)
     batch = ImportBatch.query.get_or_404(batch_id)
+    if batch.status == "processing":
+        flash("لم يكتمل استخراج البنود بعد.", "danger")
+        return redirect(url_for("imports.review", batch_id=batch.id))
     items = ImportItem.query.filter_by(batch_id=batch.id).order_by(ImportItem.id.asc()).all()
+    # the urlencoded form (4 fields per item, up to IMPORT_MAX_ITEMS) is exempt from werkzeug's form
+    # size and part limits only from 3.1.9 on, which requirements.txt pins
     created = 0
     for it in items:
         qtype = request.form.get(f"type_{it.id}") or "short"
@@ -111,6 +117,7 @@ def apply(batch_id: int):
         db.session.add(Question(skill_id=batch.skill_id, qtype=qtype, prompt_ar=prompt, options_json=options, correct_json=correct))
         created += 1
     batch.status = "completed"
+    bump_version(batch.skill_id)
     db.session.commit()
     flash(f"تم اعتماد الاستيراد وإنشاء {created} سؤالاً.", "success")
     return redirect(url_for("imports.index"))
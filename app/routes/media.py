@@ -1,7 +1,9 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, abort
 from flask_login import login_required, current_user
 from app import db
-from app.models import Media, Report, Attempt
+from app.models import Media, Report, Attempt, User
+from app.pagination import paginate
+from app.report_cache import ensure_report_pdf
 from app.storage import save_upload
 from app.utils import ensure_allowed_ext
 import os
@@ -9,6 +11,7 @@ import os
 bp = Blueprint("media", __name__)
 
 ALLOWED_MEDIA_EXT = {".png",".jpg",".jpeg",".gif",".webp",".mp4",".webm",".pdf",".docx",".ppt",".pptx"}
+MEDIA_KINDS = {"image": "image/%", "video": "video/%", "application": "application/%"}
 
 def _can_manage():
     return current_user.is_authenticated and current_user.role in ("chairman","teacher")
@@ -18,8 +21,15 @@ def _can_manage():
 def library():
     if not _can_manage():
         abort(403)
-    items = Media.query.order_by(Media.id.desc()).all()
-    return render_template("media_library.html", items=items)
+    q = (request.args.get("q") or "").strip()
+    kind = request.args.get("kind") or ""
+    query = Media.query
+    if q:
+        query = query.filter(Media.filename.ilike(f"%{q}%"))
+    if kind in MEDIA_KINDS:
+        query = query.filter(Media.mime.like(MEDIA_KINDS[kind]))
+    items = paginate(query, Media.created_at, Media.id)
+    return render_template("media_library.html", items=items, q=q, kind=kind)
 
 @bp.post("/upload")
 @login_required
@@ -57,15 +67,17 @@ def file(media_id: int):
 @bp.get("/report/<int:attempt_id>")
 @login_required
 def report(attempt_id: int):
-    rep = Report.query.filter_by(attempt_id=attempt_id).first_or_404()
-    attempt = Attempt.query.get(rep.attempt_id)
-    if current_user.role == "teacher" and rep.teacher_id != current_user.id:
-        abort(403)
-    if current_user.role == "student" and attempt and attempt.student_id != current_user.id:
+    attempt = Attempt.query.get_or_404(attempt_id)
+    if attempt.status != "submitted":
+        abort(404)
+    if current_user.role == "teacher":
+        rep = Report.query.filter_by(attempt_id=attempt.id).first()
+        owner = rep.teacher_id if rep else db.session.get(User, attempt.student_id).teacher_id
+        if owner != current_user.id:
+            abort(403)
+    if current_user.role == "student" and attempt.student_id != current_user.id:
         abort(403)
     if current_user.role not in ("teacher","student","chairman"):
         abort(403)
-    path = rep.storage_key
-    if path and os.path.exists(path):
-        return send_file(path, as_attachment=True, download_name=f"report_{attempt_id}.pdf")
-    abort(404)
+    path = ensure_report_pdf(attempt)
+    return send_file(path, as_attachment=True, download_name=f"report_{attempt_id}.pdf")
@@ -1,12 +1,16 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
+import json
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, jsonify
 from flask_login import login_required, current_user
-from sqlalchemy import func
+from sqlalchemy import DateTime, and_, func, literal, select, update
+from sqlalchemy.orm.attributes import set_committed_value
 from app import db
-from app.models import User, Skill, StudentSkillStatus, Question, Attempt, Report, Remediation
-from app.utils import iso_week_key, now_utc
-from app.reporting import generate_report_pdf
-from app.mailer import send_email
-import os
+from app.dbutil import add_minutes, json_merge, upsert
+from app.models import User, Skill, StudentSkillStatus, Attempt, Remediation
+from app.utils import iso_week_key, load_draft, now_utc
+from app.jobs import enqueue
+from app.bundles import get_bundle
+from app.pagination import paginate
+from app import attempt_answers, rollups, stats
 
 bp = Blueprint("student", __name__)
 
@@ -30,7 +34,9 @@ def select_teacher_post():
     if not teacher:
         flash("الرجاء اختيار معلم صحيح.", "danger")
         return redirect(url_for("student.select_teacher"))
-    current_user.teacher_id = teacher.id
+    user = current_user.row()
+    rollups.move_student(user.id, user.teacher_id, teacher.id)
+    user.teacher_id = teacher.id
     db.session.commit()
     flash("تم حفظ المعلم بنجاح.", "success")
     return redirect(url_for("student.dashboard"))
@@ -41,41 +47,83 @@ def dashboard():
     _require_student()
     statuses = StudentSkillStatus.query.filter_by(student_id=current_user.id).all()
     skill_ids = [s.skill_id for s in statuses if s.unlocked]
-    skills = Skill.query.filter(Skill.id.in_(skill_ids)).order_by(Skill.order.asc()).all() if skill_ids else []
-    attempts = Attempt.query.filter_by(student_id=current_user.id).order_by(Attempt.id.desc()).all()
-    rem = Remediation.query.filter_by(student_id=current_user.id).order_by(Remediation.created_at.desc()).all()
-    return render_template("student_dashboard.html", skills=skills, statuses=statuses, attempts=attempts, remediations=rem)
-
-def _can_attempt(student_id: int, skill_id: int) -> tuple[bool,str]:
+    skills = Skill.visible().filter(Skill.id.in_(skill_ids)).order_by(Skill.order.asc()).all() if skill_ids else []
+    attempts = paginate(Attempt.query.filter_by(student_id=current_user.id), Attempt.created_at, Attempt.id)
+    rem = paginate(Remediation.query.filter_by(student_id=current_user.id), Remediation.created_at, Remediation.id,
+                   param="rem_after")
+    skill_stats = stats.stats_for_student(current_user.id)
+    return render_template("student_dashboard.html", skills=skills, statuses=statuses, attempts=attempts, remediations=rem, skill_stats=skill_stats)
+
+def _insert_attempt(student_id: int, skill_id: int, wk: str, attempt_no: int) -> int | None:
+    """INSERT … SELECT the attempt if the skill is unlocked for the student. None on conflict or if locked."""
+    a, st, sk = Attempt.__table__, StudentSkillStatus.__table__, Skill.__table__
+    now = literal(now_utc(), DateTime)
+    src = (select(literal(student_id), sk.c.id, literal(wk), literal(attempt_no), literal("in_progress"),
+                  now, add_minutes(now, func.coalesce(sk.c.time_limit_min, 10)), literal(0), literal(0), now)
+           .select_from(sk.join(st, and_(st.c.skill_id == sk.c.id, st.c.student_id == student_id)))
+           .where(sk.c.id == skill_id, sk.c.deleted_at.is_(None), st.c.unlocked.is_(True)))
+    stmt = (upsert(a)
+            .from_select(["student_id", "skill_id", "week_key", "attempt_no", "status",
+                          "started_at", "deadline_at", "score", "time_seconds", "created_at"], src)
+            .on_conflict_do_nothing(index_elements=["student_id", "skill_id", "week_key", "attempt_no"])
+            .returning(a.c.id))
+    return db.session.execute(stmt).scalar()
+
+def _start_attempt(student_id: int, skill_id: int) -> tuple[int | None, str]:
+    """Start (or resume) this week's attempt in one transaction.
+
+    Returns ``(attempt_id, "")`` or ``(None, reason)`` with reason "locked" or "used".
+    Writing first means concurrent starts serialize on the unique constraint
+    instead of racing a read-then-insert.
+    """
     wk = iso_week_key()
-    existing = Attempt.query.filter_by(student_id=student_id, skill_id=skill_id, week_key=wk).first()
-    if not existing:
-        return True, wk
-    status = StudentSkillStatus.query.filter_by(student_id=student_id, skill_id=skill_id).first()
-    if status and status.extra_attempt_week == wk:
-        status.extra_attempt_week = None
+    attempt_id = _insert_attempt(student_id, skill_id, wk, 1)
+    if attempt_id:
+        db.session.commit()
+        return attempt_id, ""
+
+    latest = (db.session.query(Attempt.id, Attempt.status, Attempt.attempt_no)
+              .filter_by(student_id=student_id, skill_id=skill_id, week_key=wk)
+              .order_by(Attempt.attempt_no.desc()).first())
+    if latest is None:
+        db.session.rollback()
+        return None, "locked"
+    if latest.status == "in_progress":
+        db.session.rollback()
+        return latest.id, ""
+
+    # consume the teacher's extra attempt and create the next attempt together
+    consumed = db.session.execute(
+        update(StudentSkillStatus)
+        .where(StudentSkillStatus.student_id == student_id, StudentSkillStatus.skill_id == skill_id,
+               StudentSkillStatus.unlocked.is_(True), StudentSkillStatus.extra_attempt_week == wk)
+        .values(extra_attempt_week=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+    attempt_id = _insert_attempt(student_id, skill_id, wk, latest.attempt_no + 1) if consumed else None
+    if attempt_id:
         db.session.commit()
-        return True, wk
-    return False, wk
+        return attempt_id, ""
+    db.session.rollback()
+
+    # a concurrent request may have just started the extra attempt: resume it
+    resumed = (db.session.query(Attempt.id)
+               .filter_by(student_id=student_id, skill_id=skill_id, week_key=wk, status="in_progress")
+               .order_by(Attempt.attempt_no.desc()).first())
+    return (resumed.id, "") if resumed else (None, "used")
 
 @bp.get("/skill/<int:skill_id>/start")
 @login_required
 def start(skill_id: int):
     _require_student()
-    status = StudentSkillStatus.query.filter_by(student_id=current_user.id, skill_id=skill_id).first()
-    if not status or not status.unlocked:
+    attempt_id, reason = _start_attempt(current_user.id, skill_id)
+    if reason == "locked":
         flash("هذه المهارة غير متاحة حالياً.", "danger")
         return redirect(url_for("student.dashboard"))
-
-    ok, wk = _can_attempt(current_user.id, skill_id)
-    if not ok:
+    if reason == "used":
         flash("لا يمكن إعادة الاختبار لهذه المهارة هذا الأسبوع.", "warning")
         return redirect(url_for("student.dashboard"))
-
-    attempt = Attempt(student_id=current_user.id, skill_id=skill_id, week_key=wk, status="in_progress")
-    db.session.add(attempt)
-    db.session.commit()
-    return redirect(url_for("student.take", attempt_id=attempt.id))
+    return redirect(url_for("student.take", attempt_id=attempt_id))
 
 @bp.get("/attempt/<int:attempt_id>")
 @login_required
@@ -87,9 +135,47 @@ def take(attempt_id: int):
     if attempt.status == "submitted":
         return redirect(url_for("student.attempt_result", attempt_id=attempt.id))
 
-    skill = Skill.query.get(attempt.skill_id)
-    questions = Question.query.filter_by(skill_id=skill.id).order_by(Question.id.asc()).all()
-    return render_template("student_take_test.html", attempt=attempt, skill=skill, questions=questions)
+    skill = db.session.get(Skill, attempt.skill_id)
+    bundle = get_bundle(skill)
+    return render_template("student_take_test.html", attempt=attempt, skill=skill, bundle=bundle,
+                           draft=load_draft(attempt.draft_answers_json))
+
+MAX_DRAFT_KEYS = 500
+MAX_DRAFT_VALUE = 5000
+
+def _clean_draft_changes(changes) -> dict | None:
+    """Validate an autosave delta: {"<question id>": [str, ...]}. None if malformed."""
+    if not isinstance(changes, dict) or len(changes) > MAX_DRAFT_KEYS:
+        return None
+    out = {}
+    for qid, vals in changes.items():
+        if not str(qid).isdigit() or not isinstance(vals, list) or len(vals) > 50:
+            return None
+        out[str(qid)] = [str(v)[:MAX_DRAFT_VALUE] for v in vals if v is not None]
+    return out
+
+@bp.post("/attempt/<int:attempt_id>/autosave")
+@login_required
+def autosave(attempt_id: int):
+    _require_student()
+    changes = _clean_draft_changes((request.get_json(silent=True) or {}).get("changes"))
+    if changes is None:
+        return jsonify({"ok": False, "error": "bad_request"}), 400
+    if not changes:
+        return jsonify({"ok": True})
+    now = now_utc()
+    # one UPDATE that merges only the changed answers into the stored draft
+    res = db.session.execute(
+        update(Attempt)
+        .where(Attempt.id == attempt_id, Attempt.student_id == current_user.id, Attempt.status == "in_progress")
+        .values(draft_answers_json=json_merge(Attempt.draft_answers_json, json.dumps(changes, ensure_ascii=False)),
+                last_saved_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    if res.rowcount != 1:
+        return jsonify({"ok": False, "error": "closed"}), 409
+    return jsonify({"ok": True, "saved_at": now.isoformat() + "Z"})
 
 @bp.post("/attempt/<int:attempt_id>/submit")
 @login_required
@@ -101,95 +187,45 @@ def submit(attempt_id: int):
     if attempt.status == "submitted":
         return redirect(url_for("student.attempt_result", attempt_id=attempt.id))
 
-    skill = Skill.query.get(attempt.skill_id)
-    questions = Question.query.filter_by(skill_id=skill.id).order_by(Question.id.asc()).all()
+    skill = db.session.get(Skill, attempt.skill_id)
+    bundle = get_bundle(skill)
 
     elapsed = int((now_utc() - attempt.started_at).total_seconds())
     max_seconds = int(skill.time_limit_min or 10) * 60
     if elapsed > max_seconds + 5:
         elapsed = max_seconds
 
-    answers = {}
-    correct = 0
-    for q in questions:
-        key = f"q_{q.id}"
-        if q.qtype in ("mcq_single","tf","video_checkpoint"):
-            val = request.form.get(key) or ""
-            answers[str(q.id)] = [val] if val else []
-            if q.correct_json and val and val in (q.correct_json.get("answers") or []):
-                correct += 1
-        elif q.qtype == "mcq_multi":
-            vals = request.form.getlist(key)
-            answers[str(q.id)] = vals
-            if q.correct_json and sorted(vals) == sorted(q.correct_json.get("answers") or []):
-                correct += 1
-        elif q.qtype in ("short","numeric"):
-            val = (request.form.get(key) or "").strip()
-            answers[str(q.id)] = [val]
-            if q.correct_json and val and val == str((q.correct_json.get("answers") or [""])[0]):
-                correct += 1
-
-    total = max(len(questions), 1)
-    score = int(round((correct / total) * 100))
-
-    attempt.answers_json = answers
-    attempt.score = score
-    attempt.status = "submitted"
-    attempt.ended_at = now_utc()
-    attempt.time_seconds = elapsed
-    db.session.commit()
+    key = bundle.answer_key
+    answers = key.collect(request.form)
+    result = key.grade(answers)
+    score = result.score
+
+    # claim the attempt the way the deadline sweeper does (app.deadlines): whichever of a second
+    # submit or the sweeper loses the race records nothing
+    values = dict(answers_json=answers, draft_answers_json=None, score=score, status="submitted",
+                  ended_at=now_utc(), time_seconds=elapsed)
+    claimed = db.session.execute(
+        update(Attempt).where(Attempt.id == attempt.id, Attempt.status == "in_progress").values(**values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if claimed != 1:
+        db.session.rollback()
+        return redirect(url_for("student.attempt_result", attempt_id=attempt.id))
+    for name, value in values.items():  # what the row now holds, without reloading it
+        set_committed_value(attempt, name, value)
 
     status = StudentSkillStatus.query.filter_by(student_id=current_user.id, skill_id=skill.id).first()
     passed = score >= int(skill.pass_threshold or 60)
     if status and passed:
         status.completed = True
-        db.session.commit()
 
-    teacher = User.query.get(current_user.teacher_id) if current_user.teacher_id else None
-    from flask import current_app
-    reports_dir = current_app.config["REPORTS_DIR"]
-    pdf_path = os.path.join(reports_dir, f"report_attempt_{attempt.id}.pdf")
-
-    # weak skills (top 3)
-    rows = (db.session.query(Attempt.skill_id, func.avg(Attempt.score))
-            .filter(Attempt.student_id == current_user.id, Attempt.status=="submitted")
-            .group_by(Attempt.skill_id).all())
-    rows_sorted = sorted(rows, key=lambda r: r[1])
-    weak_skill_ids = [r[0] for r in rows_sorted[:3]]
-    weak_lines = []
-    if weak_skill_ids:
-        weak_skills = Skill.query.filter(Skill.id.in_(weak_skill_ids)).all()
-        weak_lines = [f"- {s.name_ar}" for s in weak_skills]
-
-    lines = [
-        f"اسم الطالب: {current_user.name_ar} ({current_user.student_id})",
-        f"المهارة: {skill.name_ar}",
-        f"النتيجة: {score}% | الحالة: {'ناجح' if passed else 'راسب'}",
-        f"الوقت المستهلك: {elapsed} ثانية",
-        f"التاريخ: {now_utc().strftime('%Y-%m-%d %H:%M UTC')}",
-        "—",
-        "تفاصيل الإجابات:",
-    ]
-    for q in questions:
-        a = answers.get(str(q.id), [])
-        ca = (q.correct_json or {}).get("answers") if q.correct_json else []
-        lines.append(f"س: {q.prompt_ar[:120]}")
-        lines.append(f"إجابة الطالب: {', '.join(a) if a else '-'}")
-        lines.append(f"الإجابة الصحيحة: {', '.join(ca) if ca else '-'}")
-        lines.append(" ")
-
-    if weak_lines:
-        lines.append("أضعف المهارات (الأكثر احتياجاً):")
-        lines.extend(weak_lines)
-
-    generate_report_pdf(pdf_path, "تقرير نتيجة الاختبار", lines)
-
-    if teacher:
-        rep = Report(attempt_id=attempt.id, teacher_id=teacher.id, url=f"/media/report/{attempt.id}", storage_key=pdf_path)
-        db.session.add(rep)
-        db.session.commit()
-        if teacher.email:
-            send_email(teacher.email, "تقرير اختبار الطالب", "مرفق تقرير اختبار الطالب.", attachment_path=pdf_path)
+    stats.record_attempt(attempt)
+    rollups.record_attempt(attempt, passed)
+    attempt_answers.record(attempt_answers.rows_for(attempt.id, key, answers, result))
+    # filing the teacher's report and the e-mail run in the background worker;
+    # the PDF itself renders on first download (app.report_cache)
+    enqueue("publish_report", {"attempt_id": attempt.id}, ref=f"attempt:{attempt.id}")
+    db.session.commit()
 
     return redirect(url_for("student.attempt_result", attempt_id=attempt.id))
 
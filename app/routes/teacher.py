@@ -1,9 +1,14 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
 from flask_login import login_required, current_user
-from app import db
-from app.models import User, Skill, StudentSkillStatus, Remediation, Media, Report, Question
+from app import attempt_answers, db, exports, item_analysis, progress, skill_access
+from app.models import (User, Skill, Remediation, Media, Report, Question, Attempt,
+                        StudentRollup, TeacherRollup)
 from app.storage import save_upload
-from app.utils import iso_week_key, ensure_allowed_ext
+from app.bundles import bump_version
+from app.jobs import enqueue
+from app.pagination import paginate
+from app.mailer import DIGEST_PERIODS
+from app.utils import ensure_allowed_ext, now_utc
 
 bp = Blueprint("teacher", __name__)
 
@@ -18,16 +23,25 @@ def _require_teacher():
 @login_required
 def dashboard():
     _require_teacher()
-    students = User.query.filter_by(role="student", teacher_id=current_user.id).all()
-    skills = Skill.query.order_by(Skill.order.asc()).all()
-    reports = Report.query.filter_by(teacher_id=current_user.id).order_by(Report.created_at.desc()).all()
-    return render_template("teacher_dashboard.html", students=students, skills=skills, reports=reports)
+    students = (db.session.query(User, StudentRollup).outerjoin(StudentRollup, StudentRollup.student_id == User.id)
+                .filter(User.role == "student", User.teacher_id == current_user.id).all())
+    summary = TeacherRollup.query.filter_by(teacher_id=current_user.id).first()
+    skills = Skill.visible().order_by(Skill.order.asc()).all()
+    reports = Report.query.filter_by(teacher_id=current_user.id).order_by(Report.created_at.desc(), Report.id.desc()).limit(10).all()
+    return render_template("teacher_dashboard.html", students=students, summary=summary, skills=skills, reports=reports)
+
+@bp.get("/progress")
+@login_required
+def progress_matrix():
+    _require_teacher()
+    grid = progress.load(current_user.id)
+    return render_template("teacher_progress.html", students=grid.students, grid_html=progress.render(grid))
 
 @bp.get("/skills")
 @login_required
 def skills():
     _require_teacher()
-    skills = Skill.query.order_by(Skill.order.asc()).all()
+    skills = Skill.visible().order_by(Skill.order.asc()).all()
     return render_template("teacher_skills.html", skills=skills)
 
 @bp.post("/skills")
@@ -49,7 +63,7 @@ def skill_create():
 @login_required
 def skill_edit(skill_id: int):
     _require_teacher()
-    s = Skill.query.get_or_404(skill_id)
+    s = Skill.visible().filter_by(id=skill_id).first_or_404()
     if request.method == "GET":
         return render_template("skill_form.html", skill=s, action=url_for("teacher.skill_edit", skill_id=s.id))
     s.name_ar = request.form.get("name_ar") or s.name_ar
@@ -57,6 +71,7 @@ def skill_edit(skill_id: int):
     s.order = int(request.form.get("order") or s.order or 0)
     s.pass_threshold = int(request.form.get("pass_threshold") or s.pass_threshold or 60)
     s.time_limit_min = int(request.form.get("time_limit_min") or s.time_limit_min or 10)
+    bump_version(s.id)
     db.session.commit()
     flash("تم تحديث المهارة.", "success")
     return redirect(url_for("teacher.skills"))
@@ -65,72 +80,55 @@ def skill_edit(skill_id: int):
 @login_required
 def skill_delete(skill_id: int):
     _require_teacher()
-    # delete dependents to avoid FK issues in Postgres
-    from app.models import Attempt, Report, Remediation, ImportBatch, ImportItem, StudentSkillStatus
-    Question.query.filter_by(skill_id=skill_id).delete(synchronize_session=False)
-
-    attempt_ids = [a.id for a in Attempt.query.filter_by(skill_id=skill_id).all()]
-    if attempt_ids:
-        Report.query.filter(Report.attempt_id.in_(attempt_ids)).delete(synchronize_session=False)
-    Attempt.query.filter_by(skill_id=skill_id).delete(synchronize_session=False)
-    Remediation.query.filter_by(skill_id=skill_id).delete(synchronize_session=False)
-    StudentSkillStatus.query.filter_by(skill_id=skill_id).delete(synchronize_session=False)
-
-    batch_ids = [b.id for b in ImportBatch.query.filter_by(skill_id=skill_id).all()]
-    if batch_ids:
-        ImportItem.query.filter(ImportItem.batch_id.in_(batch_ids)).delete(synchronize_session=False)
-    ImportBatch.query.filter_by(skill_id=skill_id).delete(synchronize_session=False)
-
-    s = Skill.query.get_or_404(skill_id)
-    db.session.delete(s)
+    s = Skill.visible().filter_by(id=skill_id).first_or_404()
+    # hide now; attempts, reports and uploads are removed in chunks by the worker (app.purge)
+    s.deleted_at = now_utc()
+    enqueue("purge_skill", {"skill_id": s.id}, ref=f"skill:{s.id}")
     db.session.commit()
     flash("تم حذف المهارة.", "success")
     return redirect(url_for("teacher.skills"))
 
-@bp.post("/student/<int:student_id>/unlock")
-@login_required
-def unlock_skill(student_id: int):
+def _skill_action(student_id: int, action: str, message: str):
     _require_teacher()
     student = User.query.filter_by(id=student_id, role="student", teacher_id=current_user.id).first_or_404()
-    skill_id = int(request.form.get("skill_id") or 0)
-    status = StudentSkillStatus.query.filter_by(student_id=student.id, skill_id=skill_id).first()
-    if not status:
-        status = StudentSkillStatus(student_id=student.id, skill_id=skill_id, unlocked=True)
-        db.session.add(status)
-    else:
-        status.unlocked = True
+    skill_access.apply(action, current_user.id, [int(request.form.get("skill_id") or 0)], [student.id])
     db.session.commit()
-    flash("تم فتح المهارة للطالب.", "success")
+    flash(message, "success")
     return redirect(url_for("teacher.dashboard"))
 
+@bp.post("/student/<int:student_id>/unlock")
+@login_required
+def unlock_skill(student_id: int):
+    return _skill_action(student_id, "unlock", "تم فتح المهارة للطالب.")
+
 @bp.post("/student/<int:student_id>/lock")
 @login_required
 def lock_skill(student_id: int):
-    _require_teacher()
-    student = User.query.filter_by(id=student_id, role="student", teacher_id=current_user.id).first_or_404()
-    skill_id = int(request.form.get("skill_id") or 0)
-    status = StudentSkillStatus.query.filter_by(student_id=student.id, skill_id=skill_id).first()
-    if status:
-        status.unlocked = False
-        db.session.commit()
-    flash("تم قفل المهارة.", "success")
-    return redirect(url_for("teacher.dashboard"))
+    return _skill_action(student_id, "lock", "تم قفل المهارة.")
 
 @bp.post("/student/<int:student_id>/allow-extra-attempt")
 @login_required
 def allow_extra_attempt(student_id: int):
+    return _skill_action(student_id, "extra_attempt", "تم السماح بمحاولة إضافية لهذا الأسبوع.")
+
+@bp.post("/students/bulk")
+@login_required
+def bulk_skill_action():
     _require_teacher()
-    student = User.query.filter_by(id=student_id, role="student", teacher_id=current_user.id).first_or_404()
-    skill_id = int(request.form.get("skill_id") or 0)
-    wk = iso_week_key()
-    status = StudentSkillStatus.query.filter_by(student_id=student.id, skill_id=skill_id).first()
-    if not status:
-        status = StudentSkillStatus(student_id=student.id, skill_id=skill_id, unlocked=True, extra_attempt_week=wk)
-        db.session.add(status)
-    else:
-        status.extra_attempt_week = wk
+    action = request.form.get("action") or ""
+    skill_ids = request.form.getlist("skill_id", type=int)
+    # the whole class only when asked for by name: an empty selection is a mistake, not "everyone"
+    whole_class = request.form.get("scope") == "class"
+    student_ids = None if whole_class else request.form.getlist("student_id", type=int)
+    if action not in skill_access.ACTIONS or not skill_ids:
+        flash("الرجاء اختيار الإجراء والمهارات.", "danger")
+        return redirect(url_for("teacher.dashboard"))
+    if not whole_class and not student_ids:
+        flash("الرجاء تحديد طالب واحد على الأقل، أو اختيار التطبيق على كل الفصل.", "danger")
+        return redirect(url_for("teacher.dashboard"))
+    n = skill_access.apply(action, current_user.id, skill_ids, student_ids)
     db.session.commit()
-    flash("تم السماح بمحاولة إضافية لهذا الأسبوع.", "success")
+    flash(f"تم التطبيق على {n} سجل.", "success")
     return redirect(url_for("teacher.dashboard"))
 
 @bp.get("/remediation")
@@ -138,9 +136,17 @@ def allow_extra_attempt(student_id: int):
 def remediation_page():
     _require_teacher()
     students = User.query.filter_by(role="student", teacher_id=current_user.id).all()
-    skills = Skill.query.order_by(Skill.order.asc()).all()
-    rems = Remediation.query.filter_by(teacher_id=current_user.id).order_by(Remediation.created_at.desc()).all()
-    return render_template("teacher_remediation.html", students=students, skills=skills, remediations=rems)
+    skills = Skill.visible().order_by(Skill.order.asc()).all()
+    student_id = request.args.get("student_id", type=int)
+    skill_id = request.args.get("skill_id", type=int)
+    query = Remediation.query.filter_by(teacher_id=current_user.id)
+    if student_id:
+        query = query.filter(Remediation.student_id == student_id)
+    if skill_id:
+        query = query.filter(Remediation.skill_id == skill_id)
+    rems = paginate(query, Remediation.created_at, Remediation.id)
+    return render_template("teacher_remediation.html", students=students, skills=skills, remediations=rems,
+                           student_id=student_id, skill_id=skill_id)
 
 @bp.post("/remediation")
 @login_required
@@ -179,23 +185,63 @@ def remediation_post():
 @login_required
 def reports():
     _require_teacher()
-    reports = Report.query.filter_by(teacher_id=current_user.id).order_by(Report.created_at.desc()).all()
-    return render_template("teacher_reports.html", reports=reports)
+    student_id = request.args.get("student_id", type=int)
+    skill_id = request.args.get("skill_id", type=int)
+    query = (db.session.query(Report, Attempt.student_id, Attempt.skill_id, Attempt.score)
+             .join(Attempt, Attempt.id == Report.attempt_id)
+             .filter(Report.teacher_id == current_user.id))
+    if student_id:
+        query = query.filter(Attempt.student_id == student_id)
+    if skill_id:
+        query = query.filter(Attempt.skill_id == skill_id)
+    page = paginate(query, Report.created_at, Report.id)
+    students = User.query.filter_by(role="student", teacher_id=current_user.id).order_by(User.name_ar.asc()).all()
+    skills = Skill.visible().order_by(Skill.order.asc()).all()
+    return render_template("teacher_reports.html", reports=page, students=students, skills=skills,
+                           student_names={s.id: s.name_ar for s in students},
+                           student_id=student_id, skill_id=skill_id)
+
+@bp.post("/reports/digest")
+@login_required
+def email_digest():
+    _require_teacher()
+    choice = request.form.get("email_digest") or ""
+    current_user.row().email_digest = choice if choice in DIGEST_PERIODS else None
+    db.session.commit()
+    flash("تم حفظ إعدادات البريد.", "success")
+    return redirect(url_for("teacher.reports"))
+
+@bp.get("/export/<dataset>")
+@login_required
+def export(dataset: str):
+    _require_teacher()
+    fmt = request.args.get("format") or "csv"
+    if dataset not in exports.DATASETS or fmt not in exports.FORMATS:
+        abort(404)
+    try:
+        return exports.export_response(dataset, fmt, teacher_id=current_user.id,
+                                       skill_id=request.args.get("skill_id", type=int))
+    except exports.ExportUnavailable:
+        flash("تصدير Parquet غير متاح على هذا الخادم.", "danger")
+        return redirect(url_for("teacher.reports"))
 
 @bp.get("/questions")
 @login_required
 def question_tool():
     _require_teacher()
-    skills = Skill.query.order_by(Skill.order.asc()).all()
+    skills = Skill.visible().order_by(Skill.order.asc()).all()
     skill_id = request.args.get("skill_id", type=int)
     qs = Question.query.filter_by(skill_id=skill_id).order_by(Question.id.desc()).all() if skill_id else []
-    return render_template("teacher_questions.html", skills=skills, skill_id=skill_id, questions=qs)
+    skill = next((s for s in skills if s.id == skill_id), None)
+    # statistics for this teacher's class only
+    analysis = item_analysis.analyze(skill, current_user.id) if skill else None
+    return render_template("teacher_questions.html", skills=skills, skill_id=skill_id, questions=qs, analysis=analysis)
 
 @bp.route("/questions/new", methods=["GET","POST"])
 @login_required
 def question_new():
     _require_teacher()
-    skills = Skill.query.order_by(Skill.order.asc()).all()
+    skills = Skill.visible().order_by(Skill.order.asc()).all()
     if request.method == "GET":
         return render_template("question_form.html", skills=skills, q=None, action=url_for("teacher.question_new"))
 
@@ -206,7 +252,7 @@ def question_new():
 def question_edit(question_id: int):
     _require_teacher()
     q = Question.query.get_or_404(question_id)
-    skills = Skill.query.order_by(Skill.order.asc()).all()
+    skills = Skill.visible().order_by(Skill.order.asc()).all()
     if request.method == "GET":
         return render_template("question_form.html", skills=skills, q=q, action=url_for("teacher.question_edit", question_id=q.id))
     return _upsert_question(q)
@@ -217,7 +263,9 @@ def question_delete(question_id: int):
     _require_teacher()
     q = Question.query.get_or_404(question_id)
     skill_id = q.skill_id
+    attempt_answers.drop_question(q.id)
     db.session.delete(q)
+    bump_version(skill_id)
     db.session.commit()
     flash("تم حذف السؤال.", "success")
     return redirect(url_for("teacher.question_tool", skill_id=skill_id))
@@ -251,6 +299,7 @@ def _upsert_question(q: Question | None = None):
         media={"video_url": request.form.get("video_url") or ""}
         meta={"checkpoint_seconds": int(request.form.get("checkpoint_seconds") or 0)}
 
+    old_skill_id = q.skill_id if q is not None else None
     if q is None:
         q = Question(skill_id=skill_id, qtype=qtype, prompt_ar=prompt_ar)
         db.session.add(q)
@@ -261,6 +310,7 @@ def _upsert_question(q: Question | None = None):
     q.correct_json = correct_json
     q.media_json = media
     q.meta_json = meta
+    bump_version(skill_id, old_skill_id)
 
     db.session.commit()
     flash("تم حفظ السؤال.", "success")
@@ -0,0 +1,38 @@
+"""Unlock, lock or grant an extra attempt for students × skills in one statement.
+
+``apply`` is an ``INSERT … SELECT`` over the teacher's students crossed with
+the chosen (visible) skills, upserted on ``uq_student_skill``: missing
+``student_skill_status`` rows are created and existing ones updated, so a
+whole class costs the same single round trip as one student.
+"""
+from __future__ import annotations
+from sqlalchemy import literal, select, true
+from app import db
+from app.dbutil import upsert
+from app.models import Skill, StudentSkillStatus, User
+from app.utils import iso_week_key
+
+ACTIONS = ("unlock", "lock", "extra_attempt")
+
+def apply(action: str, teacher_id: int, skill_ids: list[int], student_ids: list[int] | None = None) -> int:
+    """Apply ``action`` to ``teacher_id``'s students (all of them when ``student_ids`` is None).
+    Ids that are not the teacher's students or visible skills are ignored. Does not commit;
+    returns the number of rows written."""
+    if action not in ACTIONS:
+        raise ValueError(action)
+    if not skill_ids or student_ids == []:
+        return 0
+    t = StudentSkillStatus.__table__
+    week = iso_week_key() if action == "extra_attempt" else None
+    rows = (select(User.id, Skill.id, literal(action != "lock"), literal(False), literal(week, t.c.extra_attempt_week.type))
+            .select_from(User).join(Skill, true())  # students × skills
+            .where(User.role == "student", User.teacher_id == teacher_id,
+                   Skill.id.in_(skill_ids), Skill.deleted_at.is_(None)))
+    if student_ids is not None:
+        rows = rows.where(User.id.in_(student_ids))
+    stmt = upsert(t).from_select(["student_id", "skill_id", "unlocked", "completed", "extra_attempt_week"], rows)
+    if action == "extra_attempt":
+        changes = {"extra_attempt_week": stmt.excluded.extra_attempt_week}
+    else:
+        changes = {"unlocked": stmt.excluded.unlocked}
+    return db.session.execute(stmt.on_conflict_do_update(index_elements=["student_id", "skill_id"], set_=changes)).rowcount
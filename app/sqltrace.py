@@ -0,0 +1,118 @@
+"""Opt-in SQL instrumentation (``SQL_INSTRUMENT=1``).
+
+Engine events count every statement a request executes, its total database
+time and how often each statement *shape* (the SQL text with ``IN (?, ?, …)``
+lists and literals collapsed) repeats. A SELECT shape repeated at least
+``SQL_N_PLUS_ONE_THRESHOLD`` times in one request is flagged as a probable
+N+1. Results go out in ``X-SQL-*`` response headers, to the log, and into a
+per-process ring of recent requests shown at ``/chairman/debug/sql``.
+
+``capture()`` records the same numbers for any block of code; the tests use it
+to hold endpoints to a query budget, and ``capture(keep=True)`` also keeps each
+statement with its parameters so they can be EXPLAINed.
+"""
+from __future__ import annotations
+import re
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from app.utils import now_utc
+
+_IN_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|%s)(?:\s*,\s*(?:\?|%\(\w+\)s|%s))*\s*\)")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_SPACE = re.compile(r"\s+")
+
+_captures: ContextVar[tuple] = ContextVar("sql_captures", default=())
+RECENT: deque = deque(maxlen=200)
+
+def shape(statement: str) -> str:
+    s = _SPACE.sub(" ", statement).strip()
+    s = _IN_LIST.sub("(?)", s)
+    return _LITERAL.sub("?", s)
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+    statements: list | None = None  # (statement, parameters), only when asked for
+
+    def add(self, statement: str, seconds: float, parameters=None):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[shape(statement)] += 1
+        if self.statements is not None:
+            self.statements.append((statement, parameters))
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """SELECT shapes run at least ``threshold`` times: probable N+1 loops."""
+        return [(s, n) for s, n in self.shapes.most_common()
+                if n >= threshold and s.upper().startswith(("SELECT", "WITH"))]
+
+def _collectors() -> list[QueryStats]:
+    out = list(_captures.get())
+    if has_request_context() and g.get("_sql") is not None:
+        out.append(g._sql)
+    return out
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    conn.info["_sql_started"] = time.perf_counter()
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("_sql_started", time.perf_counter())
+    for stats in _collectors():
+        stats.add(statement, elapsed, parameters)
+
+def listen(engine):
+    if not event.contains(engine, "before_cursor_execute", _before):
+        event.listen(engine, "before_cursor_execute", _before)
+        event.listen(engine, "after_cursor_execute", _after)
+
+@contextmanager
+def capture(keep: bool = False):
+    """Collect the statements executed inside the block (in this thread/context);
+    with ``keep`` the statements themselves are kept in ``.statements``."""
+    from app import db
+    listen(db.engine)
+    stats = QueryStats(statements=[] if keep else None)
+    token = _captures.set(_captures.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _captures.reset(token)
+
+def init_app(app, db):
+    global RECENT
+    if not app.config.get("SQL_INSTRUMENT"):
+        return
+    with app.app_context():
+        listen(db.engine)
+    threshold = int(app.config.get("SQL_N_PLUS_ONE_THRESHOLD", 5))
+    RECENT = deque(maxlen=int(app.config.get("SQL_STATS_KEEP", 200)))
+
+    @app.before_request
+    def _start_sql_stats():
+        g._sql = QueryStats()
+
+    @app.after_request
+    def _report_sql_stats(response):
+        stats = g.pop("_sql", None)
+        if stats is None or request.endpoint == "static":
+            return response
+        repeated = stats.repeated(threshold)
+        response.headers["X-SQL-Queries"] = str(stats.count)
+        response.headers["X-SQL-Time-Ms"] = f"{stats.seconds * 1000:.1f}"
+        response.headers["X-SQL-Repeated"] = str(len(repeated))
+        if repeated:
+            app.logger.warning("Probable N+1 in %s %s: %s", request.method, request.path,
+                               "; ".join(f"{n}x {s[:200]}" for s, n in repeated))
+        RECENT.append({
+            "at": now_utc(), "method": request.method, "path": request.path, "endpoint": request.endpoint,
+            "status": response.status_code, "queries": stats.count, "ms": stats.seconds * 1000,
+            "repeated": repeated,
+        })
+        return response
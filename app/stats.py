@@ -0,0 +1,97 @@
+"""Per-student skill aggregates kept in ``student_skill_stats``.
+
+``record_attempt`` is called in the same transaction that submits an attempt,
+so readers (reports, dashboards) never have to aggregate ``attempt`` rows.
+"""
+from sqlalchemy import delete, func, literal, select, update
+from app import db
+from app.dbutil import upsert, greatest
+from app.models import Attempt, Skill, StudentSkillStats
+from app.utils import now_utc
+
+def _upsert_stmt():
+    t = StudentSkillStats.__table__
+    stmt = upsert(t)
+    return stmt.on_conflict_do_update(
+        index_elements=["student_id", "skill_id"],
+        set_={
+            "attempts_count": t.c.attempts_count + stmt.excluded.attempts_count,
+            "score_sum": t.c.score_sum + stmt.excluded.score_sum,
+            "best_score": greatest(func.coalesce(t.c.best_score, 0), stmt.excluded.best_score),
+            "last_score": stmt.excluded.last_score,
+            "last_week": stmt.excluded.last_week,
+            "last_attempt_id": stmt.excluded.last_attempt_id,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+def _row(student_id: int, skill_id: int, score, week_key: str, attempt_id: int) -> dict:
+    score = int(score or 0)
+    return dict(student_id=student_id, skill_id=skill_id, attempts_count=1, score_sum=score,
+                best_score=score, last_score=score, last_week=week_key, last_attempt_id=attempt_id,
+                updated_at=now_utc())
+
+def record_attempt(attempt: Attempt):
+    """Fold one submitted attempt into the stats row. Does not commit."""
+    db.session.execute(_upsert_stmt().values(
+        **_row(attempt.student_id, attempt.skill_id, attempt.score, attempt.week_key, attempt.id)))
+
+def record_attempts(rows: list[tuple[int, int, int, str, int]]):
+    """Batch form of ``record_attempt`` for (student_id, skill_id, score, week_key, attempt_id)
+    tuples. One executemany; does not commit."""
+    # one row per key: Postgres rejects a multi-row upsert that hits the same row twice
+    merged: dict[tuple[int, int], dict] = {}
+    for r in sorted(rows, key=lambda r: r[4]):
+        row = _row(*r)
+        prev = merged.get((row["student_id"], row["skill_id"]))
+        if prev is not None:
+            row["attempts_count"] += prev["attempts_count"]
+            row["score_sum"] += prev["score_sum"]
+            row["best_score"] = max(row["best_score"], prev["best_score"])
+        merged[(row["student_id"], row["skill_id"])] = row
+    if merged:
+        db.session.execute(_upsert_stmt(), [merged[k] for k in sorted(merged)])
+
+def stats_for_student(student_id: int) -> dict[int, StudentSkillStats]:
+    rows = StudentSkillStats.query.filter_by(student_id=student_id).all()
+    return {r.skill_id: r for r in rows}
+
+def weakest_skills(student_id: int, limit: int = 3) -> list[Skill]:
+    avg = StudentSkillStats.score_sum * 1.0 / StudentSkillStats.attempts_count
+    return (Skill.query.join(StudentSkillStats, StudentSkillStats.skill_id == Skill.id)
+            .filter(StudentSkillStats.student_id == student_id, StudentSkillStats.attempts_count > 0,
+                    Skill.deleted_at.is_(None))
+            .order_by(avg.asc(), Skill.id.asc())
+            .limit(limit).all())
+
+def recompute(student_ids: list[int] | None = None) -> int:
+    """Recompute stats from ``attempt`` (all students, or these). Does not commit."""
+    t = StudentSkillStats.__table__
+    a = Attempt.__table__
+    del_stmt = delete(t)
+    src = select(
+        a.c.student_id, a.c.skill_id, func.count(a.c.id), func.coalesce(func.sum(a.c.score), 0),
+        func.max(a.c.score), func.max(a.c.id), literal(now_utc()),
+    ).where(a.c.status == "submitted").group_by(a.c.student_id, a.c.skill_id)
+    if student_ids is not None:
+        del_stmt = del_stmt.where(t.c.student_id.in_(student_ids))
+        src = src.where(a.c.student_id.in_(student_ids))
+    db.session.execute(del_stmt)
+    res = db.session.execute(t.insert().from_select(
+        ["student_id", "skill_id", "attempts_count", "score_sum", "best_score", "last_attempt_id", "updated_at"], src))
+
+    last = a.alias("last")
+    fill = update(t).values(
+        last_score=select(last.c.score).where(last.c.id == t.c.last_attempt_id).scalar_subquery(),
+        last_week=select(last.c.week_key).where(last.c.id == t.c.last_attempt_id).scalar_subquery(),
+    )
+    if student_ids is not None:
+        fill = fill.where(t.c.student_id.in_(student_ids))
+    db.session.execute(fill)
+    return res.rowcount or 0
+
+def rebuild(student_id: int | None = None) -> int:
+    """Recompute stats from ``attempt`` (all students, or one). Commits."""
+    n = recompute(None if student_id is None else [student_id])
+    db.session.commit()
+    return n
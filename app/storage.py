@@ -1,4 +1,5 @@
-import os, uuid, mimetypes
+import os, uuid, mimetypes, tempfile
+from contextlib import contextmanager
 from flask import current_app
 import boto3
 
@@ -38,3 +39,48 @@ def _save_s3(file_storage, key: str, filename: str, mime: str) -> dict:
     public_base = cfg.get("S3_PUBLIC_BASE_URL") or ""
     url = f"{public_base.rstrip('/')}/{key}" if public_base else f"s3://{bucket}/{key}"
     return {"url": url, "storage_key": key, "filename": filename, "mime": mime, "key": key}
+
+def delete_stored(storage_key: str | None) -> bool:
+    """Remove a file saved by ``save_upload`` (local path or S3 key). Missing files are ignored."""
+    if not storage_key:
+        return False
+    if os.path.exists(storage_key):
+        try:
+            os.remove(storage_key)
+            return True
+        except OSError:
+            return False
+    cfg = current_app.config
+    if (cfg.get("STORAGE_BACKEND") or "local").lower() != "s3":
+        return False
+    s3 = boto3.client(
+        "s3",
+        endpoint_url=cfg.get("S3_ENDPOINT_URL") or None,
+        aws_access_key_id=cfg.get("S3_ACCESS_KEY_ID") or None,
+        aws_secret_access_key=cfg.get("S3_SECRET_ACCESS_KEY") or None,
+        region_name=cfg.get("S3_REGION") or None,
+    )
+    s3.delete_object(Bucket=cfg["S3_BUCKET"], Key=storage_key)
+    return True
+
+@contextmanager
+def local_copy(storage_key: str):
+    """Yield a local filesystem path for a stored file, downloading it from S3 to a temp file if needed."""
+    if os.path.exists(storage_key):
+        yield storage_key
+        return
+    cfg = current_app.config
+    s3 = boto3.client(
+        "s3",
+        endpoint_url=cfg.get("S3_ENDPOINT_URL") or None,
+        aws_access_key_id=cfg.get("S3_ACCESS_KEY_ID") or None,
+        aws_secret_access_key=cfg.get("S3_SECRET_ACCESS_KEY") or None,
+        region_name=cfg.get("S3_REGION") or None,
+    )
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(storage_key)[1])
+    try:
+        with os.fdopen(fd, "wb") as f:
+            s3.download_fileobj(cfg["S3_BUCKET"], storage_key, f)
+        yield path
+    finally:
+        os.remove(path)
@@ -0,0 +1,62 @@
+"""Job handlers run by the background worker (see app.jobs)."""
+from app import db, deadlines, doc_import, purge, report_cache, roster
+from app.jobs import job_handler, enqueue, periodic
+from app.models import User, Skill, Attempt, Report
+from app.mailer import queue_email, build_digests, flush_outbox
+
+@job_handler("publish_report")
+@job_handler("render_report")  # jobs queued before reports became lazy
+def publish_report(payload: dict):
+    """File the attempt's report in the teacher's inbox; the PDF itself renders on first download."""
+    attempt = db.session.get(Attempt, int(payload["attempt_id"]))
+    if not attempt or attempt.status != "submitted":
+        return
+    student = db.session.get(User, attempt.student_id)
+    teacher = db.session.get(User, student.teacher_id) if student.teacher_id else None
+    if not teacher:
+        return
+    if not Report.query.filter_by(attempt_id=attempt.id).first():
+        db.session.add(Report(attempt_id=attempt.id, teacher_id=teacher.id, url=f"/media/report/{attempt.id}"))
+        if teacher.email:
+            enqueue("notify_teacher", {"attempt_id": attempt.id}, ref=f"attempt:{attempt.id}")
+
+@job_handler("notify_teacher")
+def notify_teacher(payload: dict):
+    rep = Report.query.filter_by(attempt_id=int(payload["attempt_id"])).first()
+    if not rep:
+        return
+    teacher = db.session.get(User, rep.teacher_id)
+    if not teacher or not teacher.email:
+        return
+    attempt = db.session.get(Attempt, rep.attempt_id)
+    student = db.session.get(User, attempt.student_id)
+    skill = db.session.get(Skill, attempt.skill_id)
+    queue_email(teacher.email, f"تقرير اختبار الطالب: {student.name_ar} — {skill.name_ar}",
+                f"النتيجة: {attempt.score}%", attachment_attempt_id=attempt.id,
+                attachment_name=f"report_{attempt.id}.pdf", digest=teacher.email_digest)
+
+@job_handler("purge_skill")
+def purge_skill(payload: dict):
+    if not purge.purge_skill(int(payload["skill_id"])):
+        enqueue("purge_skill", payload, ref=f"skill:{payload['skill_id']}")
+
+@job_handler("extract_import")
+def extract_import(payload: dict):
+    doc_import.extract_batch(int(payload["batch_id"]))
+
+@job_handler("import_roster")
+def import_roster(payload: dict):
+    roster.run_import(int(payload["roster_import_id"]))
+
+@periodic(30)
+def flush_email_outbox():
+    build_digests()
+    flush_outbox()
+
+@periodic(600)
+def evict_report_cache():
+    report_cache.evict()
+
+@periodic(60)
+def sweep_expired_attempts():
+    deadlines.sweep_expired()
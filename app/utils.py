@@ -1,4 +1,5 @@
 import datetime as dt
+import json
 import os
 
 def iso_week_key(d: dt.datetime | None = None) -> str:
@@ -14,3 +15,11 @@ def ext_lower(filename: str) -> str:
 
 def ensure_allowed_ext(filename: str, allowed_exts: set[str]) -> bool:
     return ext_lower(filename) in allowed_exts
+
+def load_draft(raw: str | None) -> dict:
+    """An attempt's ``draft_answers_json`` as a dict; {} when empty or malformed."""
+    try:
+        draft = json.loads(raw) if raw else {}
+    except ValueError:
+        return {}
+    return draft if isinstance(draft, dict) else {}
@@ -0,0 +1,58 @@
+"""PDF question-bank extraction: serial vs. page ranges across a process pool.
+
+    python benchmarks/bench_pdf_import.py --pages 400 --workers 4 --pages-per-task 16
+
+Builds a synthetic exam booklet (numbered questions with four choices per
+page) and times ``doc_import.pdf_page_blocks`` end to end, plus how soon the
+first page comes out of the stream. Needs no database.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import fitz  # noqa: E402
+from app.doc_import import pdf_page_blocks  # noqa: E402
+
+def synthetic_pdf(path: str, pages: int, questions_per_page: int = 8):
+    doc = fitz.open()
+    n = 0
+    for _ in range(pages):
+        page = doc.new_page()
+        text = []
+        for _ in range(questions_per_page):
+            n += 1
+            text.append(f"{n}) Which of the following statements about item {n} is correct?\n"
+                        "a) first choice  b) second choice  c) third choice  d) fourth choice")
+        page.insert_textbox(page.rect + (36, 36, -36, -36), "\n\n".join(text), fontsize=9)
+    doc.save(path)
+    doc.close()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=400)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    ap.add_argument("--pages-per-task", type=int, default=16)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "booklet.pdf")
+        synthetic_pdf(path, args.pages)
+        print(f"pages={args.pages} size={os.path.getsize(path) / 1024:.0f} KiB cpus={os.cpu_count()}")
+        for workers in (1, args.workers):
+            t0 = time.perf_counter()
+            total, pages = pdf_page_blocks(path, workers=workers, pages_per_task=args.pages_per_task)
+            first = None
+            blocks = 0
+            for page in pages:
+                if first is None:
+                    first = time.perf_counter() - t0
+                blocks += len(page)
+            dt = time.perf_counter() - t0
+            print(f"workers={workers:<3} {dt:7.2f}s  {total / dt:8.1f} pages/s  first page after {first * 1000:6.1f} ms"
+                  f"  blocks={blocks}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Report rendering throughput: serial vs. process pool.
+
+    python benchmarks/bench_reports.py --reports 200 --questions 20 --workers 4
+
+Prints pages/second for each mode so report workers can be sized for the
+end-of-week runs. Needs no database.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.reporting import ReportEngine, render_many  # noqa: E402
+
+def synthetic_lines(n_questions: int) -> list[str]:
+    lines = ["اسم الطالب: طالب تجريبي (S1001)", "المهارة: مهارة القراءة", "النتيجة: 75% | الحالة: ناجح",
+             "الوقت المستهلك: 420 ثانية", "التاريخ: 2026-02-05 10:00 UTC", "—", "تفاصيل الإجابات:"]
+    for i in range(n_questions):
+        lines += [f"س: السؤال رقم {i + 1}: اختر الإجابة الصحيحة من بين الخيارات التالية",
+                  "إجابة الطالب: b", "الإجابة الصحيحة: b", " "]
+    return lines
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reports", type=int, default=200)
+    ap.add_argument("--questions", type=int, default=20)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = ap.parse_args()
+
+    engine = ReportEngine()
+    lines = synthetic_lines(args.questions)
+    per_page = int((engine.height - 50 - 30 - 60) // engine.line_height) + 1
+    pages = args.reports * -(-len(lines) // per_page)
+    print(f"font={engine.font} ({engine.font_path}) reports={args.reports} pages≈{pages}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs = [(os.path.join(tmp, f"r{i}.pdf"), "تقرير نتيجة الاختبار", lines) for i in range(args.reports)]
+        for workers in (1, args.workers):
+            t0 = time.perf_counter()
+            render_many(jobs, workers=workers, font_path=engine.font_path)
+            dt = time.perf_counter() - t0
+            print(f"workers={workers:<3} {dt:7.2f}s  {pages / dt:8.1f} pages/s  {args.reports / dt:8.1f} reports/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""SQLite write contention: stock engine vs. the app's engine profile.
+
+    python benchmarks/bench_sqlite_contention.py --procs 4 --writes 300
+
+Several processes (standing in for gunicorn workers) run short
+submit-shaped write transactions against one database file while a reader
+process keeps polling it. Prints committed transactions/second and how many
+transactions failed with "database is locked" for each mode.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.dbprofile import engine_options, install_sqlite_pragmas, sqlite_pragmas  # noqa: E402
+
+def _engine(url: str, tuned: bool):
+    cfg = {k: getattr(Config, k) for k in dir(Config) if k.isupper()}
+    if not tuned:
+        # what the app used before: rollback journal, synchronous=FULL, sqlite3's 5s lock wait
+        return create_engine(url)
+    engine = create_engine(url, **engine_options(cfg, url))
+    install_sqlite_pragmas(engine, sqlite_pragmas(cfg))
+    return engine
+
+def _writer(url: str, tuned: bool, n: int, seed: int, out):
+    engine = _engine(url, tuned)
+    ok = locked = 0
+    for i in range(n):
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("INSERT INTO attempt (student_id, score, answers) VALUES (:s, :sc, :a)"),
+                             {"s": seed * 100000 + i, "sc": i % 100, "a": "x" * 400})
+                conn.execute(text("INSERT INTO stats (student_id, n) VALUES (:s, 1) "
+                                  "ON CONFLICT (student_id) DO UPDATE SET n = n + 1"), {"s": seed})
+            ok += 1
+        except OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            locked += 1
+    out.put((ok, locked))
+
+def _reader(url: str, tuned: bool, stop):
+    engine = _engine(url, tuned)
+    while not stop.is_set():
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT count(*), avg(score) FROM attempt")).all()
+        except OperationalError:
+            pass
+
+def run(tuned: bool, procs: int, writes: int) -> tuple[float, int, int]:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        with _engine(url, tuned).begin() as conn:
+            conn.execute(text("CREATE TABLE attempt (id INTEGER PRIMARY KEY, student_id INTEGER, score INTEGER, answers TEXT)"))
+            conn.execute(text("CREATE TABLE stats (student_id INTEGER PRIMARY KEY, n INTEGER)"))
+        out, stop = mp.Queue(), mp.Event()
+        reader = mp.Process(target=_reader, args=(url, tuned, stop))
+        writers = [mp.Process(target=_writer, args=(url, tuned, writes, i, out)) for i in range(procs)]
+        reader.start()
+        t0 = time.perf_counter()
+        for p in writers:
+            p.start()
+        results = [out.get() for _ in writers]
+        for p in writers:
+            p.join()
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        reader.join()
+    ok = sum(r[0] for r in results)
+    return ok / elapsed, ok, sum(r[1] for r in results)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--procs", type=int, default=4)
+    ap.add_argument("--writes", type=int, default=300, help="Transactions per writer process.")
+    args = ap.parse_args()
+    for tuned in (False, True):
+        rate, ok, locked = run(tuned, args.procs, args.writes)
+        label = "profile" if tuned else "stock  "
+        print(f"{label}: {rate:8.1f} commits/s  committed={ok}  locked={locked}")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,11 @@
+import sys
 from app import create_app
 app = create_app()
 
 if __name__ == '__main__':
-    app.run()
+    # `python manage.py worker` (or any other app CLI command); no args runs the dev server
+    if len(sys.argv) > 1:
+        with app.app_context():
+            app.cli.main(args=sys.argv[1:], prog_name="manage.py")
+    else:
+        app.run()
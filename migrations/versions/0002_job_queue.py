@@ -0,0 +1,37 @@
+"""job queue
+Revision ID: 0002_job_queue
+Revises: 0001_initial
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_job_queue"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "job",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("kind", sa.String(length=50), nullable=False),
+        sa.Column("payload_json", sa.JSON(), nullable=True),
+        sa.Column("ref", sa.String(length=100), nullable=True),
+        sa.Column("status", sa.String(length=20), nullable=False, server_default="queued"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("max_attempts", sa.Integer(), nullable=False, server_default="5"),
+        sa.Column("run_after", sa.DateTime(), nullable=False),
+        sa.Column("locked_at", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_job_status_run_after", "job", ["status", "run_after"])
+    op.create_index("ix_job_ref", "job", ["ref"])
+
+def downgrade():
+    op.drop_index("ix_job_ref", table_name="job")
+    op.drop_index("ix_job_status_run_after", table_name="job")
+    op.drop_table("job")
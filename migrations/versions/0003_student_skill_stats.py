@@ -0,0 +1,44 @@
+"""student skill stats
+Revision ID: 0003_student_skill_stats
+Revises: 0002_job_queue
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_student_skill_stats"
+down_revision = "0002_job_queue"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "student_skill_stats",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("student_id", sa.Integer(), sa.ForeignKey("user.id"), nullable=False),
+        sa.Column("skill_id", sa.Integer(), sa.ForeignKey("skill.id"), nullable=False),
+        sa.Column("attempts_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("score_sum", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("best_score", sa.Integer(), nullable=True),
+        sa.Column("last_score", sa.Integer(), nullable=True),
+        sa.Column("last_week", sa.String(length=12), nullable=True),
+        sa.Column("last_attempt_id", sa.Integer(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("student_id", "skill_id", name="uq_student_skill_stats"),
+    )
+    # Backfill from existing attempts; later changes go through app.stats.record_attempt
+    op.execute("""
+        INSERT INTO student_skill_stats (student_id, skill_id, attempts_count, score_sum, best_score, last_attempt_id)
+        SELECT student_id, skill_id, COUNT(id), COALESCE(SUM(score), 0), MAX(score), MAX(id)
+        FROM attempt WHERE status = 'submitted'
+        GROUP BY student_id, skill_id
+    """)
+    op.execute("""
+        UPDATE student_skill_stats SET
+          last_score = (SELECT a.score FROM attempt a WHERE a.id = student_skill_stats.last_attempt_id),
+          last_week = (SELECT a.week_key FROM attempt a WHERE a.id = student_skill_stats.last_attempt_id)
+    """)
+
+def downgrade():
+    op.drop_table("student_skill_stats")
@@ -0,0 +1,21 @@
+"""skill content version
+Revision ID: 0004_skill_content_version
+Revises: 0003_student_skill_stats
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_skill_content_version"
+down_revision = "0003_student_skill_stats"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("skill") as batch:
+        batch.add_column(sa.Column("content_version", sa.Integer(), nullable=False, server_default="1"))
+
+def downgrade():
+    with op.batch_alter_table("skill") as batch:
+        batch.drop_column("content_version")
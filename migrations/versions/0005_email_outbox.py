@@ -0,0 +1,39 @@
+"""email outbox and teacher digest preference
+Revision ID: 0005_email_outbox
+Revises: 0004_skill_content_version
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_email_outbox"
+down_revision = "0004_skill_content_version"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "email_outbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("to_email", sa.String(length=200), nullable=False),
+        sa.Column("subject", sa.String(length=255), nullable=False),
+        sa.Column("body", sa.Text(), nullable=False, server_default=""),
+        sa.Column("attachments_json", sa.JSON(), nullable=True),
+        sa.Column("status", sa.String(length=20), nullable=False, server_default="pending"),
+        sa.Column("digest", sa.String(length=10), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_email_outbox_status_next", "email_outbox", ["status", "next_attempt_at"])
+    with op.batch_alter_table("user") as batch:
+        batch.add_column(sa.Column("email_digest", sa.String(length=10), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table("user") as batch:
+        batch.drop_column("email_digest")
+    op.drop_index("ix_email_outbox_status_next", table_name="email_outbox")
+    op.drop_table("email_outbox")
@@ -0,0 +1,30 @@
+"""attempt draft answers (autosave)
+Revision ID: 0006_attempt_draft_answers
+Revises: 0005_email_outbox
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_attempt_draft_answers"
+down_revision = "0005_email_outbox"
+branch_labels = None
+depends_on = None
+
+def _columns(table):
+    return {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+def upgrade():
+    # app.migrate.ensure_schema may already have added these on older deployments
+    existing = _columns("attempt")
+    with op.batch_alter_table("attempt") as batch:
+        if "draft_answers_json" not in existing:
+            batch.add_column(sa.Column("draft_answers_json", sa.Text(), nullable=True))
+        if "last_saved_at" not in existing:
+            batch.add_column(sa.Column("last_saved_at", sa.DateTime(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table("attempt") as batch:
+        batch.drop_column("last_saved_at")
+        batch.drop_column("draft_answers_json")
@@ -0,0 +1,37 @@
+"""attempt deadline + (status, deadline_at) index
+Revision ID: 0007_attempt_deadline
+Revises: 0006_attempt_draft_answers
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_attempt_deadline"
+down_revision = "0006_attempt_draft_answers"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("attempt") as batch:
+        batch.add_column(sa.Column("deadline_at", sa.DateTime(), nullable=True))
+    op.create_index("ix_attempt_status_deadline", "attempt", ["status", "deadline_at"])
+
+    # open attempts get a deadline from their skill's time limit (default 10 minutes)
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("""
+            UPDATE attempt SET deadline_at = attempt.started_at + make_interval(mins => COALESCE(skill.time_limit_min, 10))
+            FROM skill
+            WHERE skill.id = attempt.skill_id AND attempt.status = 'in_progress' AND attempt.started_at IS NOT NULL
+        """)
+    else:
+        op.execute("""
+            UPDATE attempt SET deadline_at = datetime(started_at, '+' || COALESCE(
+                (SELECT time_limit_min FROM skill WHERE skill.id = attempt.skill_id), 10) || ' minutes')
+            WHERE status = 'in_progress' AND started_at IS NOT NULL
+        """)
+
+def downgrade():
+    op.drop_index("ix_attempt_status_deadline", table_name="attempt")
+    with op.batch_alter_table("attempt") as batch:
+        batch.drop_column("deadline_at")
@@ -0,0 +1,26 @@
+"""attempt_no: allow extra attempts in the same week
+Revision ID: 0008_attempt_no
+Revises: 0007_attempt_deadline
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_attempt_no"
+down_revision = "0007_attempt_deadline"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("attempt") as batch:
+        batch.add_column(sa.Column("attempt_no", sa.Integer(), nullable=False, server_default="1"))
+        batch.drop_constraint("uq_attempt_week", type_="unique")
+        batch.create_unique_constraint("uq_attempt_week_no", ["student_id", "skill_id", "week_key", "attempt_no"])
+
+def downgrade():
+    op.execute("DELETE FROM attempt WHERE attempt_no > 1")
+    with op.batch_alter_table("attempt") as batch:
+        batch.drop_constraint("uq_attempt_week_no", type_="unique")
+        batch.create_unique_constraint("uq_attempt_week", ["student_id", "skill_id", "week_key"])
+        batch.drop_column("attempt_no")
@@ -0,0 +1,35 @@
+"""indexes for foreign keys and dashboard access paths
+Revision ID: 0009_access_path_indexes
+Revises: 0008_attempt_no
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+revision = "0009_access_path_indexes"
+down_revision = "0008_attempt_no"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_user_role_teacher", "user", ["role", "teacher_id"]),
+    ("ix_student_skill_status_skill", "student_skill_status", ["skill_id"]),
+    ("ix_student_skill_stats_skill", "student_skill_stats", ["skill_id"]),
+    ("ix_question_skill", "question", ["skill_id", "id"]),
+    ("ix_attempt_student_status", "attempt", ["student_id", "status"]),
+    ("ix_attempt_skill", "attempt", ["skill_id", "id"]),
+    ("ix_report_teacher_created", "report", ["teacher_id", "created_at"]),
+    ("ix_remediation_student_skill", "remediation", ["student_id", "skill_id", "created_at"]),
+    ("ix_remediation_teacher_created", "remediation", ["teacher_id", "created_at"]),
+    ("ix_remediation_skill", "remediation", ["skill_id"]),
+    ("ix_import_batch_skill", "import_batch", ["skill_id"]),
+    ("ix_import_item_batch", "import_item", ["batch_id", "id"]),
+]
+
+def upgrade():
+    for name, table, cols in INDEXES:
+        op.create_index(name, table, cols)
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
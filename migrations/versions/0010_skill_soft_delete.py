@@ -0,0 +1,21 @@
+"""skill.deleted_at (soft delete, purged in the background)
+Revision ID: 0010_skill_soft_delete
+Revises: 0009_access_path_indexes
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010_skill_soft_delete"
+down_revision = "0009_access_path_indexes"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("skill") as batch:
+        batch.add_column(sa.Column("deleted_at", sa.DateTime(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table("skill") as batch:
+        batch.drop_column("deleted_at")
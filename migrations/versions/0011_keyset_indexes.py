@@ -0,0 +1,28 @@
+"""(…, created_at) indexes for keyset-paginated lists
+Revision ID: 0011_keyset_indexes
+Revises: 0010_skill_soft_delete
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+revision = "0011_keyset_indexes"
+down_revision = "0010_skill_soft_delete"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_user_role_created", "user", ["role", "created_at"]),
+    ("ix_media_created", "media", ["created_at"]),
+    ("ix_attempt_student_created", "attempt", ["student_id", "created_at"]),
+    ("ix_remediation_student_created", "remediation", ["student_id", "created_at"]),
+    ("ix_import_batch_created", "import_batch", ["created_at"]),
+]
+
+def upgrade():
+    for name, table, cols in INDEXES:
+        op.create_index(name, table, cols)
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,48 @@
+"""student, teacher and skill rollups
+Revision ID: 0012_rollups
+Revises: 0011_keyset_indexes
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0012_rollups"
+down_revision = "0011_keyset_indexes"
+branch_labels = None
+depends_on = None
+
+ROLLUPS = [
+    ("student_rollup", "student_id", "user.id", "a.student_id"),
+    ("teacher_rollup", "teacher_id", "user.id", "u.teacher_id"),
+    ("skill_rollup", "skill_id", "skill.id", "a.skill_id"),
+]
+
+def upgrade():
+    for table, key, ref, source in ROLLUPS:
+        op.create_table(
+            table,
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(key, sa.Integer(), sa.ForeignKey(ref), nullable=False),
+            sa.Column("attempts_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("score_sum", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("passed_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.UniqueConstraint(key, name=f"uq_{table}"),
+        )
+        # Backfill from existing attempts; later changes go through app.rollups.record_attempts
+        op.execute(f"""
+            INSERT INTO {table} ({key}, attempts_count, score_sum, passed_count, updated_at)
+            SELECT {source}, COUNT(a.id), COALESCE(SUM(a.score), 0),
+                   SUM(CASE WHEN a.score >= COALESCE(NULLIF(s.pass_threshold, 0), 60) THEN 1 ELSE 0 END),
+                   CURRENT_TIMESTAMP
+            FROM attempt a
+            JOIN skill s ON s.id = a.skill_id
+            JOIN "user" u ON u.id = a.student_id
+            WHERE a.status = 'submitted' AND {source} IS NOT NULL
+            GROUP BY {source}
+        """)
+
+def downgrade():
+    for table, *_ in reversed(ROLLUPS):
+        op.drop_table(table)
@@ -0,0 +1,31 @@
+"""per-question attempt answers
+Revision ID: 0013_attempt_answer
+Revises: 0012_rollups
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0013_attempt_answer"
+down_revision = "0012_rollups"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "attempt_answer",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("attempt_id", sa.Integer(), sa.ForeignKey("attempt.id"), nullable=False),
+        sa.Column("question_id", sa.Integer(), sa.ForeignKey("question.id"), nullable=False),
+        sa.Column("response", sa.Text(), nullable=True),
+        sa.Column("is_correct", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("time_spent", sa.Integer(), nullable=True),
+        sa.UniqueConstraint("attempt_id", "question_id", name="uq_attempt_answer"),
+    )
+    op.create_index("ix_attempt_answer_question_correct", "attempt_answer", ["question_id", "is_correct"])
+    # existing attempts are filled by `flask backfill-attempt-answers` (grading needs the app)
+
+def downgrade():
+    op.drop_index("ix_attempt_answer_question_correct", table_name="attempt_answer")
+    op.drop_table("attempt_answer")
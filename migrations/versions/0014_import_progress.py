@@ -0,0 +1,29 @@
+"""background document import progress
+Revision ID: 0014_import_progress
+Revises: 0013_attempt_answer
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0014_import_progress"
+down_revision = "0013_attempt_answer"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("import_batch") as batch:
+        batch.add_column(sa.Column("storage_key", sa.String(length=500), nullable=True))
+        batch.add_column(sa.Column("progress_done", sa.Integer(), nullable=False, server_default="0"))
+        batch.add_column(sa.Column("progress_total", sa.Integer(), nullable=True))
+        batch.add_column(sa.Column("truncated", sa.Boolean(), nullable=False, server_default=sa.false()))
+        batch.add_column(sa.Column("error", sa.Text(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table("import_batch") as batch:
+        batch.drop_column("error")
+        batch.drop_column("truncated")
+        batch.drop_column("progress_total")
+        batch.drop_column("progress_done")
+        batch.drop_column("storage_key")
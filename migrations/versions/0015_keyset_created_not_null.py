@@ -0,0 +1,31 @@
+"""created_at NOT NULL on keyset-paginated tables
+Revision ID: 0015_keyset_created_not_null
+Revises: 0014_import_progress
+Create Date: 2026-10-18
+"""
+
+import datetime as dt
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0015_keyset_created_not_null"
+down_revision = "0014_import_progress"
+branch_labels = None
+depends_on = None
+
+# a NULL key cannot be encoded in a pagination cursor
+TABLES = ("user", "media", "attempt", "report", "remediation", "import_batch")
+EPOCH = dt.datetime(1970, 1, 1)
+
+def upgrade():
+    for name in TABLES:
+        t = sa.table(name, sa.column("created_at", sa.DateTime()))
+        # rows without a timestamp sort as the oldest
+        op.execute(t.update().where(t.c.created_at.is_(None)).values(created_at=EPOCH))
+        with op.batch_alter_table(name) as batch:
+            batch.alter_column("created_at", existing_type=sa.DateTime(), nullable=False)
+
+def downgrade():
+    for name in reversed(TABLES):
+        with op.batch_alter_table(name) as batch:
+            batch.alter_column("created_at", existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,31 @@
+"""background roster imports
+Revision ID: 0016_roster_import
+Revises: 0015_keyset_created_not_null
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0016_roster_import"
+down_revision = "0015_keyset_created_not_null"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "roster_import",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("created_by", sa.Integer(), sa.ForeignKey("user.id"), nullable=False),
+        sa.Column("filename", sa.String(length=255), nullable=False),
+        sa.Column("storage_key", sa.String(length=500), nullable=True),
+        sa.Column("status", sa.String(length=20), nullable=False, server_default="processing"),
+        sa.Column("progress_done", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("progress_total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+
+def downgrade():
+    op.drop_table("roster_import")
@@ -0,0 +1,73 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix="althaghr-test-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TMP, 'test.db')}")
+os.environ.setdefault("STORAGE_DIR", os.path.join(_TMP, "storage"))
+os.environ.setdefault("UPLOADS_DIR", os.path.join(_TMP, "storage", "uploads"))
+os.environ.setdefault("MEDIA_DIR", os.path.join(_TMP, "storage", "media"))
+os.environ.setdefault("REPORTS_DIR", os.path.join(_TMP, "storage", "reports"))
+os.environ["SMTP_HOST"] = ""
+
+from app import bundles, create_app, db, item_analysis, progress  # noqa: E402
+from app.models import User, Skill, Question, StudentSkillStatus  # noqa: E402
+
+@pytest.fixture()
+def app():
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    # per-process caches are keyed by ids that the next test's fresh database reuses
+    bundles.clear()
+    item_analysis.clear()
+    progress.clear()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+@pytest.fixture()
+def school(app):
+    """A teacher, one student of that teacher and an unlocked two-question skill."""
+    teacher = User(username="t1", name_ar="معلم", role="teacher", email="t1@example.com")
+    db.session.add(teacher)
+    db.session.flush()
+    student = User(username="student_s1", name_ar="طالب", role="student", student_id="S1", teacher_id=teacher.id)
+    skill = Skill(name_ar="مهارة", order=1, pass_threshold=60, time_limit_min=10)
+    db.session.add_all([student, skill])
+    db.session.flush()
+    db.session.add_all([
+        Question(skill_id=skill.id, qtype="mcq_single", prompt_ar="س1",
+                 options_json={"choices": [{"id": "a", "text_ar": "1"}, {"id": "b", "text_ar": "2"}]},
+                 correct_json={"answers": ["b"]}),
+        Question(skill_id=skill.id, qtype="short", prompt_ar="س2", correct_json={"answers": ["نعم"]}),
+        StudentSkillStatus(student_id=student.id, skill_id=skill.id, unlocked=True),
+    ])
+    db.session.commit()
+    return {"teacher_id": teacher.id, "student_id": student.id, "skill_id": skill.id}
+
+def login_as(client, user_id: int):
+    from flask import g, has_app_context
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+        sess["_fresh"] = True
+    # requests share the fixture's app context, so drop Flask-Login's cached user
+    if has_app_context():
+        g.pop("_login_user", None)
+
+@contextmanager
+def max_queries(budget: int):
+    """Fail if the block runs more than ``budget`` SQL statements."""
+    from app import sqltrace
+    with sqltrace.capture() as stats:
+        yield stats
+    assert stats.count <= budget, f"{stats.count} queries (budget {budget}):\n" + "\n".join(
+        f"{n}x {s}" for s, n in stats.shapes.most_common())
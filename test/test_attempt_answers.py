@@ -0,0 +1,78 @@
+import datetime as dt
+import json
+from app import attempt_answers, db, deadlines
+from app.models import Attempt, AttemptAnswer, Question, Skill, User
+from app.utils import now_utc
+from conftest import login_as
+
+def test_answers_are_stored_per_question_and_backfilled(app, client, school):
+    sid, kid = school["student_id"], school["skill_id"]
+    q1, q2 = [q.id for q in Question.query.order_by(Question.id).all()]
+    classmate = User(username="student_s2", name_ar="طالب٢", role="student", student_id="S2", teacher_id=school["teacher_id"])
+    db.session.add(classmate)
+    db.session.flush()
+    skill = db.session.get(Skill, kid)
+    live = Attempt(student_id=sid, skill_id=kid, week_key="2026-W10", status="in_progress", started_at=now_utc())
+    old = now_utc() - dt.timedelta(hours=1)
+    expired = Attempt(student_id=classmate.id, skill_id=kid, week_key="2026-W10", status="in_progress",
+                      started_at=old, deadline_at=deadlines.deadline_for(skill, old),
+                      draft_answers_json=json.dumps({str(q1): ["a"], str(q2): ["نعم"]}))
+    legacy = Attempt(student_id=sid, skill_id=kid, week_key="2026-W09", status="submitted", score=0,
+                     answers_json={str(q1): ["a"], str(q2): ["لا"]})
+    db.session.add_all([live, expired, legacy])
+    db.session.commit()
+
+    login_as(client, sid)
+    client.post(f"/student/attempt/{live.id}/submit", data={f"q_{q1}": "b", f"q_{q2}": "نعم"})
+    assert deadlines.sweep_expired() == 1
+    rows = {(r.attempt_id, r.question_id): (json.loads(r.response), r.is_correct) for r in AttemptAnswer.query}
+    assert rows == {
+        (live.id, q1): (["b"], True), (live.id, q2): (["نعم"], True),
+        (expired.id, q1): (["a"], False), (expired.id, q2): (["نعم"], True),
+    }
+
+    assert attempt_answers.backfill(batch_size=1) == 1
+    assert attempt_answers.backfill() == 0
+    assert attempt_answers.item_stats(kid) == [(q1, 3, 1), (q2, 3, 2)]
+    assert attempt_answers.missed_by(q1) == sorted([sid, classmate.id])
+    assert attempt_answers.missed_by(q2) == [sid]
+
+    login_as(client, school["teacher_id"])
+    client.post(f"/teacher/questions/{q2}/delete")
+    assert {r.question_id for r in AttemptAnswer.query} == {q1}
+
+def test_regrade_rewrites_correctness(app, school):
+    q1 = Question.query.order_by(Question.id).first()
+    a = Attempt(student_id=school["student_id"], skill_id=school["skill_id"], week_key="2026-W09",
+                status="submitted", score=0, answers_json={str(q1.id): ["a"]})
+    db.session.add(a)
+    db.session.commit()
+    attempt_answers.backfill()
+    q1.correct_json = {"answers": ["a"]}
+    db.session.commit()
+    assert app.test_cli_runner().invoke(args=["regrade", "--skill-id", str(school["skill_id"])]).exit_code == 0
+    assert AttemptAnswer.query.filter_by(question_id=q1.id).one().is_correct
+    assert AttemptAnswer.query.count() == 2
+
+def test_regrade_refreshes_stats_rollups_and_completion(app, school):
+    from app import rollups, stats
+    from app.models import StudentRollup, StudentSkillStats, StudentSkillStatus
+    q1, q2 = Question.query.order_by(Question.id).all()
+    a = Attempt(student_id=school["student_id"], skill_id=school["skill_id"], week_key="2026-W09",
+                status="submitted", score=100, answers_json={str(q1.id): ["b"], str(q2.id): ["نعم"]})
+    db.session.add(a)
+    db.session.flush()
+    stats.record_attempt(a)
+    rollups.record_attempt(a, True)
+    StudentSkillStatus.query.filter_by(student_id=school["student_id"]).update({"completed": True})
+    db.session.commit()
+
+    q1.correct_json = {"answers": ["a"]}
+    db.session.commit()
+    assert app.test_cli_runner().invoke(args=["regrade", "--skill-id", str(school["skill_id"])]).exit_code == 0
+    db.session.expire_all()
+    st = StudentSkillStats.query.filter_by(student_id=school["student_id"]).one()
+    assert (st.score_sum, st.best_score, st.last_score) == (50, 50, 50)
+    r = StudentRollup.query.filter_by(student_id=school["student_id"]).one()
+    assert (r.attempts_count, r.score_sum, r.passed_count) == (1, 50, 0)
+    assert not StudentSkillStatus.query.filter_by(student_id=school["student_id"]).one().completed
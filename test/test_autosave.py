@@ -0,0 +1,23 @@
+import json
+from app import db
+from app.models import Attempt, Question
+from conftest import login_as
+
+def test_autosave_merges_deltas_and_closes_on_submit(client, school):
+    login_as(client, school["student_id"])
+    a = Attempt(student_id=school["student_id"], skill_id=school["skill_id"], week_key="2026-W01", status="in_progress")
+    db.session.add(a)
+    db.session.commit()
+    q1, q2 = [str(q.id) for q in Question.query.order_by(Question.id).all()]
+    url = f"/student/attempt/{a.id}/autosave"
+
+    assert client.post(url, json={"changes": {q1: ["a"]}}).status_code == 200
+    assert client.post(url, json={"changes": {q2: ["نعم"]}}).status_code == 200
+    assert client.post(url, json={"changes": {q1: ["b"]}}).status_code == 200
+    assert client.post(url, json={"changes": {"x": "b"}}).status_code == 400
+    db.session.expire_all()
+    assert json.loads(db.session.get(Attempt, a.id).draft_answers_json) == {q1: ["b"], q2: ["نعم"]}
+    assert f'"{q1}": ["b"]' in client.get(f"/student/attempt/{a.id}").get_data(as_text=True)
+
+    client.post(f"/student/attempt/{a.id}/submit", data={f"q_{q1}": "b", f"q_{q2}": "نعم"})
+    assert client.post(url, json={"changes": {q1: ["a"]}}).status_code == 409
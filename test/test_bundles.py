@@ -0,0 +1,25 @@
+from app import bundles, db
+from app.models import Question, Skill
+from conftest import login_as
+
+def test_bundle_is_cached_until_version_bump(app, school):
+    skill = db.session.get(Skill, school["skill_id"])
+    first = bundles.get_bundle(skill)
+    assert bundles.get_bundle(skill) is first
+    assert len(first.questions) == 2 and 'name="q_' in first.body_html
+
+    db.session.add(Question(skill_id=skill.id, qtype="numeric", prompt_ar="س3", correct_json={"answers": ["4"]}))
+    bundles.bump_version(skill.id)
+    db.session.commit()
+    db.session.refresh(skill)
+    second = bundles.get_bundle(skill)
+    assert second is not first and len(second.questions) == 3
+
+def test_teacher_question_edit_bumps_version(client, school):
+    before = db.session.get(Skill, school["skill_id"]).content_version
+    login_as(client, school["teacher_id"])
+    r = client.post("/teacher/questions/new", data={"skill_id": school["skill_id"], "qtype": "short",
+                                                    "prompt_ar": "جديد", "correct": "x"})
+    assert r.status_code == 302
+    db.session.expire_all()
+    assert db.session.get(Skill, school["skill_id"]).content_version == before + 1
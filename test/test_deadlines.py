@@ -0,0 +1,112 @@
+import datetime as dt
+import json
+from app import db, deadlines
+from app.models import (Attempt, AttemptAnswer, Job, Question, StudentRollup, StudentSkillStats, StudentSkillStatus,
+                        Skill, User)
+from app.routes import student as student_routes
+from conftest import login_as
+
+def test_sweep_submits_expired_attempts_from_drafts(school):
+    q1, q2 = [str(q.id) for q in Question.query.order_by(Question.id).all()]
+    now = dt.datetime(2026, 3, 2, 10, 0)
+    other = User(username="student_s2", name_ar="طالب٢", role="student", student_id="S2", teacher_id=school["teacher_id"])
+    db.session.add(other)
+    db.session.flush()
+    started = now - dt.timedelta(minutes=30)
+    skill = db.session.get(Skill, school["skill_id"])
+    expired = Attempt(student_id=school["student_id"], skill_id=skill.id, week_key="2026-W10", status="in_progress",
+                      started_at=started, deadline_at=deadlines.deadline_for(skill, started),
+                      draft_answers_json=json.dumps({q1: ["b"], q2: ["نعم"]}))
+    blank = Attempt(student_id=other.id, skill_id=skill.id, week_key="2026-W10", status="in_progress",
+                    started_at=started, deadline_at=deadlines.deadline_for(skill, started))
+    running = Attempt(student_id=school["student_id"], skill_id=skill.id, week_key="2026-W11", status="in_progress",
+                      started_at=now, deadline_at=deadlines.deadline_for(skill, now))
+    db.session.add_all([expired, blank, running])
+    db.session.commit()
+
+    assert deadlines.sweep_expired(batch_size=1, now=now) == 2
+    assert deadlines.sweep_expired(now=now) == 0
+    db.session.expire_all()
+
+    a = db.session.get(Attempt, expired.id)
+    assert (a.status, a.score, a.time_seconds, a.draft_answers_json) == ("submitted", 100, 600, None)
+    assert a.answers_json == {q1: ["b"], q2: ["نعم"]}
+    b = db.session.get(Attempt, blank.id)
+    assert (b.status, b.score) == ("submitted", 0)
+    assert db.session.get(Attempt, running.id).status == "in_progress"
+
+    assert StudentSkillStatus.query.filter_by(student_id=school["student_id"]).one().completed
+    assert StudentSkillStats.query.filter_by(student_id=other.id).one().attempts_count == 1
+    assert {j.ref for j in Job.query.filter_by(kind="publish_report")} == {f"attempt:{expired.id}", f"attempt:{blank.id}"}
+
+def test_sweep_merges_attempts_of_the_same_student_and_skill(school):
+    from sqlalchemy import event
+    now = dt.datetime(2026, 3, 2, 10, 0)
+    skill = db.session.get(Skill, school["skill_id"])
+    q1 = str(Question.query.order_by(Question.id).first().id)
+    for no, (minutes, draft) in enumerate(((50, {}), (30, {q1: ["b"]})), 1):
+        started = now - dt.timedelta(minutes=minutes)
+        db.session.add(Attempt(student_id=school["student_id"], skill_id=skill.id, week_key="2026-W10", attempt_no=no,
+                               status="in_progress", started_at=started, deadline_at=deadlines.deadline_for(skill, started),
+                               draft_answers_json=json.dumps(draft)))
+    db.session.commit()
+
+    upserts = []
+    def spy(conn, cursor, statement, params, context, executemany):
+        if statement.startswith("INSERT INTO student_skill_stats"):
+            upserts.append(len(params) if executemany else 1)
+    event.listen(db.engine, "before_cursor_execute", spy)
+    try:
+        assert deadlines.sweep_expired(now=now) == 2
+    finally:
+        event.remove(db.engine, "before_cursor_execute", spy)
+
+    # one parameter set per (student, skill), as Postgres needs for a multi-row upsert
+    assert upserts == [1]
+    st = StudentSkillStats.query.filter_by(student_id=school["student_id"]).one()
+    last = Attempt.query.filter_by(attempt_no=2).one()
+    assert (st.attempts_count, st.score_sum, st.best_score, st.last_score, st.last_attempt_id) == (2, 50, 50, 50, last.id)
+
+def _expired_attempt(school, draft: dict):
+    skill = db.session.get(Skill, school["skill_id"])
+    started = dt.datetime.utcnow() - dt.timedelta(hours=1)
+    a = Attempt(student_id=school["student_id"], skill_id=skill.id, week_key="2026-W10", status="in_progress",
+                started_at=started, deadline_at=deadlines.deadline_for(skill, started), draft_answers_json=json.dumps(draft))
+    db.session.add(a)
+    db.session.commit()
+    return a.id
+
+def test_submit_that_loses_the_race_to_the_sweeper_records_nothing(client, school, monkeypatch):
+    q1, q2 = [str(q.id) for q in Question.query.order_by(Question.id).all()]
+    attempt_id = _expired_attempt(school, {q1: ["a"]})
+    real = student_routes.get_bundle
+    def sweep_first(skill):  # the sweeper commits between submit's status check and its write
+        deadlines.sweep_expired(grace_seconds=0)
+        return real(skill)
+    monkeypatch.setattr(student_routes, "get_bundle", sweep_first)
+    login_as(client, school["student_id"])
+    resp = client.post(f"/student/attempt/{attempt_id}/submit", data={f"q_{q1}": "b", f"q_{q2}": "نعم"})
+    assert resp.status_code == 302 and resp.headers["Location"].endswith(f"/attempt/{attempt_id}/result")
+
+    db.session.expire_all()
+    a = db.session.get(Attempt, attempt_id)
+    assert (a.score, a.answers_json) == (0, {q1: ["a"], q2: []})  # the sweeper's grading stands
+    assert AttemptAnswer.query.filter_by(attempt_id=attempt_id).count() == 2
+    assert StudentSkillStats.query.filter_by(student_id=school["student_id"]).one().attempts_count == 1
+    assert StudentRollup.query.filter_by(student_id=school["student_id"]).one().attempts_count == 1
+    assert Job.query.filter_by(kind="publish_report").count() == 1
+
+def test_double_submit_records_once(client, school):
+    q1, q2 = [str(q.id) for q in Question.query.order_by(Question.id).all()]
+    a = Attempt(student_id=school["student_id"], skill_id=school["skill_id"], week_key="2026-W10",
+                status="in_progress", started_at=dt.datetime.utcnow())
+    db.session.add(a)
+    db.session.commit()
+    login_as(client, school["student_id"])
+    form = {f"q_{q1}": "b", f"q_{q2}": "نعم"}
+    assert client.post(f"/student/attempt/{a.id}/submit", data=form).status_code == 302
+    assert client.post(f"/student/attempt/{a.id}/submit", data={f"q_{q1}": "a"}).status_code == 302
+    db.session.expire_all()
+    assert db.session.get(Attempt, a.id).score == 100
+    assert StudentSkillStats.query.filter_by(student_id=school["student_id"]).one().attempts_count == 1
+    assert Job.query.filter_by(kind="publish_report").count() == 1
@@ -0,0 +1,96 @@
+import io
+from contextlib import contextmanager
+import fitz
+from docx import Document
+from app import db, doc_import, jobs
+from app.models import ImportBatch, ImportItem, Question
+from conftest import login_as
+
+def _pdf(pages: int) -> bytes:
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"Question {i}")
+    return doc.tobytes()
+
+def _docx(paragraphs: int) -> bytes:
+    doc = Document()
+    for i in range(paragraphs):
+        doc.add_paragraph(f"Q{i}")
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+def _upload(client, school, data: bytes, name: str):
+    login_as(client, school["teacher_id"])
+    resp = client.post("/import/upload", data={"skill_id": school["skill_id"], "file": (io.BytesIO(data), name)},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 302
+    return ImportBatch.query.order_by(ImportBatch.id.desc()).first()
+
+def test_upload_defers_extraction_to_the_worker(app, client, school):
+    app.config.update(IMPORT_CHUNK_ITEMS=3)
+    batch = _upload(client, school, _pdf(5), "exam.pdf")
+    assert batch.status == "processing" and ImportItem.query.count() == 0
+    assert client.get(f"/import/{batch.id}/progress").get_json() == {"status": "processing", "done": 0, "total": None}
+    assert client.post(f"/import/{batch.id}/apply").status_code == 302
+    assert Question.query.count() == 2
+
+    assert jobs.run_pending() == 1
+    db.session.expire_all()
+    assert (batch.status, batch.progress_done, batch.progress_total) == ("draft", 5, 5)
+    texts = [t for (t,) in db.session.query(ImportItem.raw_text).order_by(ImportItem.id)]
+    assert texts == [f"Question {i}" for i in range(5)]
+    assert "Question 4" in client.get(f"/import/{batch.id}/review").get_data(as_text=True)
+
+def test_item_cap_is_configurable_and_the_review_form_fits(app, client, school):
+    app.config.update(IMPORT_MAX_ITEMS=300)
+    batch = _upload(client, school, _docx(320), "exam.docx")
+    jobs.run_pending()
+    db.session.expire_all()
+    assert batch.status == "draft" and batch.truncated
+    items = ImportItem.query.filter_by(batch_id=batch.id).order_by(ImportItem.id).all()
+    assert len(items) == 300
+    form = {}
+    for it in items:  # 1200 fields: the review form is urlencoded, which werkzeug's max_form_parts does not cap
+        form.update({f"type_{it.id}": "short", f"prompt_{it.id}": it.raw_text, f"choices_{it.id}": "",
+                     f"correct_{it.id}": "x"})
+    assert client.post(f"/import/{batch.id}/apply", data=form).status_code == 302
+    assert Question.query.filter_by(skill_id=school["skill_id"]).count() == 302
+
+def test_truncation_closes_the_page_iterator(app, client, school, monkeypatch):
+    app.config.update(IMPORT_MAX_ITEMS=2)
+    events = []
+    def units():
+        try:
+            for i in range(5):
+                yield [f"Q{i}"]
+        finally:
+            events.append("closed")
+    @contextmanager
+    def local_copy(key):
+        yield key
+        events.append("file released")
+    monkeypatch.setattr(doc_import, "document_blocks", lambda path, source_type, **kw: (5, units()))
+    monkeypatch.setattr(doc_import, "local_copy", local_copy)
+    batch = _upload(client, school, _pdf(1), "exam.pdf")
+    jobs.run_pending()
+    db.session.expire_all()
+    assert batch.truncated and events == ["closed", "file released"]
+
+def test_unreadable_file_marks_the_batch_failed(client, school):
+    batch = _upload(client, school, b"not a pdf", "broken.pdf")
+    jobs.run_pending()
+    db.session.expire_all()
+    assert batch.status == "failed" and batch.error
+    assert ImportItem.query.filter_by(batch_id=batch.id).count() == 0
+
+def test_parallel_pdf_extraction_keeps_page_order(tmp_path):
+    path = tmp_path / "bank.pdf"
+    path.write_bytes(_pdf(11))
+    total, pages = doc_import.pdf_page_blocks(str(path), workers=2, pages_per_task=3)
+    assert total == 11
+    assert list(pages) == [[f"Question {i}"] for i in range(11)]
+    _, serial = doc_import.pdf_page_blocks(str(path), workers=1)
+    _, early = doc_import.pdf_page_blocks(str(path), workers=2, pages_per_task=2)
+    assert next(early) == next(serial) == ["Question 0"]
+    early.close()
@@ -0,0 +1,68 @@
+import csv
+import io
+import pytest
+from app import db, exports
+from app.models import Attempt, Question, User
+from conftest import login_as
+
+def _seed(school):
+    q1, q2 = [q.id for q in Question.query.order_by(Question.id).all()]
+    other_teacher = User(username="t2", name_ar="معلم٢", role="teacher")
+    db.session.add(other_teacher)
+    db.session.flush()
+    outsider = User(username="student_s2", name_ar="=HYPERLINK()", role="student", student_id="S2",
+                    teacher_id=other_teacher.id)
+    db.session.add(outsider)
+    db.session.flush()
+    for sid, answers in ((school["student_id"], {str(q1): ["b"], str(q2): ["نعم", "لا"]}), (outsider.id, {str(q1): ["a"]})):
+        db.session.add(Attempt(student_id=sid, skill_id=school["skill_id"], week_key="2026-W10",
+                               status="submitted", score=50, answers_json=answers))
+    db.session.commit()
+    return q1, q2
+
+def _csv(resp):
+    assert resp.is_streamed
+    text = resp.get_data(as_text=True)
+    assert text.startswith("\ufeff")
+    return list(csv.DictReader(io.StringIO(text[1:])))
+
+def test_csv_exports_flatten_answers_and_respect_scope(app, client, school):
+    app.config.update(EXPORT_BATCH_ROWS=1)
+    q1, q2 = _seed(school)
+    db.session.add(User(username="boss", name_ar="رئيس", role="chairman"))
+    db.session.commit()
+
+    login_as(client, User.query.filter_by(username="boss").one().id)
+    rows = _csv(client.get(f"/chairman/export/attempts?skill_id={school['skill_id']}"))
+    assert [(r["student_id"], r[f"q_{q1}"], r[f"q_{q2}"]) for r in rows] == [("S1", "b", "نعم|لا"), ("S2", "a", "")]
+    rows = _csv(client.get("/chairman/export/attempts"))
+    assert rows[0]["answers"] == f"{q1}=b; {q2}=نعم|لا"
+    students = _csv(client.get("/chairman/export/students"))
+    assert [s["name_ar"] for s in students] == ["طالب", "'=HYPERLINK()"]
+    assert len(_csv(client.get("/chairman/export/questions"))) == 2
+    assert client.get("/chairman/export/grades").status_code == 404
+
+    login_as(client, school["teacher_id"])
+    assert [r["student_id"] for r in _csv(client.get("/teacher/export/attempts"))] == ["S1"]
+    assert [s["student_id"] for s in _csv(client.get("/teacher/export/students"))] == ["S1"]
+
+def test_parquet_export_is_written_in_batches(app, client, school):
+    pq = pytest.importorskip("pyarrow.parquet")
+    app.config.update(EXPORT_BATCH_ROWS=1)
+    q1, _ = _seed(school)
+    login_as(client, school["teacher_id"])
+    resp = client.get(f"/teacher/export/attempts?format=parquet&skill_id={school['skill_id']}")
+    f = pq.ParquetFile(io.BytesIO(resp.get_data()))
+    assert f.metadata.num_rows == 1
+    assert f.read().column(f"q_{q1}").to_pylist() == ["b"]
+
+def test_parquet_without_pyarrow_falls_back_to_a_message(client, school, monkeypatch):
+    def missing():
+        raise exports.ExportUnavailable("no pyarrow")
+    monkeypatch.setattr(exports, "_pyarrow", missing)
+    login_as(client, school["teacher_id"])
+    assert client.get("/teacher/export/students?format=parquet").status_code == 302
+
+def test_formula_escape_leaves_numbers_alone():
+    assert [exports._cell(v) for v in ("-3.5", "+2", "-1e3", "-", "-2+3", "=1+1", "@x", "\tx", "نص", 7)] == \
+        ["-3.5", "+2", "-1e3", "'-", "'-2+3", "'=1+1", "'@x", "'\tx", "نص", 7]
@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+import pytest
+
+from werkzeug.datastructures import MultiDict
+
+from app.grading import GRADERS, Grader, compile_answer_key, register_grader
+
+def _q(qid, qtype, answers):
+    return SimpleNamespace(id=qid, qtype=qtype, correct_json={"answers": answers})
+
+def test_answer_key_grades_all_registered_types():
+    key = compile_answer_key([
+        _q(1, "mcq_single", ["b"]),
+        _q(2, "mcq_multi", ["a", "c"]),
+        _q(3, "true_false", ["t"]),
+        _q(4, "image_mcq_single", ["2"]),
+        _q(5, "short", ["Cairo"]),
+        _q(6, "numeric", ["3.5"]),
+    ])
+    form = MultiDict([("q_1", "b"), ("q_2", "c"), ("q_2", "a"), ("q_3", "t"),
+                      ("q_4", "1"), ("q_5", "  cairo "), ("q_6", "٣٫٥")])
+    answers = key.collect(form)
+    assert answers["2"] == ["c", "a"]
+
+    res = key.grade(answers)
+    assert res.per_question == {"1": True, "2": True, "3": True, "4": False, "5": True, "6": True}
+    assert (res.correct, res.total, res.score) == (5, 6, 83)
+
+def test_batch_grading_and_unknown_types():
+    key = compile_answer_key([_q(1, "mcq_single", ["a"]), _q(2, "essay", ["x"]), _q(3, "mcq_multi", [])])
+    results = key.grade_many([{"1": ["a"], "2": ["x"], "3": []}, {"1": ["b"]}, None])
+    assert [r.score for r in results] == [33, 0, 0]
+
+def test_a_grader_without_check_fails_at_registration():
+    with pytest.raises(TypeError):
+        @register_grader("broken")
+        class Broken(Grader):
+            pass
+    assert "broken" not in GRADERS
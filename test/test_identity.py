@@ -0,0 +1,36 @@
+from app import db, identity
+from app.models import User
+from conftest import login_as, max_queries
+
+def _user_selects(stats):
+    return sum(n for s, n in stats.shapes.items() if s.startswith("SELECT") and "FROM user WHERE user.id = ?" in s)
+
+def test_identity_is_cached_and_dropped_on_update(client, school):
+    other = User(username="t2", name_ar="معلم٢", role="teacher")
+    db.session.add(other)
+    db.session.commit()
+    login_as(client, school["student_id"])
+    client.get("/student/dashboard")
+    login_as(client, school["student_id"])
+    with max_queries(10) as stats:
+        assert client.get("/student/dashboard").status_code == 200
+    assert _user_selects(stats) == 0
+
+    login_as(client, school["student_id"])
+    client.post("/student/select-teacher", data={"teacher_id": other.id})
+    assert identity.cache.get(school["student_id"]) is None
+    login_as(client, school["student_id"])
+    client.get("/student/dashboard")
+    assert identity.cache.get(school["student_id"]).teacher_id == other.id
+
+def test_cache_ttl_and_lru(monkeypatch):
+    cache = identity.IdentityCache(max_size=2, ttl=10)
+    clock = [100.0]
+    monkeypatch.setattr(identity.time, "monotonic", lambda: clock[0])
+    for uid in (1, 2):
+        cache.put(identity.Identity(id=uid, role="student"))
+    assert cache.get(1).id == 1  # 1 is now the most recent
+    cache.put(identity.Identity(id=3, role="student"))
+    assert cache.get(2) is None and cache.get(1) and cache.get(3)
+    clock[0] += 11
+    assert cache.get(1) is None
@@ -0,0 +1,90 @@
+import statistics
+from app import attempt_answers, db, item_analysis
+from app.models import Attempt, Question, Skill, User
+from conftest import login_as
+
+# rows: students; columns: q1 (choice a/b, key b), q2 (text), q3 (choice x/y, key x)
+RESPONSES = [
+    (["b"], ["نعم"], ["x"]),
+    (["b"], ["لا"], ["x"]),
+    (["a"], ["نعم"], ["y"]),
+    (["a"], ["لا"], ["y"]),
+    (["b"], ["نعم"], ["y"]),
+]
+CORRECT = [(1, 1, 1), (1, 0, 1), (0, 1, 0), (0, 0, 0), (1, 1, 0)]
+
+def _seed(school):
+    skill = db.session.get(Skill, school["skill_id"])
+    db.session.add(Question(skill_id=skill.id, qtype="mcq_single", prompt_ar="س3",
+                            options_json={"choices": [{"id": "x", "text_ar": "1"}, {"id": "y", "text_ar": "2"}]},
+                            correct_json={"answers": ["x"]}))
+    students = [db.session.get(User, school["student_id"])]
+    for i in range(1, len(RESPONSES)):
+        students.append(User(username=f"s{i}", name_ar=f"ط{i}", role="student", student_id=f"X{i}",
+                             teacher_id=school["teacher_id"] if i < 3 else None))
+    db.session.add_all(students)
+    db.session.flush()
+    qids = [str(q.id) for q in Question.query.filter_by(skill_id=skill.id).order_by(Question.id)]
+    # an older, all-wrong attempt of the first student must be ignored
+    older = Attempt(student_id=students[0].id, skill_id=skill.id, week_key="2026-W01", status="submitted",
+                    answers_json={qids[0]: ["a"]})
+    db.session.add(older)
+    db.session.flush()
+    for s, resp in zip(students, RESPONSES):
+        db.session.add(Attempt(student_id=s.id, skill_id=skill.id, week_key="2026-W02", status="submitted",
+                               answers_json=dict(zip(qids, resp))))
+    db.session.commit()
+    attempt_answers.backfill()
+    return skill, [int(q) for q in qids]
+
+def test_item_statistics_match_textbook_formulas(app, school):
+    skill, qids = _seed(school)
+    res = item_analysis.analyze(skill)
+    assert res.students == len(RESPONSES)
+
+    totals = [sum(r) for r in CORRECT]
+    for j, qid in enumerate(qids):
+        col = [r[j] for r in CORRECT]
+        rest = [t - c for t, c in zip(totals, col)]
+        it = res.items[qid]
+        assert it.n == 5
+        assert it.p_value == round(sum(col) / 5, 4)
+        assert abs(it.discrimination - statistics.correlation(col, rest)) < 1e-3
+    ps = [sum(r[j] for r in CORRECT) / 5 for j in range(3)]
+    kr20 = 3 / 2 * (1 - sum(p * (1 - p) for p in ps) / statistics.pvariance(totals))
+    assert abs(res.kr20 - kr20) < 1e-3
+    assert res.items[qids[0]].distractors == (("a", 0.4), ("b", 0.6))
+    assert res.items[qids[1]].distractors == ()
+
+    # the teacher's class is the fixture student plus two classmates
+    assert item_analysis.analyze(skill, school["teacher_id"]).students == 3
+    assert item_analysis.analyze(skill) is res  # cached until a new attempt or edit
+
+def test_cache_follows_class_membership_and_removed_attempts(app, school):
+    skill, qids = _seed(school)
+    assert item_analysis.analyze(skill).items[qids[0]].distractors == (("a", 0.4), ("b", 0.6))
+    assert item_analysis.analyze(skill, school["teacher_id"]).students == 3
+    db.session.get(User, User.query.filter_by(student_id="X3").one().id).teacher_id = school["teacher_id"]
+    db.session.commit()
+    assert item_analysis.analyze(skill, school["teacher_id"]).students == 4
+
+    newest = Attempt.query.order_by(Attempt.id.desc()).first()
+    first = Attempt.query.filter_by(student_id=school["student_id"], week_key="2026-W02").one()
+    db.session.delete(first)  # not the newest attempt, as when a purge or a class change drops one
+    db.session.commit()
+    assert Attempt.query.order_by(Attempt.id.desc()).first().id == newest.id
+    # the older, all-wrong attempt takes its place
+    assert item_analysis.analyze(skill).items[qids[0]].distractors == (("a", 0.6), ("b", 0.4))
+    assert item_analysis.analyze(skill, school["teacher_id"]).students == 4
+
+def test_question_pages_show_item_statistics(app, client, school):
+    skill, qids = _seed(school)
+    login_as(client, school["teacher_id"])
+    body = client.get(f"/teacher/questions?skill_id={skill.id}").get_data(as_text=True)
+    assert "KR-20" in body and "a: 33%" in body
+    chairman = User(username="boss", name_ar="رئيس", role="chairman")
+    db.session.add(chairman)
+    db.session.commit()
+    login_as(client, chairman.id)
+    body = client.get(f"/chairman/questions?skill_id={skill.id}").get_data(as_text=True)
+    assert "a: 40%" in body
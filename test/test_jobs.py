@@ -0,0 +1,76 @@
+import datetime as dt
+from sqlalchemy import update
+from app import db, jobs
+from app.jobs import job_handler, enqueue
+from app.models import Attempt, EmailOutbox, Job, Question, Report
+from conftest import login_as
+
+def _submit(client, school):
+    login_as(client, school["student_id"])
+    r = client.get(f"/student/skill/{school['skill_id']}/start")
+    attempt_id = int(r.headers["Location"].rstrip("/").split("/")[-1])
+    qs = Question.query.filter_by(skill_id=school["skill_id"]).order_by(Question.id).all()
+    r = client.post(f"/student/attempt/{attempt_id}/submit", data={f"q_{qs[0].id}": "b", f"q_{qs[1].id}": "لا"})
+    assert r.status_code == 302
+    return attempt_id
+
+def test_submit_defers_report_to_worker(client, school):
+    attempt_id = _submit(client, school)
+    attempt = db.session.get(Attempt, attempt_id)
+    assert attempt.status == "submitted" and attempt.score == 50
+    assert Report.query.count() == 0
+    assert Job.query.filter_by(ref=f"attempt:{attempt_id}", kind="publish_report").one().status == "queued"
+
+    assert jobs.run_pending() == 2  # publish_report, then notify_teacher
+    assert Report.query.filter_by(attempt_id=attempt_id).one().teacher_id == school["teacher_id"]
+    assert EmailOutbox.query.count() == 1
+
+def test_failed_job_is_retried_then_marked_failed(app):
+    calls = []
+
+    @job_handler("test_flaky")
+    def flaky(payload):
+        calls.append(payload["n"])
+        raise RuntimeError("boom")
+
+    app.config["JOB_RETRY_BASE_SECONDS"] = 0
+    enqueue("test_flaky", {"n": 1}, max_attempts=2)
+    db.session.commit()
+
+    jobs.run_pending()
+    job = Job.query.one()
+    assert calls == [1, 1]
+    assert job.status == "failed" and job.attempts == 2
+    assert "boom" in job.last_error
+
+def test_stale_jobs_are_requeued_until_their_attempts_run_out(app):
+    long_ago = dt.datetime.utcnow() - dt.timedelta(hours=1)
+    crashy = enqueue("test_crashy", max_attempts=2)
+    retry = enqueue("test_crashy", max_attempts=2)
+    crashy.status, crashy.attempts, crashy.locked_at = "running", 2, long_ago
+    retry.status, retry.attempts, retry.locked_at = "running", 1, long_ago
+    db.session.commit()
+    assert jobs.requeue_stale() == 1
+    assert (crashy.status, retry.status) == ("failed", "queued")
+
+def test_heartbeat_keeps_a_long_job_from_being_requeued(app):
+    seen = []
+
+    @job_handler("test_long")
+    def long_job(payload):
+        # as if the lock had been taken an hour ago
+        db.session.execute(update(Job).values(locked_at=dt.datetime.utcnow() - dt.timedelta(hours=1)))
+        jobs.heartbeat()
+        db.session.commit()
+        seen.append(jobs.requeue_stale())
+
+    enqueue("test_long")
+    db.session.commit()
+    assert jobs.run_pending() == 1
+    assert seen == [0] and Job.query.one().status == "done"
+
+def test_standalone_worker_refuses_local_storage_and_sqlite(app):
+    app.config.update(STORAGE_BACKEND="local")
+    res = app.test_cli_runner().invoke(args=["worker", "--standalone", "--once"])
+    assert res.exit_code == 1 and "STORAGE_BACKEND must be s3" in res.output and "SQLite" in res.output
+    assert app.test_cli_runner().invoke(args=["worker", "--once"]).exit_code == 0
@@ -0,0 +1,99 @@
+import datetime as dt
+import socket
+
+import pytest
+
+from app import db, mailer
+from app.mailer import build_digests, flush_outbox, queue_email
+from app.models import EmailOutbox
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+class _Collector:
+    def __init__(self):
+        self.messages = []
+        self.sessions = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 OK"
+
+@pytest.fixture()
+def smtp(app):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    handler = _Collector()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    app.config.update(SMTP_HOST="127.0.0.1", SMTP_PORT=port, SMTP_TLS=False, SMTP_USER="",
+                      SMTP_FROM="noreply@example.com", SMTP_MAX_PER_SECOND=0)
+    yield handler
+    controller.stop()
+
+def test_outbox_reuses_one_connection(smtp, tmp_path):
+    pdf = tmp_path / "r.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+    for i in range(5):
+        queue_email(f"t{i}@example.com", f"report {i}", "body", attachment_path=str(pdf))
+    db.session.commit()
+
+    assert flush_outbox() == 5
+    assert len(smtp.messages) == 5
+    assert smtp.sessions == 1
+    assert EmailOutbox.query.filter_by(status="sent").count() == 5
+
+def test_digest_bundles_held_reports(smtp):
+    for i in range(3):
+        queue_email("teacher@example.com", f"report {i}", "", digest="hourly")
+    db.session.commit()
+    assert flush_outbox() == 0
+
+    assert build_digests(now=dt.datetime.utcnow() + dt.timedelta(hours=2)) == 1
+    assert flush_outbox() == 1
+    assert len(smtp.messages) == 1
+    assert EmailOutbox.query.filter_by(status="bundled").count() == 3
+
+def test_failed_send_is_retried_later(app):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]  # nothing listens here
+    app.config.update(SMTP_HOST="127.0.0.1", SMTP_PORT=port, SMTP_TLS=False, SMTP_TIMEOUT=2)
+    queue_email("t@example.com", "s", "b")
+    db.session.commit()
+    assert flush_outbox() == 0
+    m = EmailOutbox.query.one()
+    assert m.status == "pending" and m.attempts == 1 and m.next_attempt_at > dt.datetime.utcnow()
+
+def test_unbuildable_message_does_not_abandon_the_batch(app, smtp, monkeypatch):
+    real = mailer.build_message
+    def build(cfg, to_email, subject, *args):
+        if subject == "broken":
+            raise ValueError("report render failed")
+        return real(cfg, to_email, subject, *args)
+    monkeypatch.setattr(mailer, "build_message", build)
+    app.config.update(SMTP_MAX_ATTEMPTS=1)
+    queue_email("a@example.com", "broken", "b")
+    queue_email("b@example.com", "fine", "b")
+    db.session.commit()
+    assert flush_outbox() == 1
+    broken, fine = EmailOutbox.query.order_by(EmailOutbox.id).all()
+    assert (broken.status, broken.last_error) == ("failed", "ValueError: report render failed")
+    assert fine.status == "sent" and len(smtp.messages) == 1
+
+def test_stale_sending_message_out_of_attempts_is_failed(app, smtp):
+    app.config.update(SMTP_MAX_ATTEMPTS=3)
+    old = dt.datetime.utcnow() - dt.timedelta(hours=1)
+    db.session.add_all([EmailOutbox(to_email="a@example.com", subject="s", body="b", status="sending", attempts=3,
+                                    next_attempt_at=old),
+                        EmailOutbox(to_email="b@example.com", subject="s", body="b", status="sending", attempts=1,
+                                    next_attempt_at=dt.datetime.utcnow() + dt.timedelta(hours=1))])
+    db.session.commit()
+    assert flush_outbox() == 0
+    assert [m.status for m in EmailOutbox.query.order_by(EmailOutbox.id)] == ["failed", "sending"]
+    assert smtp.messages == []
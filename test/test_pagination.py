@@ -0,0 +1,55 @@
+import datetime as dt
+import re
+from app import db
+from app.models import Media, Report, Attempt, User
+from conftest import login_as
+
+def _ids(html):
+    return [int(x) for x in re.findall(r"/media/file/(\d+)", html)]
+
+def test_media_library_pages_by_keyset_without_gaps(client, school):
+    t0 = dt.datetime(2026, 1, 1)
+    # equal timestamps exercise the id tie-breaker
+    db.session.add_all([Media(filename=f"f{i}.png", mime="image/png", url="", created_at=t0 + dt.timedelta(minutes=i // 2))
+                        for i in range(7)])
+    db.session.add(Media(filename="notes.pdf", mime="application/pdf", url="", created_at=t0))
+    db.session.commit()
+    login_as(client, school["teacher_id"])
+
+    seen, url = [], "/media/?kind=image&per_page=3"
+    while url:
+        html = client.get(url).get_data(as_text=True)
+        seen += _ids(html)
+        m = re.search(r'href="([^"]+)">التالي', html)
+        url = m.group(1).replace("&amp;", "&") if m else None
+        if len(seen) == 3:
+            # a row added mid-browse must not shift the following pages
+            db.session.add(Media(filename="new.png", mime="image/png", url="", created_at=t0 + dt.timedelta(days=1)))
+            db.session.commit()
+    assert seen == [7, 6, 5, 4, 3, 2, 1]
+
+    oldest = client.get("/media/?kind=image&sort=oldest&per_page=50").get_data(as_text=True)
+    assert _ids(oldest)[:3] == [1, 2, 3]
+
+def test_list_pages_render_with_filters(client, school):
+    a = Attempt(student_id=school["student_id"], skill_id=school["skill_id"], week_key="2026-W01", status="submitted")
+    db.session.add(a)
+    db.session.flush()
+    db.session.add(Report(attempt_id=a.id, teacher_id=school["teacher_id"], url="/media/report/1"))
+    db.session.add(User(username="boss", name_ar="رئيس", role="chairman"))
+    db.session.commit()
+    login_as(client, school["teacher_id"])
+    html = client.get(f"/teacher/reports?student_id={school['student_id']}").get_data(as_text=True)
+    assert f"#{a.id}" in html and "طالب" in html
+    assert client.get("/teacher/remediation?sort=oldest").status_code == 200
+    assert client.get("/import/?status=draft").status_code == 200
+    login_as(client, school["student_id"])
+    assert client.get("/student/dashboard?after=garbage").status_code == 200
+    login_as(client, User.query.filter_by(role="chairman").one().id)
+    assert "طالب" in client.get("/chairman/users?q=طالب").get_data(as_text=True)
+    assert "طالب" in client.get("/chairman/dashboard?per_page=1").get_data(as_text=True)
+
+def test_keyset_columns_are_not_nullable():
+    from app.models import ImportBatch, Remediation
+    for model in (Media, Report, Attempt, User, Remediation, ImportBatch):
+        assert model.__table__.c.created_at.nullable is False, model.__name__
@@ -0,0 +1,49 @@
+from app import db, progress, stats
+from app.models import Attempt, Skill, StudentSkillStatus, User
+from app.utils import iso_week_key
+from conftest import login_as, max_queries
+
+def _class(school, students=3, skills=4):
+    users = [User(username=f"student_p{i}", name_ar=f"ب{i}", role="student", student_id=f"P{i}",
+                  teacher_id=school["teacher_id"]) for i in range(students)]
+    extra = [Skill(name_ar=f"م{i}", order=10 + i, pass_threshold=70) for i in range(skills)]
+    db.session.add_all(users + extra)
+    db.session.flush()
+    db.session.add(StudentSkillStatus(student_id=users[0].id, skill_id=extra[0].id, unlocked=True,
+                                      extra_attempt_week=iso_week_key()))
+    for no, score in enumerate((40, 90, 75), 1):
+        a = Attempt(student_id=users[0].id, skill_id=extra[0].id, week_key=iso_week_key(), attempt_no=no,
+                    status="submitted", score=score)
+        db.session.add(a)
+        db.session.flush()
+        stats.record_attempt(a)
+    db.session.commit()
+    return users, extra
+
+def test_grid_pivots_statuses_and_stats(school):
+    users, extra = _class(school)
+    grid = progress.load(school["teacher_id"])
+    assert grid.flags.shape == grid.best.shape == (4, 5)
+    i = [s[0] for s in grid.students].index(users[0].id)
+    j = [s[0] for s in grid.skills].index(extra[0].id)
+    assert (grid.best[i, j], grid.last[i, j]) == (90, 75)
+    f = grid.flags[i, j]
+    assert f & progress.UNLOCKED and f & progress.PASSED and f & progress.THIS_WEEK and f & progress.EXTRA
+    assert grid.best[i, j + 1] == -1 and grid.flags[i, j + 1] == 0
+    me = [s[0] for s in grid.students].index(school["student_id"])
+    assert grid.flags[me, 0] == progress.UNLOCKED
+    assert grid.summary()[j] == (1, 1)
+
+def test_page_query_count_is_flat_and_render_is_cached(client, school):
+    _class(school, students=30, skills=10)
+    login_as(client, school["teacher_id"])
+    client.get("/teacher/progress")
+    with max_queries(5):
+        resp = client.get("/teacher/progress")
+    assert resp.status_code == 200 and "90" in resp.get_data(as_text=True)
+
+    grid = progress.load(school["teacher_id"])
+    assert progress.render(grid) is progress.render(progress.load(school["teacher_id"]))
+    db.session.add(StudentSkillStatus(student_id=school["student_id"], skill_id=grid.skills[1][0], unlocked=True))
+    db.session.commit()
+    assert progress.load(school["teacher_id"]).digest != grid.digest
@@ -0,0 +1,46 @@
+import os
+from app import db, jobs, purge, report_cache
+from app.models import (Attempt, ImportBatch, ImportItem, Job, Media, Question, Remediation, Report, Skill,
+                        StudentSkillStatus)
+from conftest import login_as
+
+def _touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+    return path
+
+def test_skill_delete_hides_then_purges_in_chunks(app, client, school):
+    sid, kid, tid = school["student_id"], school["skill_id"], school["teacher_id"]
+    attempts = [Attempt(student_id=sid, skill_id=kid, week_key=f"2026-W0{i}", status="submitted", score=50)
+                for i in range(1, 6)]
+    db.session.add_all(attempts)
+    db.session.flush()
+    db.session.add_all([Report(attempt_id=a.id, teacher_id=tid, url="") for a in attempts])
+    upload = _touch(os.path.join(app.config["STORAGE_DIR"], "remediation", "sheet.pdf"))
+    media = Media(filename="sheet.pdf", url="", storage_key=upload)
+    batch = ImportBatch(created_by=tid, skill_id=kid, filename="x.docx", source_type="docx")
+    db.session.add_all([media, batch])
+    db.session.flush()
+    db.session.add_all([Remediation(teacher_id=tid, student_id=sid, skill_id=kid, file_media_id=media.id),
+                        ImportItem(batch_id=batch.id, raw_text="س")])
+    db.session.commit()
+    pdfs = [_touch(report_cache.cached_path(a.id, f"v{v}")) for a in attempts for v in (1, 2)]
+    kept = _touch(report_cache.cached_path(10_000, "v1"))
+
+    login_as(client, tid)
+    assert client.post(f"/teacher/skills/{kid}/delete").status_code == 302
+    assert db.session.get(Skill, kid).deleted_at is not None
+    assert Skill.visible().count() == 0
+    assert Attempt.query.count() == 5  # nothing removed in the request
+
+    assert purge.purge_skill(kid, chunk_size=2, max_chunks=2) is False
+    assert Attempt.query.count() == 1
+
+    app.config.update(PURGE_CHUNK_SIZE=2, PURGE_MAX_CHUNKS=3)
+    jobs.run_pending()
+    assert db.session.get(Skill, kid) is None
+    for model in (Attempt, Report, Remediation, Media, Question, StudentSkillStatus, ImportBatch, ImportItem):
+        assert model.query.count() == 0, model.__name__
+    assert not any(os.path.exists(p) for p in pdfs + [upload])
+    assert os.path.exists(kept)
+    assert {j.status for j in Job.query.filter_by(kind="purge_skill")} == {"done"}
@@ -0,0 +1,89 @@
+"""EXPLAIN QUERY PLAN regression test: hot routes must not scan whole tables.
+
+The statements are the ones the routes really send, captured with
+``sqltrace.capture(keep=True)``, and are EXPLAINed with their own parameters.
+"""
+import re
+import datetime as dt
+from app import db, deadlines, jobs, sqltrace
+from app.models import Attempt, ImportBatch, ImportItem, Media, Remediation, Report, User
+from app.pagination import encode_cursor
+from app.utils import now_utc
+from conftest import login_as
+
+# tables small enough (one row per skill) that a scan is the right plan
+SMALL_TABLES = {"skill"}
+_SCAN = re.compile(r"SCAN (?!CONSTANT ROW)(\w+)(?P<ordered> USING (?:COVERING )?INDEX)?")
+_UNFILTERED_PAGE = re.compile(r"^(?!.*\bWHERE\b).*\bLIMIT\b", re.I | re.S)
+
+def _seed(school):
+    teacher, student, skill = school["teacher_id"], school["student_id"], school["skill_id"]
+    chairman = User(username="boss", name_ar="رئيس", role="chairman")
+    attempt = Attempt(student_id=student, skill_id=skill, week_key="2026-W10", status="submitted", score=50)
+    media = Media(uploaded_by=teacher, filename="r.pdf", mime="application/pdf", url="", storage_key="r.pdf")
+    db.session.add_all([chairman, attempt, media])
+    db.session.flush()
+    batch = ImportBatch(created_by=teacher, skill_id=skill, filename="x.pdf", source_type="pdf", status="draft")
+    db.session.add_all([batch, Report(attempt_id=attempt.id, teacher_id=teacher, url=f"/media/report/{attempt.id}"),
+                        Remediation(teacher_id=teacher, student_id=student, skill_id=skill, file_media_id=media.id)])
+    db.session.flush()
+    db.session.add(ImportItem(batch_id=batch.id, raw_text="س"))
+    db.session.commit()
+    return chairman.id, attempt.id, batch.id
+
+def _hot_routes(school, chairman, attempt_id, batch_id):
+    after = encode_cursor(dt.datetime(2030, 1, 1), 10**6)
+    return {
+        school["student_id"]: ["/student/dashboard", f"/student/dashboard?after={after}&r_after={after}",
+                               f"/student/attempt/{attempt_id}/result"],
+        school["teacher_id"]: ["/teacher/dashboard", "/teacher/progress", "/teacher/reports",
+                               f"/teacher/reports?after={after}", "/teacher/remediation",
+                               f"/teacher/remediation?after={after}", f"/teacher/questions?skill_id={school['skill_id']}",
+                               "/import/", f"/import/{batch_id}/review", "/media/"],
+        chairman: ["/chairman/dashboard", f"/chairman/dashboard?after={after}", "/chairman/users",
+                   f"/chairman/users?after={after}&t_after={after}", f"/chairman/questions?skill_id={school['skill_id']}"],
+    }
+
+def _plan(statement: str, parameters) -> list[str]:
+    cursor = db.session.connection().connection.driver_connection.cursor()
+    try:
+        return [row[-1] for row in cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters or ())]
+    finally:
+        cursor.close()
+
+def _scans(stats) -> list:
+    out = []
+    for statement, parameters in stats.statements:
+        if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            continue
+        # walking an index in ORDER BY order stops at the LIMIT: an unfiltered first page
+        bad = [d for d in _plan(statement, parameters)
+               if (m := _SCAN.match(d)) and m.group(1) not in SMALL_TABLES
+               and not (m.group("ordered") and _UNFILTERED_PAGE.search(statement))]
+        if bad:
+            out.append((bad, " ".join(statement.split())))
+    return out
+
+def test_hot_routes_use_indexes(client, school):
+    routes = _hot_routes(school, *_seed(school))
+    scans = {}
+    for user_id, urls in routes.items():
+        login_as(client, user_id)
+        for url in urls:
+            with sqltrace.capture(keep=True) as stats:
+                assert client.get(url).status_code == 200, url
+            if bad := _scans(stats):
+                scans[url] = bad
+    assert not scans, f"full scans: {scans}"
+
+def test_worker_sweeps_use_indexes(app, school):
+    db.session.add(Attempt(student_id=school["student_id"], skill_id=school["skill_id"], week_key="2026-W10",
+                           status="in_progress", started_at=now_utc() - dt.timedelta(hours=2),
+                           deadline_at=now_utc() - dt.timedelta(hours=1)))
+    db.session.commit()
+    jobs.enqueue("notify_teacher", {"attempt_id": 0})
+    db.session.commit()
+    with sqltrace.capture(keep=True) as stats:
+        assert deadlines.sweep_expired(grace_seconds=0) == 1
+        assert jobs.run_pending() >= 1  # and the jobs the submission queued
+    assert not _scans(stats)
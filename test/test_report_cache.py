@@ -0,0 +1,74 @@
+import os
+
+from app import db, report_cache
+from app.bundles import bump_version
+from app.models import Attempt
+from conftest import login_as
+
+def _submitted_attempt(school):
+    a = Attempt(student_id=school["student_id"], skill_id=school["skill_id"], week_key="2026-W01",
+                status="submitted", score=50, answers_json={"1": ["b"]})
+    db.session.add(a)
+    db.session.commit()
+    return a
+
+def test_report_renders_on_first_download_and_is_reused(client, school, app):
+    a = _submitted_attempt(school)
+    reports_dir = app.config["REPORTS_DIR"]
+    before = set(os.listdir(reports_dir))
+
+    login_as(client, school["student_id"])
+    r = client.get(f"/media/report/{a.id}")
+    assert r.status_code == 200 and r.data.startswith(b"%PDF")
+    created = set(os.listdir(reports_dir)) - before
+    assert len(created) == 1
+
+    assert client.get(f"/media/report/{a.id}").status_code == 200
+    assert set(os.listdir(reports_dir)) - before == created
+
+    # a question edit changes the skill content version, so the next download re-renders
+    bump_version(school["skill_id"])
+    db.session.commit()
+    assert client.get(f"/media/report/{a.id}").status_code == 200
+    assert len(set(os.listdir(reports_dir)) - before) == 2
+
+def test_other_teacher_cannot_download(client, school):
+    from app.models import User
+    a = _submitted_attempt(school)
+    other = User(username="t2", name_ar="آخر", role="teacher")
+    db.session.add(other)
+    db.session.commit()
+    login_as(client, other.id)
+    assert client.get(f"/media/report/{a.id}").status_code == 403
+
+def test_evict_keeps_directory_within_budget(app, tmp_path):
+    app.config["REPORTS_DIR"] = str(tmp_path)
+    for i in range(5):
+        p = tmp_path / f"{i}.pdf"
+        p.write_bytes(b"x" * 1000)
+        os.utime(p, (i, i))
+    assert report_cache.evict(max_bytes=2500) == 3
+    assert sorted(os.listdir(tmp_path)) == ["3.pdf", "4.pdf"]
+
+def test_evict_spares_recently_used_files(app, tmp_path):
+    app.config.update(REPORTS_DIR=str(tmp_path), REPORT_EVICT_MIN_AGE=300)
+    old, fresh = tmp_path / "1-a.pdf", tmp_path / "2-b.pdf"
+    for p in (old, fresh):
+        p.write_bytes(b"x" * 1000)
+    os.utime(old, (0, 0))
+    assert report_cache.evict(max_bytes=1) == 1
+    assert os.listdir(tmp_path) == ["2-b.pdf"]
+
+def test_weak_skills_and_student_name_are_part_of_the_key(school):
+    from app import stats
+    from app.models import Skill, User
+    a = _submitted_attempt(school)
+    skill = db.session.get(Skill, school["skill_id"])
+    student = db.session.get(User, school["student_id"])
+    before = report_cache.content_hash(a, skill, student, stats.weakest_skills(student.id))
+    stats.record_attempt(a)
+    db.session.commit()
+    after = report_cache.content_hash(a, skill, student, stats.weakest_skills(student.id))
+    assert before != after
+    student.name_ar = "اسم جديد"
+    assert report_cache.content_hash(a, skill, student, stats.weakest_skills(student.id)) != after
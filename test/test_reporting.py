@@ -0,0 +1,14 @@
+import fitz
+
+from app.reporting import render_many, shape
+
+def test_shape_leaves_latin_text_alone():
+    assert shape("Score: 80%") == "Score: 80%"
+    assert shape("النتيجة") != "النتيجة"
+
+def test_render_many_across_processes(tmp_path):
+    jobs = [(str(tmp_path / f"r{i}.pdf"), "تقرير", [f"سطر {n}" for n in range(60)]) for i in range(3)]
+    paths = render_many(jobs, workers=2)
+    assert paths == [j[0] for j in jobs]
+    with fitz.open(paths[0]) as doc:
+        assert len(doc) == 2
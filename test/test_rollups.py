@@ -0,0 +1,66 @@
+import datetime as dt
+import json
+from app import db, deadlines, purge, rollups
+from app.models import Attempt, Question, Skill, SkillRollup, StudentRollup, TeacherRollup, User
+from app.utils import now_utc
+from conftest import login_as
+
+def _snapshot():
+    return {(m.__name__, getattr(r, key)): (r.attempts_count, r.score_sum, r.passed_count)
+            for m, key in ((StudentRollup, "student_id"), (TeacherRollup, "teacher_id"), (SkillRollup, "skill_id"))
+            for r in m.query.all() if r.attempts_count}
+
+def test_rollups_follow_submits_sweeps_moves_and_purges(app, client, school):
+    sid, kid, tid = school["student_id"], school["skill_id"], school["teacher_id"]
+    q1, q2 = [str(q.id) for q in Question.query.order_by(Question.id).all()]
+    other_teacher = User(username="t2", name_ar="معلم٢", role="teacher")
+    classmate = User(username="student_s2", name_ar="طالب٢", role="student", student_id="S2", teacher_id=tid)
+    db.session.add_all([other_teacher, classmate])
+    db.session.flush()
+    skill = db.session.get(Skill, kid)
+    started = now_utc()
+    live = Attempt(student_id=sid, skill_id=kid, week_key="2026-W10", status="in_progress",
+                   started_at=started, deadline_at=deadlines.deadline_for(skill, started))
+    old = started - dt.timedelta(hours=1)
+    expired = Attempt(student_id=classmate.id, skill_id=kid, week_key="2026-W10", status="in_progress",
+                      started_at=old, deadline_at=deadlines.deadline_for(skill, old),
+                      draft_answers_json=json.dumps({q1: ["b"]}))
+    db.session.add_all([live, expired])
+    db.session.commit()
+
+    login_as(client, sid)
+    client.post(f"/student/attempt/{live.id}/submit", data={f"q_{q1}": "b", f"q_{q2}": "نعم"})
+    assert deadlines.sweep_expired() == 1
+    assert _snapshot() == {
+        ("StudentRollup", sid): (1, 100, 1), ("StudentRollup", classmate.id): (1, 50, 0),
+        ("TeacherRollup", tid): (2, 150, 1), ("SkillRollup", kid): (2, 150, 1),
+    }
+
+    login_as(client, classmate.id)
+    client.post("/student/select-teacher", data={"teacher_id": other_teacher.id})
+    db.session.expire_all()
+    incremental = _snapshot()
+    assert incremental[("TeacherRollup", tid)] == (1, 100, 1)
+    assert incremental[("TeacherRollup", other_teacher.id)] == (1, 50, 0)
+    assert rollups.rebuild() == 5
+    assert _snapshot() == incremental
+
+    login_as(client, User.query.filter_by(username="t1").one().id)
+    body = client.get("/teacher/dashboard").get_data(as_text=True)
+    assert "100.0% (1)" in body
+
+    skill.deleted_at = now_utc()
+    db.session.commit()
+    assert purge.purge_skill(kid) is True
+    assert _snapshot() == {}
+    assert SkillRollup.query.count() == 0
+
+def test_chairman_dashboard_reads_rollups(client, school):
+    chairman = User(username="boss", name_ar="رئيس", role="chairman")
+    db.session.add_all([chairman, StudentRollup(student_id=school["student_id"], attempts_count=4, score_sum=250),
+                        TeacherRollup(teacher_id=school["teacher_id"], attempts_count=4, score_sum=250, passed_count=3),
+                        SkillRollup(skill_id=school["skill_id"], attempts_count=4, score_sum=250, passed_count=1)])
+    db.session.commit()
+    login_as(client, chairman.id)
+    body = client.get("/chairman/dashboard").get_data(as_text=True)
+    assert "62.5%" in body and "75.0%" in body and "25.0%" in body
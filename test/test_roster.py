@@ -0,0 +1,75 @@
+import io
+import os
+from werkzeug.security import check_password_hash
+from app import db, jobs, roster
+from app.models import RosterImport, Skill, StudentSkillStatus, User
+from conftest import login_as
+
+def _chairman(client):
+    boss = User(username="boss", name_ar="رئيس", role="chairman")
+    db.session.add(boss)
+    db.session.commit()
+    login_as(client, boss.id)
+
+def _upload(client, text: str, name: str = "roster.csv"):
+    return client.post("/chairman/users/import", data={"file": (io.BytesIO(text.encode("utf-8-sig")), name)},
+                       content_type="multipart/form-data")
+
+def test_import_creates_students_and_their_skill_statuses(app, client, school):
+    app.config.update(ROSTER_CHUNK_SIZE=2)
+    later = Skill(name_ar="مهارة٢", order=2)
+    db.session.add(later)
+    db.session.commit()
+    _chairman(client)
+    resp = _upload(client, "رقم الطالب,الاسم,المعلم,كلمة المرور\nS10,أحمد,t1,pw10\nS11,,معلم,pw11\nS12,سعد,,pw12\n\n")
+    assert resp.status_code == 302
+    job = RosterImport.query.one()
+    assert resp.headers["Location"].endswith(f"/chairman/users/import/{job.id}")
+    assert client.get(f"/chairman/users/import/{job.id}/progress").get_json() == {"status": "processing", "done": 0, "total": 3}
+    assert User.query.filter_by(role="student").count() == 1  # nothing hashed in the request
+    path = job.storage_key
+    assert os.path.exists(path)
+
+    assert jobs.run_pending() == 1
+    db.session.expire_all()
+    assert (job.status, job.progress_done, job.created, job.storage_key) == ("done", 3, 3, None)
+    assert not os.path.exists(path)  # the file held plaintext passwords
+    assert "تم استيراد 3 طالب" in client.get(f"/chairman/users/import/{job.id}").get_data(as_text=True)
+
+    made = User.query.filter(User.student_id.in_(["S10", "S11", "S12"])).order_by(User.student_id).all()
+    assert [(u.username, u.name_ar, u.teacher_id) for u in made] == [
+        ("student_S10", "أحمد", school["teacher_id"]), ("student_S11", "طالب S11", school["teacher_id"]),
+        ("student_S12", "سعد", None)]
+    assert check_password_hash(made[0].password_hash, "pw10")
+    statuses = {(s.skill_id, s.unlocked) for s in StudentSkillStatus.query.filter_by(student_id=made[0].id)}
+    assert statuses == {(school["skill_id"], True), (later.id, False)}
+
+def test_any_bad_row_rejects_the_whole_file(client, school):
+    _chairman(client)
+    resp = _upload(client, "student_id,name,teacher,password\nS20,a,t1,pw\nS1,b,t1,pw\nS20,c,t1,pw\nS21,d,nobody,\n")
+    assert resp.status_code == 400
+    text = resp.get_data(as_text=True)
+    for fragment in ("موجود مسبقًا", "مكرر (السطر 2)", "المعلم غير معروف: nobody", "كلمة المرور مفقودة"):
+        assert fragment in text
+    assert User.query.filter_by(student_id="S20").first() is None
+    assert RosterImport.query.count() == 0
+
+def test_rows_taken_before_the_worker_runs_fail_the_import(client, school):
+    _chairman(client)
+    _upload(client, "student_id,name,teacher,password\nS30,a,t1,pw\nS31,b,t1,pw\n")
+    db.session.add(User(username="student_S31", name_ar="b", role="student", student_id="S31"))
+    db.session.commit()
+    assert jobs.run_pending() == 1
+    job = RosterImport.query.one()
+    assert job.status == "failed" and "السطر 3" in job.error and job.storage_key is None
+    assert User.query.filter_by(student_id="S30").first() is None
+
+def test_unreadable_file_is_flashed(client, school):
+    _chairman(client)
+    resp = _upload(client, "name,teacher\nx,t1\n")
+    assert resp.status_code == 302
+    assert User.query.filter_by(role="student").count() == 1
+
+def test_hash_many_uses_the_pool_for_large_lists():
+    hashes = roster.hash_many([f"pw{i}" for i in range(40)], workers=2)
+    assert check_password_hash(hashes[39], "pw39") and not check_password_hash(hashes[0], "pw39")
@@ -0,0 +1,61 @@
+from app import db
+from app.models import Skill, StudentSkillStatus, User
+from app.utils import iso_week_key
+from conftest import login_as, max_queries
+
+def _class(school, n=3):
+    other = User(username="t2", name_ar="معلم٢", role="teacher")
+    db.session.add(other)
+    db.session.flush()
+    mine = [User(username=f"student_c{i}", name_ar=f"ط{i}", role="student", student_id=f"C{i}",
+                 teacher_id=school["teacher_id"]) for i in range(n)]
+    outsider = User(username="student_x", name_ar="خارجي", role="student", student_id="X", teacher_id=other.id)
+    new_skill = Skill(name_ar="جديدة", order=2)
+    db.session.add_all([*mine, outsider, new_skill])
+    db.session.commit()
+    return [u.id for u in mine], outsider.id, new_skill.id
+
+def _status(student_id, skill_id):
+    return StudentSkillStatus.query.filter_by(student_id=student_id, skill_id=skill_id).first()
+
+def test_bulk_unlock_for_the_whole_class_is_one_statement(client, school):
+    mine, outsider, new_skill = _class(school)
+    login_as(client, school["teacher_id"])
+    client.get("/teacher/dashboard")
+    with max_queries(3):  # user load, the upsert, commit bookkeeping
+        resp = client.post("/teacher/students/bulk", data={"action": "unlock", "skill_id": [new_skill, school["skill_id"]],
+                                                                   "scope": "class"})
+    assert resp.status_code == 302
+    for sid in [school["student_id"], *mine]:
+        assert _status(sid, new_skill).unlocked and _status(sid, school["skill_id"]).unlocked
+    assert _status(outsider, new_skill) is None
+
+def test_bulk_lock_and_extra_attempt_touch_only_the_ticked_students(client, school):
+    mine, outsider, _ = _class(school)
+    login_as(client, school["teacher_id"])
+    client.post("/teacher/students/bulk", data={"action": "lock", "skill_id": school["skill_id"],
+                                                "student_id": [school["student_id"], outsider]})
+    assert _status(school["student_id"], school["skill_id"]).unlocked is False
+    assert _status(outsider, school["skill_id"]) is None
+
+    client.post("/teacher/students/bulk", data={"action": "extra_attempt", "skill_id": school["skill_id"],
+                                                "student_id": [school["student_id"], mine[0]]})
+    locked, fresh = _status(school["student_id"], school["skill_id"]), _status(mine[0], school["skill_id"])
+    assert (locked.unlocked, locked.extra_attempt_week) == (False, iso_week_key())
+    assert (fresh.unlocked, fresh.extra_attempt_week) == (True, iso_week_key())
+    assert _status(mine[1], school["skill_id"]) is None
+
+def test_bulk_action_without_students_or_class_scope_writes_nothing(client, school):
+    _, _, new_skill = _class(school)
+    login_as(client, school["teacher_id"])
+    resp = client.post("/teacher/students/bulk", data={"action": "unlock", "skill_id": new_skill, "scope": "selected"},
+                       follow_redirects=True)
+    assert "الرجاء تحديد طالب واحد على الأقل" in resp.get_data(as_text=True)
+    assert StudentSkillStatus.query.filter_by(skill_id=new_skill).count() == 0
+
+def test_single_student_routes_still_work(client, school):
+    _, outsider, new_skill = _class(school)
+    login_as(client, school["teacher_id"])
+    client.post(f"/teacher/student/{school['student_id']}/unlock", data={"skill_id": new_skill})
+    assert _status(school["student_id"], new_skill).unlocked
+    assert client.post(f"/teacher/student/{outsider}/unlock", data={"skill_id": new_skill}).status_code == 404
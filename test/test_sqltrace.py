@@ -0,0 +1,56 @@
+from app import db, sqltrace
+from app.models import Attempt, Question, User
+from app.utils import now_utc
+from conftest import login_as, max_queries
+
+def _chairman():
+    u = User(username="boss", name_ar="رئيس", role="chairman")
+    db.session.add(u)
+    db.session.commit()
+    return u.id
+
+def test_endpoint_query_budgets(client, school):
+    q1, q2 = [str(q.id) for q in Question.query.order_by(Question.id).all()]
+    a = Attempt(student_id=school["student_id"], skill_id=school["skill_id"], week_key="2026-W10",
+                status="in_progress", started_at=now_utc())
+    db.session.add(a)
+    db.session.commit()
+    login_as(client, school["student_id"])
+    with max_queries(15):
+        assert client.post(f"/student/attempt/{a.id}/submit", data={f"q_{q1}": "b", f"q_{q2}": "نعم"}).status_code == 302
+    with max_queries(5):  # the identity was cached by the submit
+        assert client.get("/student/dashboard").status_code == 200
+
+    login_as(client, school["teacher_id"])
+    with max_queries(5):
+        assert client.get("/teacher/dashboard").status_code == 200
+
+    login_as(client, _chairman())
+    with max_queries(6):
+        assert client.get("/chairman/dashboard").status_code == 200
+
+def test_repeated_selects_are_flagged():
+    ids = list(range(1, 8))
+    stmt = "SELECT user.id FROM user WHERE user.id IN ({})"
+    assert sqltrace.shape(stmt.format("?, ?, ?")) == sqltrace.shape(stmt.format("?"))
+    stats = sqltrace.QueryStats()
+    for i in ids:
+        stats.add(f"SELECT name FROM skill WHERE id = {i}", 0.001)
+    stats.add("UPDATE attempt SET score=? WHERE id=?", 0.001)
+    assert stats.repeated(5) == [("SELECT name FROM skill WHERE id = ?", 7)]
+
+def test_instrumented_requests_report_headers_and_debug_page(app, client, school):
+    app.config.update(SQL_INSTRUMENT=True, SQL_N_PLUS_ONE_THRESHOLD=2)
+    sqltrace.init_app(app, db)
+    login_as(client, school["teacher_id"])
+    resp = client.get("/teacher/dashboard")
+    assert int(resp.headers["X-SQL-Queries"]) > 0
+    assert float(resp.headers["X-SQL-Time-Ms"]) >= 0
+    assert sqltrace.RECENT[-1]["endpoint"] == "teacher.dashboard"
+
+    login_as(client, _chairman())
+    body = client.get("/chairman/debug/sql").get_data(as_text=True)
+    assert "teacher.dashboard" in body
+    assert client.get("/chairman/debug/endpoints").status_code == 200
+    login_as(client, school["student_id"])
+    assert client.get("/chairman/debug/sql").status_code == 403
@@ -0,0 +1,52 @@
+import threading
+from app import db
+from app.models import Attempt, StudentSkillStatus
+from app.utils import iso_week_key
+from conftest import login_as
+
+def _hammer(app, student_id, skill_id, n=16):
+    barrier = threading.Barrier(n)
+    locations, errors = [], []
+
+    def worker():
+        client = app.test_client()
+        login_as(client, student_id)
+        barrier.wait()
+        try:
+            resp = client.get(f"/student/skill/{skill_id}/start")
+            locations.append((resp.status_code, resp.headers.get("Location")))
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    return locations
+
+def test_concurrent_starts_create_one_attempt(app, school):
+    sid, kid = school["student_id"], school["skill_id"]
+    first = _hammer(app, sid, kid)
+    attempts = Attempt.query.filter_by(student_id=sid, skill_id=kid).all()
+    assert len(attempts) == 1
+    assert set(first) == {(302, f"/student/attempt/{attempts[0].id}")}
+
+    # once submitted, the teacher's extra attempt is consumed exactly once
+    attempts[0].status = "submitted"
+    StudentSkillStatus.query.filter_by(student_id=sid, skill_id=kid).one().extra_attempt_week = iso_week_key()
+    db.session.commit()
+    second = _hammer(app, sid, kid)
+    db.session.expire_all()
+    attempts = Attempt.query.filter_by(student_id=sid, skill_id=kid).order_by(Attempt.attempt_no).all()
+    assert [(a.attempt_no, a.status) for a in attempts] == [(1, "submitted"), (2, "in_progress")]
+    assert abs((attempts[1].deadline_at - attempts[1].started_at).total_seconds() - 600) < 1
+    assert set(second) == {(302, f"/student/attempt/{attempts[1].id}")}
+    assert StudentSkillStatus.query.filter_by(student_id=sid, skill_id=kid).one().extra_attempt_week is None
+
+    # no extra attempt left: refused without touching the data
+    attempts[1].status = "submitted"
+    db.session.commit()
+    assert _hammer(app, sid, kid, n=4)[0] == (302, "/student/dashboard")
+    assert Attempt.query.filter_by(student_id=sid, skill_id=kid).count() == 2
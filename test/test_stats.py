@@ -0,0 +1,28 @@
+from app import db, stats
+from app.models import Attempt, Skill, StudentSkillStats
+
+def _attempt(school, skill_id, week, score):
+    a = Attempt(student_id=school["student_id"], skill_id=skill_id, week_key=week, score=score, status="submitted")
+    db.session.add(a)
+    db.session.flush()
+    stats.record_attempt(a)
+    db.session.commit()
+    return a
+
+def test_record_attempt_matches_rebuild(school):
+    other = Skill(name_ar="أخرى", order=2)
+    db.session.add(other)
+    db.session.commit()
+    _attempt(school, school["skill_id"], "2026-W01", 40)
+    _attempt(school, school["skill_id"], "2026-W02", 90)
+    _attempt(school, school["skill_id"], "2026-W03", 70)
+    _attempt(school, other.id, "2026-W03", 20)
+
+    row = StudentSkillStats.query.filter_by(skill_id=school["skill_id"]).one()
+    incremental = (row.attempts_count, row.score_sum, row.best_score, row.last_score, row.last_week)
+    assert incremental == (3, 200, 90, 70, "2026-W03")
+    assert [s.id for s in stats.weakest_skills(school["student_id"])] == [other.id, school["skill_id"]]
+
+    assert stats.rebuild() == 2
+    row = StudentSkillStats.query.filter_by(skill_id=school["skill_id"]).one()
+    assert (row.attempts_count, row.score_sum, row.best_score, row.last_score, row.last_week) == incremental